@@ -11,7 +11,7 @@ from enacom_transcriptor.ui import (
     render_sidebar,
     render_downloads,
 )
-from enacom_transcriptor.processing import run_processing
+from enacom_transcriptor.processing import run_live, run_processing
 
 
 def main() -> None:
@@ -23,6 +23,7 @@ def main() -> None:
     sidebar = render_sidebar()
 
     run_processing(cfg, sidebar)
+    run_live(cfg)
 
     render_downloads()
 
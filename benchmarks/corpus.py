@@ -0,0 +1,161 @@
+"""
+Corpus de audio sintético determinista y modelo ASR de reemplazo.
+
+El corpus se genera localmente (sin descargas ni TTS) a partir de una semilla:
+- "tono":  tonos puros con cortes, como una portadora con silencios.
+- "ruido": ruido rosado de fondo (canal sin modulación).
+- "habla": señal parecida a la voz: armónicos de una f0 que varía, con
+  envolvente silábica (~4 Hz) y pausas entre frases.
+
+`StubASR` imita la interfaz de `whisper.Whisper.transcribe` y devuelve
+segmentos y palabras deterministas (con términos de infracción en posiciones
+fijas) casi sin costo, para medir solo el pipeline. La salida depende solo
+del audio recibido (archivo y tramo), no del orden ni de la cantidad de
+llamadas previas: saltear tramos (audio reutilizado) o procesar los archivos
+en otro orden no cambia lo que se transcribe en los demás. Con `rtf` > 0 simula un
+modelo que tarda `rtf` segundos por segundo de audio.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from pathlib import Path
+
+import numpy as np
+
+SR = 16000
+
+KINDS = ("habla", "tono", "ruido")
+
+PHRASES = (
+    "torre de control aquí móvil uno solicito autorización",
+    "copiado nivel tres cinco cero rumbo norte",
+    "mayday mayday pérdida de presión en cabina",
+    "recibido mantenga posición y espere instrucciones",
+    "interferencia en la frecuencia repito interferencia",
+    "listo para el despegue pista uno ocho",
+    "emergencia médica a bordo solicito prioridad",
+    "afirmativo cambio y fuera",
+)
+
+INFRACTION_TERMS = ("mayday", "interferencia", "emergencia")
+
+
+def _speech_like(rng: np.random.Generator, n: int) -> np.ndarray:
+    t = np.arange(n) / SR
+    f0 = 120 + 30 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, 6.28))
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    sig = sum((0.6 / k) * np.sin(k * phase) for k in range(1, 8))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4.0 * t + rng.uniform(0, 6.28)))
+    # Frases de ~3 s separadas por pausas de ~1 s
+    phrase_on = ((t % 4.0) < 3.0).astype(np.float64)
+    sig = sig * syllables * phrase_on
+    return sig + 0.01 * rng.standard_normal(n)
+
+
+def _tone(rng: np.random.Generator, n: int) -> np.ndarray:
+    t = np.arange(n) / SR
+    f = rng.choice([440.0, 1000.0, 1750.0])
+    gate = ((t % 2.0) < 1.5).astype(np.float64)
+    return 0.5 * np.sin(2 * np.pi * f * t) * gate
+
+
+def _pink(rng: np.random.Generator, n: int) -> np.ndarray:
+    white = rng.standard_normal(n)
+    spec = np.fft.rfft(white)
+    f = np.arange(len(spec), dtype=np.float64)
+    f[0] = 1.0
+    pink = np.fft.irfft(spec / np.sqrt(f), n)
+    return 0.3 * pink / (np.max(np.abs(pink)) or 1.0)
+
+
+def synth(kind: str, seconds: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SR)
+    fn = {"habla": _speech_like, "tono": _tone, "ruido": _pink}[kind]
+    sig = fn(rng, n)
+    return (0.8 * sig / (np.max(np.abs(sig)) or 1.0)).astype(np.float32)
+
+
+def build_corpus(out_dir: Path, files: int = 3, seconds: float = 120.0, seed: int = 1234) -> list[Path]:
+    """Escribe `files` WAV (alternando tipos) y devuelve sus rutas."""
+    import soundfile as sf
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(files):
+        kind = KINDS[i % len(KINDS)]
+        p = out_dir / f"sintetico_{i:02d}_{kind}.wav"
+        sf.write(str(p), synth(kind, seconds, seed + i), SR, subtype="PCM_16")
+        paths.append(p)
+    return paths
+
+
+def corpus_digest(paths: list[Path]) -> str:
+    """Hash del corpus: si cambia, los resultados no son comparables."""
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(Path(p).read_bytes())
+    return h.hexdigest()[:16]
+
+
+class StubASR:
+    """Reemplazo de Whisper: misma firma de `transcribe`, salida determinista."""
+
+    def __init__(self, rtf: float = 0.0, seg_sec: float = 4.0) -> None:
+        self.rtf = float(rtf)
+        self.seg_sec = float(seg_sec)
+        self.calls = 0
+
+    def _duration(self, audio) -> float:
+        if isinstance(audio, np.ndarray):
+            return len(audio) / SR
+        import soundfile as sf
+
+        return float(sf.info(str(audio)).duration)
+
+    @staticmethod
+    def _seed(audio) -> int:
+        """Semilla a partir del contenido del audio (array o WAV temporal)."""
+        if isinstance(audio, np.ndarray):
+            data = np.ascontiguousarray(audio).tobytes()
+        else:
+            data = Path(str(audio)).read_bytes()
+        return int.from_bytes(hashlib.blake2b(data, digest_size=4).digest(), "little")
+
+    def transcribe(self, audio, language=None, word_timestamps=False, **_kw) -> dict:
+        dur = self._duration(audio)
+        seed = self._seed(audio)
+        if self.rtf > 0:
+            time.sleep(dur * self.rtf)
+
+        segments = []
+        t = 0.0
+        while t < dur - 0.5:
+            end = min(dur, t + self.seg_sec)
+            k = seed + len(segments)
+            text = PHRASES[k % len(PHRASES)]
+            seg = {
+                "start": t,
+                "end": end,
+                "text": " " + text,
+                "avg_logprob": -0.2 - 0.9 * ((k * 37) % 10) / 10,
+                "no_speech_prob": ((k * 13) % 10) / 20,
+                "compression_ratio": 1.3,
+            }
+            if word_timestamps:
+                words = text.split()
+                step = (end - t) / len(words)
+                seg["words"] = [
+                    {
+                        "word": " " + w,
+                        "start": t + j * step,
+                        "end": t + (j + 1) * step,
+                        "probability": 0.3 + 0.7 * (((k + j) * 7) % 10) / 10,
+                    }
+                    for j, w in enumerate(words)
+                ]
+            segments.append(seg)
+            t = end
+        self.calls += 1
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": language or "es"}
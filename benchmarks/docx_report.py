@@ -0,0 +1,80 @@
+"""
+Tiempo de generación del informe DOCX para transcripciones grandes.
+
+Compara el camino anterior (re-leer el TXT y un doc.add_paragraph por línea)
+contra el actual (segmentos en memoria + XML del cuerpo construido en bloque).
+
+Uso (desde la raíz del repo):
+    python benchmarks/docx_report.py --lines 100000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from enacom_transcriptor.exporters import _load_doc, generar_informe_word  # noqa: E402
+from enacom_transcriptor.segments import SegmentStore, format_line  # noqa: E402
+
+# Objetivo: informe de 100k líneas en pocos segundos.
+BUDGET_S = 5.0
+
+
+def _build_store(n: int) -> SegmentStore:
+    store = SegmentStore(archivo="demo.wav")
+    t = 0.0
+    for i in range(n):
+        store.append(t, t + 2.5, f"Control, aquí móvil {i % 97}, copiado nivel {i % 350}, cambio.", f"SPEAKER_{i % 2:02d}")
+        t += 2.7
+    store.compact()
+    return store
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=100_000)
+    ap.add_argument("--skip-legacy", action="store_true", help="No medir el camino add_paragraph (lento).")
+    ap.add_argument("--json", dest="json_out", default=None)
+    args = ap.parse_args()
+
+    store = _build_store(args.lines)
+    meta = {"model_size": "small", "lang": "es", "segment_duration": 30, "total_files": 1}
+    res: dict = {"lines": args.lines, "budget_s": BUDGET_S}
+
+    with tempfile.TemporaryDirectory() as td:
+        td = Path(td)
+
+        t0 = time.perf_counter()
+        generar_informe_word("demo.wav", str(td / "bulk.docx"), combinado=False, meta=meta, segmentos=store)
+        res["bulk_s"] = time.perf_counter() - t0
+
+        if not args.skip_legacy:
+            txt = td / "demo.txt"
+            with open(txt, "w", encoding="utf-8") as f:
+                for r in store.rows():
+                    f.write(format_line(r["start"], r["end"], r["speaker"], r["text"]) + "\n")
+
+            t0 = time.perf_counter()
+            doc = _load_doc()
+            for ln in txt.read_text(encoding="utf-8").splitlines():
+                doc.add_paragraph(ln)
+            doc.save(str(td / "legacy.docx"))
+            res["legacy_add_paragraph_s"] = time.perf_counter() - t0
+
+    print(f"DOCX {args.lines} líneas (bulk XML):     {res['bulk_s']:.2f} s  [presupuesto {BUDGET_S:.1f} s]")
+    if "legacy_add_paragraph_s" in res:
+        print(f"DOCX {args.lines} líneas (add_paragraph): {res['legacy_add_paragraph_s']:.2f} s")
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(res, indent=2), encoding="utf-8")
+
+    raise SystemExit(0 if res["bulk_s"] <= BUDGET_S else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark de punta a punta del pipeline de procesamiento con audio sintético.
+
+Genera un corpus determinista (ver corpus.py) y lo procesa con el mismo
+punto de entrada que la app y la vigilancia (engine.process_batch), con
+StubASR en lugar de Whisper. Las etapas son las del perfil de la corrida
+(run_meta["perfil"], ver profiling.StageTimer):
+
+    decode        abrir el audio (open_audio)
+    ui            lo que haría el panel: forma de onda (envolvente)
+    huella        huella acústica para reutilizar audio (fingerprint.Dedup)
+    segmentacion  leer el tramo (+ WAV temporal para Whisper con --sin-preproceso)
+    preproceso    16 kHz mono, continua, normalización (preprocess.Preprocessor)
+    asr           model.transcribe (StubASR: casi cero; --asr-rtf lo simula)
+    store         SegmentStore.append_whisper
+    txt           escritura incremental del TXT
+    xlsx          append_to_excel por segmento + hojas de infracciones/revisión
+    infracciones  detectar_infracciones_en_texto
+    sinks         JSONL / Parquet / SRT / VTT
+    progreso      _progreso.pkl por tramo
+    docx          generar_informe_word
+    zip           RunZipWriter con todas las salidas
+    catalogo      registro en el catálogo del historial
+
+Todo se escribe en un directorio temporal (ENACOM_DATA_DIR): no toca
+transcripciones/, el catálogo ni las huellas reales. El resultado va a JSON
+para comparar entre versiones; con --baseline se compara contra una corrida
+anterior y se sale con código 1 si alguna etapa empeoró más que la tolerancia.
+
+Uso (desde la raíz del repo):
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --files 5 --seconds 600 --baseline benchmarks/results/pipeline_abc123.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Antes de importar la app: corridas, catálogo y huellas van a un temporal.
+DATA_DIR = tempfile.mkdtemp(prefix="enacom_bench_")
+os.environ["ENACOM_DATA_DIR"] = DATA_DIR
+
+from corpus import INFRACTION_TERMS, StubASR, build_corpus, corpus_digest  # noqa: E402
+
+from enacom_transcriptor.engine import RunHooks, process_batch  # noqa: E402
+
+# Diferencias menores a esto (s) no cuentan como regresión (ruido de medición).
+MIN_DELTA_S = 0.05
+
+
+class BenchHooks(RunHooks):
+    """Sin mensajes; calcula la forma de onda como el panel y junta los resultados."""
+
+    def __init__(self) -> None:
+        super().__init__(log=lambda msg: None)
+        self.results: list[dict] = []
+
+    def file_started(self, idx, archivo, audio_path, source, num_segments, por_canal) -> None:
+        source.envelope(per_channel=por_canal)
+
+    def file_done(self, idx, result) -> None:
+        self.results.append(result)
+
+
+def _git_rev() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        )
+        return out.stdout.strip() or "desconocida"
+    except Exception:
+        return "desconocida"
+
+
+def compare(res: dict, baseline: dict, tolerance: float) -> list[str]:
+    regs = []
+    for name, t in res["stages"].items():
+        b = baseline.get("stages", {}).get(name)
+        if b is None:
+            continue
+        if t > b * (1 + tolerance) and t - b > MIN_DELTA_S:
+            regs.append(f"{name}: {b:.3f} s -> {t:.3f} s (+{(t / b - 1) * 100 if b else 0:.0f}%)")
+    return regs
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=3)
+    ap.add_argument("--seconds", type=float, default=120.0, help="Duración de cada archivo sintético.")
+    ap.add_argument("--segment", type=int, default=20, help="Duración de segmento (s), como en la UI.")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--asr-rtf", type=float, default=0.0, help="Simula un ASR de este factor de tiempo real.")
+    ap.add_argument("--sin-preproceso", action="store_true", help="Camino anterior: WAV temporal por segmento.")
+    ap.add_argument("--sin-huella", action="store_true", help="Sin huella acústica (deduplicar=False).")
+    ap.add_argument("--json", dest="json_out", default=None, help="Por defecto benchmarks/results/pipeline_<versión>.json (ignorado por git)")
+    ap.add_argument("--baseline", default=None, help="JSON de una corrida anterior para comparar.")
+    ap.add_argument("--tolerance", type=float, default=0.20, help="Empeoramiento tolerado por etapa (0.20 = 20%%).")
+    args = ap.parse_args()
+
+    model = StubASR(rtf=args.asr_rtf)
+    hooks = BenchHooks()
+    cfg = {
+        "model_size": "stub",
+        "lang": "es",
+        "segment_duration": args.segment,
+        "infracciones": [{"termino": t} for t in INFRACTION_TERMS],
+        "preproceso": {"enabled": not args.sin_preproceso},
+        "deduplicar": not args.sin_huella,
+        "export_zip": True,
+    }
+
+    try:
+        td = Path(DATA_DIR)
+        t0 = time.perf_counter()
+        corpus = build_corpus(td / "corpus", args.files, args.seconds, args.seed)
+        gen_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        run_meta = process_batch(model, [str(p) for p in corpus], cfg, hooks=hooks)
+        total_s = time.perf_counter() - t0
+
+        digest = corpus_digest(corpus)
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+    results = hooks.results
+    audio_s = sum(r["duracion_sec"] for r in results)
+    version = _git_rev()
+    res = {
+        "benchmark": "pipeline",
+        "version": version,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "corpus": {"files": args.files, "seconds": args.seconds, "seed": args.seed, "digest": digest, "generacion_s": round(gen_s, 3)},
+        "params": {
+            "segment": args.segment, "asr_rtf": args.asr_rtf,
+            "preproceso": not args.sin_preproceso, "huella": not args.sin_huella,
+        },
+        "audio_s": audio_s,
+        "segments": sum(len(r["segments"]) for r in results),
+        "infracciones": run_meta["infracciones_total"],
+        "total_s": round(total_s, 4),
+        "rtf": round(total_s / audio_s, 5) if audio_s else None,
+        "stages": {name: p["s"] for name, p in run_meta["perfil"].items()},
+    }
+
+    print(f"Corpus: {args.files} archivos × {args.seconds:.0f} s (digest {digest}) • versión {version}")
+    print(f"Total: {total_s:.2f} s para {audio_s:.0f} s de audio (RTF {res['rtf']})")
+    for name, t in res["stages"].items():
+        print(f"  {name:<13} {t:8.3f} s  {t / total_s * 100:5.1f}%")
+
+    out = Path(args.json_out) if args.json_out else ROOT / "benchmarks" / "results" / f"pipeline_{version}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(res, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultado: {out}")
+
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if base.get("corpus", {}).get("digest") != digest:
+            print("Aviso: el corpus de la línea base es distinto; la comparación es orientativa.")
+        regs = compare(res, base, args.tolerance)
+        if regs:
+            print("Regresiones:")
+            for r in regs:
+                print(f"  {r}")
+            raise SystemExit(1)
+        print(f"Sin regresiones contra {args.baseline} (tolerancia {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
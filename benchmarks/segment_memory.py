@@ -0,0 +1,120 @@
+"""
+Memoria y costo de pickle: lista de dicts vs SegmentStore/InfraccionTable.
+
+Genera N segmentos sintéticos (con palabras, como Whisper con
+word_timestamps=True) y compara, para cada representación:
+- pico de memoria (tracemalloc) al construirla,
+- tamaño y tiempo del pickle (lo que paga el `_progreso.pkl`).
+
+Uso (desde la raíz del repo):
+    python benchmarks/segment_memory.py --segments 200000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from enacom_transcriptor.segments import InfraccionTable, Interner, SegmentStore  # noqa: E402
+
+VOCAB = ("torre", "control", "mayday", "copiado", "pista", "norte", "rumbo", "nivel", "cambio", "listo")
+
+
+def _fake_segments(n: int, seed: int = 1234):
+    rnd = random.Random(seed)
+    t = 0.0
+    for i in range(n):
+        k = rnd.randint(4, 14)
+        words = []
+        wt = t
+        for _ in range(k):
+            d = rnd.uniform(0.15, 0.6)
+            words.append({"word": " " + rnd.choice(VOCAB), "start": wt, "end": wt + d, "probability": rnd.random()})
+            wt += d
+        yield {
+            "start": t,
+            "end": wt,
+            "text": "".join(w["word"] for w in words).strip(),
+            "speaker": f"SPEAKER_{i % 3:02d}",
+            "avg_logprob": -rnd.random(),
+            "no_speech_prob": rnd.random() * 0.2,
+            "compression_ratio": 1.0 + rnd.random(),
+            "words": words,
+        }
+        t = wt + 0.3
+
+
+def _measure(build):
+    tracemalloc.start()
+    obj = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    blob = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    dump_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pickle.loads(blob)
+    load_s = time.perf_counter() - t0
+    return {"peak_mb": peak / 2**20, "pickle_mb": len(blob) / 2**20, "dump_s": dump_s, "load_s": load_s}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--segments", type=int, default=100_000)
+    ap.add_argument("--json", dest="json_out", default=None)
+    args = ap.parse_args()
+
+    segs = list(_fake_segments(args.segments))
+
+    def build_dicts():
+        # Representación previa: segments_done + infracciones como list[dict]
+        # (las palabras se conservan para comparar a igual información).
+        out = []
+        infr = []
+        for s in segs:
+            out.append({
+                "start": s["start"], "end": s["end"], "text": s["text"], "speaker": s["speaker"],
+                "words": [dict(w) for w in s["words"]],
+            })
+            if "mayday" in s["text"]:
+                infr.append({"archivo": "demo.wav", "termino": "mayday", "inicio": "0:00:00",
+                             "fin": "0:00:01", "texto": s["text"], "speaker": s["speaker"]})
+        return out, infr
+
+    def build_store():
+        store = SegmentStore(archivo="demo.wav", speakers=Interner())
+        infr = InfraccionTable()
+        for s in segs:
+            i = store.append_whisper(s, offset=0.0, speaker=s["speaker"])
+            if "mayday" in s["text"]:
+                infr.add("demo.wav", "mayday", s["start"], s["end"], store.texts[i], s["speaker"])
+        store.compact()
+        return store, infr
+
+    res = {
+        "segments": args.segments,
+        "list_of_dicts": _measure(build_dicts),
+        "columnar": _measure(build_store),
+    }
+
+    for name in ("list_of_dicts", "columnar"):
+        r = res[name]
+        print(
+            f"{name:14s} pico {r['peak_mb']:8.1f} MB • pickle {r['pickle_mb']:7.1f} MB "
+            f"• dump {r['dump_s']:.3f} s • load {r['load_s']:.3f} s"
+        )
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(res, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark de arranque de la app.
+
+Mide tres cosas y las compara contra un presupuesto fijo:
+
+1) Desglose de `python -X importtime` al importar los módulos que usa app.py
+   (ui + processing), ordenado por tiempo acumulado.
+2) Arranque en frío: tiempo de pared de un intérprete nuevo que importa esos
+   módulos (lo que paga el ejecutable de launcher.py antes de mostrar la página).
+3) Rerun: tiempo de ejecutar app.py con los módulos ya cargados, que es lo que
+   Streamlit repite en cada interacción. Se corre con el AppTest de Streamlit
+   (mismo ScriptRunner que el servidor, sin navegador), así que main() dibuja
+   la página completa.
+
+Además verifica que ninguna dependencia pesada (whisper/torch/plotly/pandas/
+openpyxl/docx/numpy) se cargue al arrancar ni al dibujar la página: deben
+importarse recién al usarse. Las que ya carga `import streamlit` por su cuenta
+se informan aparte (la app no las puede evitar).
+
+Uso (desde la raíz del repo):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --json bench_startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# La página lee el historial: catálogo y huellas van a un temporal.
+os.environ.setdefault("ENACOM_DATA_DIR", tempfile.mkdtemp(prefix="enacom_bench_"))
+
+IMPORT_STMT = "import enacom_transcriptor.ui, enacom_transcriptor.processing"
+
+HEAVY_MODULES = ("whisper", "torch", "plotly", "pandas", "openpyxl", "docx", "numpy")
+
+# Presupuesto (segundos). Cold start incluye el arranque del intérprete y streamlit.
+BUDGET_COLD_START_S = 3.0
+BUDGET_RERUN_S = 0.15
+
+
+def _run_importtime() -> list[dict]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_STMT],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Fallo el import de la app:\n{proc.stderr}")
+
+    rows: list[dict] = []
+    for ln in proc.stderr.splitlines():
+        if not ln.startswith("import time:") or "[us]" in ln:
+            continue
+        try:
+            _, rest = ln.split(":", 1)
+            self_us, cum_us, name = rest.split("|", 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append(
+            {
+                "module": name.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cum_us),
+                "depth": depth,
+            }
+        )
+    return rows
+
+
+def _loaded_by(stmt: str) -> set[str]:
+    """Paquetes de primer nivel cargados en un intérprete nuevo después de `stmt`."""
+    proc = subprocess.run(
+        [sys.executable, "-c", f"{stmt}\nimport sys\nprint('\\n'.join(sys.modules))"],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {m.split(".")[0] for m in proc.stdout.split()}
+
+
+def _cold_start(runs: int) -> list[float]:
+    out: list[float] = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", IMPORT_STMT], cwd=str(ROOT), check=True)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _rerun(runs: int) -> tuple[list[float], set[str]]:
+    """
+    Tiempos de rerun de app.py (main() completo) y paquetes pesados que se
+    cargaron al dibujar la página por primera vez.
+    """
+    sys.path.insert(0, str(ROOT))
+    os.chdir(str(ROOT))
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+
+    # Primera ejecución: carga módulos (no se cuenta).
+    before = {m.split(".")[0] for m in sys.modules}
+    at.run()
+    if at.exception:
+        raise SystemExit(f"app.py falló al dibujar la página:\n{at.exception[0].value}")
+    rendered = {m.split(".")[0] for m in sys.modules} - before
+
+    out: list[float] = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        at.run()
+        out.append(time.perf_counter() - t0)
+    return out, {m for m in HEAVY_MODULES if m in rendered}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--json", dest="json_out", default=None, help="Ruta opcional para volcar resultados.")
+    args = ap.parse_args()
+
+    rows = _run_importtime()
+    top_level = [r for r in rows if r["depth"] == 1]
+    top_level.sort(key=lambda r: r["cumulative_us"], reverse=True)
+
+    loaded = {r["module"].split(".")[0] for r in rows}
+    by_streamlit = _loaded_by("import streamlit")
+    heavy_streamlit = sorted(m for m in HEAVY_MODULES if m in by_streamlit)
+
+    cold = _cold_start(args.runs)
+    rerun, heavy_render = _rerun(args.runs)
+    heavy_loaded = sorted(m for m in HEAVY_MODULES if (m in loaded or m in heavy_render) and m not in by_streamlit)
+
+    cold_med = statistics.median(cold)
+    rerun_med = statistics.median(rerun)
+
+    print(f"== -X importtime ({IMPORT_STMT}) — top {args.top} por acumulado ==")
+    for r in top_level[: args.top]:
+        print(f"{r['cumulative_us'] / 1000:9.1f} ms  {r['module']}")
+
+    print()
+    print(f"Arranque en frío (mediana de {args.runs}): {cold_med:.3f} s  [presupuesto {BUDGET_COLD_START_S:.2f} s]")
+    print(f"Rerun de app.py  (mediana de {args.runs}): {rerun_med * 1000:.1f} ms  [presupuesto {BUDGET_RERUN_S * 1000:.0f} ms]")
+    if heavy_loaded:
+        print(f"Dependencias pesadas cargadas al arrancar: {', '.join(heavy_loaded)}")
+    if heavy_streamlit:
+        print(f"Cargadas por streamlit mismo (no cuentan): {', '.join(heavy_streamlit)}")
+
+    result = {
+        "python": sys.version.split()[0],
+        "cold_start_s": cold,
+        "cold_start_median_s": cold_med,
+        "rerun_s": rerun,
+        "rerun_median_s": rerun_med,
+        "budget_cold_start_s": BUDGET_COLD_START_S,
+        "budget_rerun_s": BUDGET_RERUN_S,
+        "heavy_loaded_at_startup": heavy_loaded,
+        "heavy_loaded_by_streamlit": heavy_streamlit,
+        "importtime_top": top_level[: args.top],
+    }
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    ok = cold_med <= BUDGET_COLD_START_S and rerun_med <= BUDGET_RERUN_S and not heavy_loaded
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict, deque
+
+from enacom_transcriptor import metrics
+from enacom_transcriptor.paths import BACKUP_DIR, ensure_dirs
+
+
+# Alertas de infracciones en el momento en que se transcribe el segmento.
+# El despacho corre en un hilo propio con cola acotada: un receptor lento
+# (webhook caído, syslog remoto) nunca frena la transcripción; si la cola se
+# llena, las alertas nuevas se descartan y se cuentan.
+
+ALERTS_CONFIG_PATH = BACKUP_DIR / "alertas.json"
+# .log (y no .jsonl) para que el historial no lo tome como una salida.
+ALERTS_FILE_PATH = BACKUP_DIR / "alertas.log"
+
+DEFAULT_ALERTS = {
+    "enabled": False,
+    "webhook_url": "",
+    "syslog": False,
+    "syslog_address": "",     # vacío = syslog local (/dev/log o localhost:514)
+    "file": True,             # alertas.log (una línea JSON por alerta)
+    "desktop": False,
+    "dedup_sec": 60,          # misma infracción (archivo, término, tiempo) se avisa una vez
+    "max_por_min": 6,         # por término
+}
+
+_QUEUE_MAX = 1000
+_HTTP_TIMEOUT = 5
+
+
+def load_alert_config() -> dict:
+    try:
+        data = json.loads(ALERTS_CONFIG_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        data = {}
+    return {**DEFAULT_ALERTS, **{k: v for k, v in data.items() if k in DEFAULT_ALERTS}}
+
+
+def save_alert_config(config: dict) -> None:
+    ensure_dirs()
+    data = {**DEFAULT_ALERTS, **{k: v for k, v in config.items() if k in DEFAULT_ALERTS}}
+    ALERTS_CONFIG_PATH.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def _message(alert: dict) -> str:
+    return f"ENACOM infracción [{alert['termino']}] {alert.get('archivo', '')} {alert.get('inicio', '')}: {alert.get('texto', '')}"
+
+
+# =========================
+# Destinos
+# =========================
+
+class WebhookBackend:
+    name = "webhook"
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+
+    def send(self, alert: dict) -> None:
+        body = json.dumps(alert, ensure_ascii=False).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=_HTTP_TIMEOUT) as resp:
+            resp.read()
+
+
+class SyslogBackend:
+    name = "syslog"
+
+    def __init__(self, address: str = "") -> None:
+        if address:
+            host, _, port = address.partition(":")
+            addr = (host, int(port or 514))
+        elif os.path.exists("/dev/log"):
+            addr = "/dev/log"
+        else:
+            addr = ("localhost", 514)
+        self._handler = logging.handlers.SysLogHandler(address=addr)
+        self._handler.ident = "enacom: "
+        self._logger = logging.getLogger("enacom.alertas.syslog")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.WARNING)
+        self._logger.addHandler(self._handler)
+
+    def send(self, alert: dict) -> None:
+        self._logger.warning(_message(alert))
+
+
+class FileBackend:
+    name = "archivo"
+
+    def __init__(self, path=ALERTS_FILE_PATH) -> None:
+        self.path = str(path)
+
+    def send(self, alert: dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+
+class DesktopBackend:
+    name = "escritorio"
+
+    def send(self, alert: dict) -> None:
+        title = f"ENACOM: {alert['termino']}"
+        text = (alert.get("texto") or "")[:200]
+        try:
+            from plyer import notification  # type: ignore
+
+            notification.notify(title=title, message=text, timeout=10)
+            return
+        except ImportError:
+            pass
+        if sys.platform == "darwin":
+            script = f"display notification {json.dumps(text)} with title {json.dumps(title)}"
+            subprocess.run(["osascript", "-e", script], check=True, timeout=_HTTP_TIMEOUT)
+        elif shutil.which("notify-send"):
+            subprocess.run(["notify-send", title, text], check=True, timeout=_HTTP_TIMEOUT)
+        else:
+            raise RuntimeError("sin notificador de escritorio (instalá plyer)")
+
+
+def build_backends(config: dict) -> list:
+    backends = []
+    if config.get("webhook_url"):
+        backends.append(WebhookBackend(config["webhook_url"]))
+    if config.get("syslog"):
+        backends.append(SyslogBackend(config.get("syslog_address") or ""))
+    if config.get("file"):
+        backends.append(FileBackend())
+    if config.get("desktop"):
+        backends.append(DesktopBackend())
+    return backends
+
+
+# =========================
+# Despachador
+# =========================
+
+class AlertDispatcher:
+    """
+    `push(hit)` no bloquea: filtra duplicados y exceso por término y encola;
+    un hilo envía a cada destino. Un destino que falla no afecta a los demás.
+    """
+
+    def __init__(self, backends: list, dedup_sec: float = 60, max_per_min: int = 6, maxsize: int = _QUEUE_MAX) -> None:
+        self.backends = list(backends)
+        self.dedup_sec = float(dedup_sec)
+        self.max_per_min = int(max_per_min)
+        self._q: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._seen: dict[tuple, float] = {}
+        self._recent: dict[str, deque] = defaultdict(deque)
+        self.counts = {"enviadas": 0, "duplicadas": 0, "limitadas": 0, "descartadas": 0, "errores": 0}
+        self.last_error = ""
+        self._thread = threading.Thread(target=self._run, name="enacom-alertas", daemon=True)
+        self._thread.start()
+        metrics.set_queue_depth("alertas", self._q.qsize)
+
+    def _key(self, hit: dict) -> tuple:
+        t = hit.get("t_inicio")
+        t = round(float(t), 1) if isinstance(t, (int, float)) and t == t else hit.get("inicio")
+        return (hit.get("archivo"), hit.get("termino"), t)
+
+    def push(self, hit: dict) -> bool:
+        now = time.monotonic()
+        termino = str(hit.get("termino", ""))
+        with self._lock:
+            key = self._key(hit)
+            if now - self._seen.get(key, -1e18) < self.dedup_sec:
+                self.counts["duplicadas"] += 1
+                return False
+            self._seen[key] = now
+            if len(self._seen) > 10_000:
+                self._seen = {k: v for k, v in self._seen.items() if now - v < self.dedup_sec}
+
+            recent = self._recent[termino]
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+            if self.max_per_min > 0 and len(recent) >= self.max_per_min:
+                self.counts["limitadas"] += 1
+                return False
+            recent.append(now)
+
+        alert = {
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            **{k: v for k, v in hit.items() if not (isinstance(v, float) and v != v)},
+        }
+        try:
+            self._q.put_nowait(alert)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.counts["descartadas"] += 1
+            return False
+
+    def _run(self) -> None:
+        while True:
+            alert = self._q.get()
+            if alert is None:
+                break
+            for b in self.backends:
+                try:
+                    b.send(alert)
+                except Exception as e:
+                    with self._lock:
+                        self.counts["errores"] += 1
+                        self.last_error = f"{b.name}: {e}"
+            with self._lock:
+                self.counts["enviadas"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counts, "pendientes": self._q.qsize(), "ultimo_error": self.last_error}
+
+    def close(self, timeout: float = 5.0) -> None:
+        metrics.set_queue_depth("alertas", None)
+        try:
+            self._q.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+_dispatcher: AlertDispatcher | None = None
+_dispatcher_cfg: str = ""
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> AlertDispatcher | None:
+    """
+    Despachador del proceso según alertas.json (None si están desactivadas).
+    Se reutiliza entre reruns de Streamlit y se recrea si cambia la config.
+    """
+    global _dispatcher, _dispatcher_cfg
+    config = load_alert_config()
+    sig = json.dumps(config, sort_keys=True)
+    with _dispatcher_lock:
+        if sig == _dispatcher_cfg:
+            return _dispatcher
+        if _dispatcher is not None:
+            _dispatcher.close(timeout=1.0)
+        _dispatcher = None
+        _dispatcher_cfg = sig
+        if config.get("enabled"):
+            ensure_dirs()
+            backends = build_backends(config)
+            if backends:
+                _dispatcher = AlertDispatcher(backends, config["dedup_sec"], config["max_por_min"])
+        return _dispatcher
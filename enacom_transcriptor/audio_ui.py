@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 import base64
-import datetime
+import os
 import pathlib
 
 import numpy as np
-import plotly.graph_objects as go
 import streamlit as st
 
-def hhmmss(seconds: int) -> str:
-    return str(datetime.timedelta(seconds=int(seconds)))
+from enacom_transcriptor.timefmt import hhmmss, hhmmss_cs  # noqa: F401 (re-export)
+
+# Arriba de esto el audio no se incrusta en base64 (agrega ~1,33x el archivo
+# al HTML): se sirve con st.audio desde el archivo en disco.
+INLINE_AUDIO_MAX_BYTES = 20 * 1024 * 1024
+
 
 def audio_player_with_jumps(audio_path: str, key_suffix: str = "") -> None:
+    try:
+        size = os.path.getsize(audio_path)
+    except OSError:
+        size = 0
+    if size > INLINE_AUDIO_MAX_BYTES:
+        st.audio(audio_path)
+        return
+
     with open(audio_path, "rb") as f:
         audio_bytes = f.read()
     audio_base64 = base64.b64encode(audio_bytes).decode()
@@ -41,8 +52,11 @@ def audio_player_with_jumps(audio_path: str, key_suffix: str = "") -> None:
     st.components.v1.html(audio_html, height=120)
 
 def visualizar_audio(samplerate: int, data: np.ndarray, height: int = 220, title: str = "📈 Forma de onda"):
-    if data.ndim == 2:
-        data = data.mean(axis=1)
+    import plotly.graph_objects as go
+
+    # 2D: una curva por canal (transcripción por canal); si no, la mezcla.
+    if data.ndim == 2 and data.shape[1] == 1:
+        data = data[:, 0]
 
     dur = len(data) / samplerate if samplerate else 0.0
 
@@ -60,7 +74,11 @@ def visualizar_audio(samplerate: int, data: np.ndarray, height: int = 220, title
     a = a / maxv
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=t, y=a, mode="lines", name="Amplitud", line=dict(width=1)))
+    if a.ndim == 2:
+        for c in range(a.shape[1]):
+            fig.add_trace(go.Scatter(x=t, y=a[:, c], mode="lines", name=f"Canal {c + 1}", line=dict(width=1)))
+    else:
+        fig.add_trace(go.Scatter(x=t, y=a, mode="lines", name="Amplitud", line=dict(width=1)))
     fig.update_layout(
         title=title,
         xaxis_title="Tiempo (s)",
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+from enacom_transcriptor.paths import BACKUP_DIR, CATALOG_PATH, FINGERPRINT_PATH, PART_MARKER, ensure_dirs
+
+
+# Tipos de grupo del historial
+TIPO_IND = "IND"
+TIPO_LOTE = "LOTE"
+TIPO_CORRIDA = "CORRIDA"
+
+CATALOG_EXTS = (".txt", ".xlsx", ".docx", ".zip", ".jsonl", ".parquet", ".srt", ".vtt")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        TEXT PRIMARY KEY,
+    created       REAL NOT NULL,
+    generado      TEXT,
+    modo          TEXT,
+    model_size    TEXT,
+    lang          TEXT,
+    total_files   INTEGER,
+    duracion_sec  REAL,
+    infracciones  INTEGER,
+    meta_json     TEXT
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id        TEXT,
+    grupo         TEXT NOT NULL,
+    tipo          TEXT NOT NULL,
+    archivo       TEXT,
+    ext           TEXT NOT NULL,
+    path          TEXT NOT NULL UNIQUE,
+    size          INTEGER NOT NULL DEFAULT 0,
+    mtime         REAL NOT NULL DEFAULT 0,
+    duracion_sec  REAL,
+    infracciones  INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_outputs_grupo ON outputs (grupo);
+CREATE INDEX IF NOT EXISTS ix_outputs_run ON outputs (run_id);
+CREATE INDEX IF NOT EXISTS ix_outputs_mtime ON outputs (mtime);
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    ensure_dirs()
+    is_new = not CATALOG_PATH.exists()
+
+    con = sqlite3.connect(str(CATALOG_PATH), timeout=10)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(_SCHEMA)
+
+    # Primera vez: se importa lo que ya había en la carpeta (una sola vez).
+    if is_new:
+        _reindex(con, BACKUP_DIR)
+    return con
+
+
+def group_for(path: str) -> str:
+    """
+    Grupo del historial de una salida: ruta relativa a la carpeta de
+    transcripciones sin extensión (corrida_X/grabacion/grabacion). Los
+    archivos sueltos de versiones anteriores quedan agrupados por nombre base.
+    """
+    p = Path(path)
+    try:
+        rel = p.parent.resolve().relative_to(BACKUP_DIR.resolve())
+    except ValueError:
+        return p.stem
+    return p.stem if rel.as_posix() in ("", ".") else f"{rel.as_posix()}/{p.stem}"
+
+
+def tipo_for(base: str) -> str:
+    b = Path(base or "").name.lower()
+    if b.startswith("lote_"):
+        return TIPO_LOTE
+    if b.startswith("corrida_"):
+        return TIPO_CORRIDA
+    return TIPO_IND
+
+
+def _stat(path: str) -> tuple[int, float]:
+    try:
+        st_ = os.stat(path)
+        return int(st_.st_size), float(st_.st_mtime)
+    except OSError:
+        return 0, 0.0
+
+
+# =========================
+# Escritura (desde run_processing)
+# =========================
+
+def register_run(run_id: str, meta: dict) -> None:
+    with closing(_connect()) as con, con:
+        con.execute(
+            """
+            INSERT OR REPLACE INTO runs
+                (run_id, created, generado, modo, model_size, lang, total_files, duracion_sec, infracciones, meta_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                run_id,
+                time.time(),
+                meta.get("generado"),
+                meta.get("modo"),
+                meta.get("model_size"),
+                meta.get("lang"),
+                meta.get("total_files"),
+                meta.get("total_duration_sec"),
+                meta.get("infracciones_total"),
+                json.dumps(meta, ensure_ascii=False),
+            ),
+        )
+
+
+def register_outputs(
+    run_id: str,
+    grupo: str,
+    paths: list[str],
+    archivo: str | None = None,
+    tipo: str | None = None,
+    duracion_sec: float | None = None,
+    infracciones: int | None = None,
+) -> None:
+    """Registra (o actualiza) los archivos de salida de un grupo del historial."""
+    tipo = tipo or tipo_for(grupo)
+    rows = []
+    for p in paths:
+        if not p or not os.path.exists(p):
+            continue
+        size, mtime = _stat(p)
+        rows.append(
+            (run_id, grupo, tipo, archivo, Path(p).suffix.lower().lstrip("."), str(p), size, mtime, duracion_sec, infracciones)
+        )
+    if not rows:
+        return
+
+    with closing(_connect()) as con, con:
+        con.executemany(
+            """
+            INSERT INTO outputs (run_id, grupo, tipo, archivo, ext, path, size, mtime, duracion_sec, infracciones)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                run_id=excluded.run_id, grupo=excluded.grupo, tipo=excluded.tipo,
+                archivo=excluded.archivo, ext=excluded.ext, size=excluded.size,
+                mtime=excluded.mtime, duracion_sec=excluded.duracion_sec,
+                infracciones=excluded.infracciones
+            """,
+            rows,
+        )
+
+
+def forget_paths(paths: list[str]) -> None:
+    """Quita del catálogo archivos borrados del disco."""
+    if not paths:
+        return
+    with closing(_connect()) as con, con:
+        con.executemany("DELETE FROM outputs WHERE path = ?", [(str(p),) for p in paths])
+
+
+# =========================
+# Lectura (historial)
+# =========================
+
+def _where(search: str, tipo: str | None) -> tuple[str, list]:
+    conds, args = [], []
+    if tipo:
+        conds.append("tipo = ?")
+        args.append(tipo)
+    if search:
+        conds.append("grupo LIKE ? ESCAPE '\\'")
+        esc = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        args.append(f"%{esc}%")
+    return ("WHERE " + " AND ".join(conds)) if conds else "", args
+
+
+def count_groups(search: str = "", tipo: str | None = None) -> int:
+    where, args = _where(search, tipo)
+    with closing(_connect()) as con:
+        row = con.execute(f"SELECT COUNT(DISTINCT grupo) FROM outputs {where}", args).fetchone()
+    return int(row[0] or 0)
+
+
+def list_groups(
+    search: str = "",
+    tipo: str | None = None,
+    limit: int = 20,
+    offset: int = 0,
+    order: str = "desc",
+) -> list[dict]:
+    """
+    Página de grupos del historial, más recientes primero (order="asc": más
+    viejos primero):
+    [{"grupo", "tipo", "mtime", "size", "exts", "duracion_sec", "infracciones"}]
+    """
+    where, args = _where(search, tipo)
+    direction = "ASC" if order == "asc" else "DESC"
+    sql = f"""
+        SELECT grupo, MIN(tipo) AS tipo, MAX(mtime) AS mtime, SUM(size) AS size,
+               GROUP_CONCAT(ext) AS exts, MAX(duracion_sec) AS duracion_sec,
+               MAX(infracciones) AS infracciones
+        FROM outputs {where}
+        GROUP BY grupo
+        ORDER BY mtime {direction}
+        LIMIT ? OFFSET ?
+    """
+    with closing(_connect()) as con:
+        rows = con.execute(sql, [*args, int(limit), int(offset)]).fetchall()
+    out = []
+    for r in rows:
+        d = dict(r)
+        d["exts"] = sorted(set((d.get("exts") or "").split(","))) if d.get("exts") else []
+        out.append(d)
+    return out
+
+
+def group_paths(grupo: str) -> dict[str, str]:
+    """{ext: path} de un grupo."""
+    with closing(_connect()) as con:
+        rows = con.execute("SELECT ext, path FROM outputs WHERE grupo = ? ORDER BY mtime", (grupo,)).fetchall()
+    return {r["ext"]: r["path"] for r in rows}
+
+
+def groups_older_than(ts: float) -> list[str]:
+    """Grupos cuyo archivo más reciente es anterior a `ts` (epoch)."""
+    with closing(_connect()) as con:
+        rows = con.execute("SELECT grupo FROM outputs GROUP BY grupo HAVING MAX(mtime) < ?", (ts,)).fetchall()
+    return [r[0] for r in rows]
+
+
+def _sqlite_bytes(path: Path) -> int:
+    """Tamaño de una base SQLite con su WAL (0 si no existe)."""
+    total = 0
+    for p in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+        try:
+            total += p.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def usage_stats() -> dict:
+    """
+    {"bytes", "files", "groups", "huellas_bytes"} según el catálogo; "bytes"
+    incluye el índice de huellas acústicas (huellas.sqlite).
+    """
+    with closing(_connect()) as con:
+        row = con.execute("SELECT COALESCE(SUM(size), 0), COUNT(*), COUNT(DISTINCT grupo) FROM outputs").fetchone()
+    huellas = _sqlite_bytes(FINGERPRINT_PATH)
+    return {"bytes": int(row[0]) + huellas, "files": int(row[1]), "groups": int(row[2]), "huellas_bytes": huellas}
+
+
+def run_ids() -> set[str]:
+    """Corridas registradas (terminadas)."""
+    with closing(_connect()) as con:
+        return {r[0] for r in con.execute("SELECT run_id FROM runs")}
+
+
+def all_paths() -> list[str]:
+    with closing(_connect()) as con:
+        return [r[0] for r in con.execute("SELECT path FROM outputs")]
+
+
+# =========================
+# Reindexado (archivos previos al catálogo)
+# =========================
+
+def _reindex(con: sqlite3.Connection, root: Path) -> int:
+    rows = []
+    for dirpath, _dirs, names in os.walk(str(root)):
+        for name in names:
+            low = name.lower()
+            if not low.endswith(CATALOG_EXTS) or f"{PART_MARKER}." in low:
+                continue
+            p = Path(dirpath) / name
+            try:
+                st_ = p.stat()
+            except OSError:
+                continue
+            grupo = group_for(str(p))
+            rows.append(
+                (None, grupo, tipo_for(grupo), None, p.suffix.lower().lstrip("."), str(p), int(st_.st_size), float(st_.st_mtime), None, None)
+            )
+    con.executemany(
+        """
+        INSERT OR IGNORE INTO outputs (run_id, grupo, tipo, archivo, ext, path, size, mtime, duracion_sec, infracciones)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    con.commit()
+    return len(rows)
+
+
+def reindex(root: Path | None = None) -> int:
+    """
+    Re-escanea la carpeta de transcripciones: agrega archivos que no estén en
+    el catálogo y quita los que ya no existen. Devuelve cuántos se revisaron.
+    """
+    with closing(_connect()) as con:
+        n = _reindex(con, Path(root or BACKUP_DIR))
+        gone = [(r[0],) for r in con.execute("SELECT path FROM outputs") if not os.path.exists(r[0])]
+        if gone:
+            con.executemany("DELETE FROM outputs WHERE path = ?", gone)
+            con.commit()
+    return n
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Transcripción por canal. En muchas capturas cada parte de la comunicación
+# de radio va en un canal del estéreo: transcribir cada canal por separado da
+# la separación de hablantes gratis (sin pyannote) y evita que la mezcla
+# superponga dos voces en el mismo segmento.
+#
+# Los canales de cada tramo se preparan en paralelo (extracción, descarte de
+# canales en silencio y preprocesamiento), pero las llamadas al modelo se
+# serializan con un lock por modelo: Whisper instala hooks de caché de
+# atención sobre el propio modelo en cada decodificación, así que dos llamadas
+# simultáneas sobre la misma instancia se pisan (y torch ya reparte cada
+# llamada entre todos los hilos). El modelo cacheado de la app es uno solo
+# para todas las sesiones, así que todo uso pasa por `model_lock`: tramos
+# (engine.transcribe_range), canales, monitoreo en vivo y detección de idioma.
+
+SILENT_RMS = 0.003            # canal por debajo de esto en el tramo: no se transcribe
+
+_model_locks: "weakref.WeakKeyDictionary[object, threading.Lock]" = weakref.WeakKeyDictionary()
+_model_locks_guard = threading.Lock()
+
+
+def model_lock(model) -> threading.Lock:
+    """
+    Lock de esta instancia del modelo; tomarlo alrededor de cada
+    `transcribe` / `detect_language`.
+    """
+    with _model_locks_guard:
+        lock = _model_locks.get(model)
+        if lock is None:
+            lock = _model_locks[model] = threading.Lock()
+        return lock
+
+
+def channel_label(channel: int) -> str:
+    """Nombre de hablante de un canal (base 0)."""
+    return f"Canal {channel + 1}"
+
+
+class ChannelTranscriber:
+    """
+    `transcribe(start_sec, end_sec, lang)` devuelve un resultado con la forma
+    de `model.transcribe` ({"segments": [...]}, tiempos relativos al tramo)
+    con los segmentos de todos los canales ordenados por inicio y el canal
+    en `seg["speaker"]`. Como los tramos avanzan en orden, las salidas
+    quedan intercaladas por tiempo. Con `timer`, el tiempo de pared del
+    tramo se reparte en "asr" (llamadas al modelo) y "canales" (lectura,
+    preprocesamiento y espera que no se solapó con el modelo).
+    """
+
+    def __init__(self, model, source, word_timestamps: bool = True, preprocessor=None) -> None:
+        self.model = model
+        self.source = source
+        self.word_timestamps = bool(word_timestamps)
+        self.preprocessor = preprocessor
+        self.channels = int(source.channels)
+        self.lock = model_lock(model)
+        self.silent = {channel_label(c): 0 for c in range(self.channels)}
+        self.timings: dict[str, float] = {}
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, min(self.channels, os.cpu_count() or 1)), thread_name_prefix="canal"
+        )
+
+    def _add(self, name: str, seconds: float) -> None:
+        with self._stats_lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def _one(self, channel: int, data: np.ndarray, lang: str | None) -> list[dict]:
+        import soundfile as sf
+
+        from enacom_transcriptor.engine import _mktemp_wav
+
+        label = channel_label(channel)
+        mono = np.ascontiguousarray(data[:, channel])
+        if not len(mono) or float(np.sqrt(np.mean(np.square(mono, dtype=np.float64)))) < SILENT_RMS:
+            with self._stats_lock:
+                self.silent[label] += 1
+            return []
+
+        options = dict(language=lang, verbose=False, fp16=False, word_timestamps=self.word_timestamps)
+        seg_path = None
+        t0 = time.perf_counter()
+        if self.preprocessor is not None and self.preprocessor.enabled:
+            audio = self.preprocessor(mono, self.source.samplerate)
+        else:
+            seg_path = _mktemp_wav()
+            sf.write(seg_path, mono, self.source.samplerate)
+            audio = seg_path
+        self._add("preproceso", time.perf_counter() - t0)
+
+        try:
+            with self.lock:
+                t0 = time.perf_counter()
+                result = self.model.transcribe(audio, **options)
+                self._add("asr", time.perf_counter() - t0)
+        finally:
+            if seg_path:
+                try:
+                    os.remove(seg_path)
+                except Exception:
+                    pass
+        segments = result.get("segments", []) if isinstance(result, dict) else []
+        return [{**s, "speaker": label} for s in segments]
+
+    def transcribe(self, start_sec: float, end_sec: float, lang: str | None = None, timer=None) -> dict:
+        t0 = time.perf_counter()
+        asr_0 = self.timings.get("asr", 0.0)
+        try:
+            return self._transcribe(start_sec, end_sec, lang)
+        finally:
+            if timer is not None:
+                asr = self.timings.get("asr", 0.0) - asr_0
+                timer.add("asr", asr)
+                timer.add("canales", max(0.0, time.perf_counter() - t0 - asr))
+
+    def _transcribe(self, start_sec: float, end_sec: float, lang: str | None) -> dict:
+        data = self.source.read(start_sec, end_sec)
+        if data.ndim == 1:
+            data = data[:, None]
+        futures = [self._pool.submit(self._one, c, data, lang) for c in range(self.channels)]
+        # Si un canal falla se propaga el error, igual que con la mezcla.
+        segments = [s for f in futures for s in f.result()]
+        segments.sort(key=lambda s: (float(s.get("start", 0.0)), s["speaker"]))
+        return {"segments": segments}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def summary(self) -> dict:
+        return {"canales": self.channels, "tramos_en_silencio": dict(self.silent)}
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import re
+import subprocess
+import threading
+from collections import deque
+from typing import Iterator
+
+import numpy as np
+
+from enacom_transcriptor.runtime import ensure_ffmpeg
+
+
+# Whisper trabaja a 16 kHz mono.
+WHISPER_SR = 16000
+
+
+# Formatos que se aceptan en la carga y en la vigilancia de carpetas. Todo lo
+# que no sea WAV/FLAC/AIFF se decodifica con ffmpeg (ver ingest.open_audio).
+AUDIO_EXTENSIONS = (
+    "wav", "mp3", "m4a", "aac", "flac", "ogg", "opus", "amr", "wma", "aiff",
+    "mp4", "mkv", "webm", "mov", "3gp",
+)
+
+# Canales por layout de ffmpeg ("stereo", "5.1(side)", ...).
+_LAYOUT_CHANNELS = {
+    "mono": 1, "stereo": 2, "2.1": 3, "3.0": 3, "3.0(back)": 3, "quad": 4, "quad(side)": 4,
+    "4.0": 4, "4.1": 5, "5.0": 5, "5.0(side)": 5, "5.1": 6, "5.1(side)": 6, "6.0": 6,
+    "6.1": 7, "7.0": 7, "7.1": 8, "7.1(wide)": 8, "octagonal": 8,
+}
+# stderr de ffmpeg en procesos largos: un hilo lo vacía y guarda solo las
+# últimas líneas. Sin leerlo, un stream de días con errores de red
+# intermitentes llena el pipe y ffmpeg se bloquea escribiendo.
+STDERR_TAIL_LINES = 50
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_AUDIO_STREAM_RE = re.compile(r"Stream #\S+.*?Audio:[^,]*,\s*(\d+)\s*Hz,\s*([^,\n]+)")
+
+
+def ffmpeg_pcm_args(
+    ffmpeg: str,
+    source: str,
+    sr: int = WHISPER_SR,
+    follow: bool = False,
+    *,
+    sample_fmt: str = "s16le",
+    channels: int | None = 1,
+    channel: int | None = None,
+    start_sec: float = 0.0,
+) -> list[str]:
+    """
+    Línea de ffmpeg que decodifica `source` a PCM por stdout (por defecto
+    s16le mono).
+
+    - "-" lee de la entrada estándar del proceso.
+    - `follow`: archivo que sigue creciendo (grabación en curso); ffmpeg
+      espera datos nuevos en lugar de terminar en el fin de archivo.
+    - Cualquier otra cosa (archivo, URL http/rtsp/udp, dispositivo) se pasa tal cual.
+    - `sample_fmt`: "s16le" o "f32le".
+    - `channels`: 1 mezcla a mono; None conserva los canales originales.
+    - `channel`: extrae solo ese canal (base 0) en lugar de mezclar.
+    - `start_sec`: posición inicial (seek de entrada, sin decodificar lo previo).
+    """
+    args = [ffmpeg, "-hide_banner", "-loglevel", "error"]
+    if source == "-":
+        src = "pipe:0"
+    else:
+        args.append("-nostdin")
+        src = source
+        if follow:
+            args += ["-follow", "1"]
+            if "://" not in source and not source.startswith("file:"):
+                src = f"file:{source}"
+    if start_sec > 0:
+        args += ["-ss", f"{start_sec:.6f}"]
+    args += ["-i", src, "-vn", "-map", "0:a:0"]
+    if channel is not None:
+        args += ["-af", f"pan=mono|c0=c{int(channel)}"]
+    elif channels:
+        args += ["-ac", str(int(channels))]
+    return args + ["-ar", str(int(sr)), "-f", sample_fmt, "pipe:1"]
+
+
+def probe_audio(path: str) -> dict:
+    """
+    Duración, frecuencia y canales de la primera pista de audio según
+    `ffmpeg -i` (no hace falta ffprobe). `duration` es None si el contenedor
+    no la informa (p. ej. AMR o streams sin índice).
+    """
+    ffmpeg = ensure_ffmpeg()
+    if not ffmpeg:
+        raise RuntimeError("No se encontró ffmpeg.")
+    proc = subprocess.run(
+        [ffmpeg, "-hide_banner", "-nostdin", "-i", str(path)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=60,
+    )
+    info = proc.stderr.decode("utf-8", "replace")
+    stream = _AUDIO_STREAM_RE.search(info)
+    if stream is None:
+        raise RuntimeError(f"El archivo no tiene pista de audio legible: {info.strip().splitlines()[-1:] or ''}")
+
+    layout = stream.group(2).strip()
+    n = re.match(r"(\d+)\s+channels", layout)
+    channels = int(n.group(1)) if n else _LAYOUT_CHANNELS.get(layout, _LAYOUT_CHANNELS.get(layout.split("(")[0], 1))
+
+    duration = None
+    d = _DURATION_RE.search(info)
+    if d:
+        duration = int(d.group(1)) * 3600 + int(d.group(2)) * 60 + float(d.group(3))
+    return {"samplerate": int(stream.group(1)), "channels": channels, "duration": duration}
+
+
+def _drain(pipe, tail: deque) -> None:
+    try:
+        for line in iter(pipe.readline, b""):
+            tail.append(line.decode("utf-8", "replace").rstrip())
+    except (OSError, ValueError):
+        pass  # pipe cerrado por close_stream
+
+
+def popen_pcm(args: list[str], stdin=subprocess.DEVNULL) -> subprocess.Popen:
+    """
+    Lanza ffmpeg con el PCM por `proc.stdout` y stderr vaciado en segundo
+    plano (últimas STDERR_TAIL_LINES líneas en `proc.stderr_tail`).
+    """
+    proc = subprocess.Popen(args, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    proc.stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    proc.stderr_thread = threading.Thread(
+        target=_drain, args=(proc.stderr, proc.stderr_tail), name="ffmpeg-stderr", daemon=True
+    )
+    proc.stderr_thread.start()
+    return proc
+
+
+def open_pcm_stream(source: str, sr: int = WHISPER_SR, follow: bool = False) -> subprocess.Popen:
+    """Lanza ffmpeg sobre `source`; el PCM sale por `proc.stdout`."""
+    ffmpeg = ensure_ffmpeg()
+    if not ffmpeg:
+        raise RuntimeError("No se encontró ffmpeg.")
+    return popen_pcm(ffmpeg_pcm_args(ffmpeg, source, sr, follow), stdin=None if source == "-" else subprocess.DEVNULL)
+
+
+def read_exact(stream, nbytes: int) -> bytes:
+    """Lee hasta `nbytes` de un pipe (menos solo si se cerró)."""
+    buf = bytearray()
+    while len(buf) < nbytes:
+        data = stream.read(nbytes - len(buf))
+        if not data:
+            break
+        buf += data
+    return bytes(buf)
+
+
+def iter_pcm(proc: subprocess.Popen, chunk_sec: float = 2.0, sr: int = WHISPER_SR) -> Iterator[np.ndarray]:
+    """
+    Bloques float32 en [-1, 1] de `chunk_sec` segundos (el último puede ser
+    más corto) hasta que ffmpeg cierra la salida.
+    """
+    need = max(2, int(chunk_sec * sr) * 2)
+    buf = bytearray()
+    while True:
+        data = proc.stdout.read(need - len(buf))
+        if not data:
+            break
+        buf += data
+        if len(buf) >= need:
+            yield np.frombuffer(bytes(buf), dtype="<i2").astype(np.float32) / 32768.0
+            buf.clear()
+    usable = len(buf) // 2 * 2
+    if usable:
+        yield np.frombuffer(bytes(buf[:usable]), dtype="<i2").astype(np.float32) / 32768.0
+
+
+def close_stream(proc: subprocess.Popen | None) -> str:
+    """Termina ffmpeg (si sigue vivo) y devuelve las últimas líneas de stderr."""
+    if proc is None:
+        return ""
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    drain = getattr(proc, "stderr_thread", None)
+    if drain is not None:
+        drain.join(timeout=2)
+        err = "\n".join(proc.stderr_tail)
+    else:
+        try:
+            err = (proc.stderr.read() if proc.stderr else b"").decode("utf-8", "replace")
+        except Exception:
+            err = ""
+    for f in (proc.stdout, proc.stderr):
+        try:
+            if f:
+                f.close()
+        except Exception:
+            pass
+    return err.strip()
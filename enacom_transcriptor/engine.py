@@ -0,0 +1,888 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import math
+import os
+import pickle
+import tempfile
+import time
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable
+
+from enacom_transcriptor import catalog, metrics
+from enacom_transcriptor.channels import ChannelTranscriber, model_lock
+from enacom_transcriptor.exporters import (
+    append_to_excel,
+    ensure_excel_file,
+    generar_informe_word,
+    write_infracciones_excel,
+    write_revision_excel,
+)
+from enacom_transcriptor.fingerprint import Dedup, transcript_settings
+from enacom_transcriptor.filters import SegmentFilter, merge_counts
+from enacom_transcriptor.infracciones import detectar_infracciones_en_texto
+from enacom_transcriptor.ingest import AudioSource, open_audio, peak_rss_bytes, reset_peak_rss
+from enacom_transcriptor.language import DEFAULT_THRESHOLD, LanguagePin
+from enacom_transcriptor.packager import RunZipWriter
+from enacom_transcriptor.paths import BACKUP_DIR, finalize_partial, partial_base, partial_path, run_active, unique_dir
+from enacom_transcriptor.preprocess import Preprocessor
+from enacom_transcriptor.profiling import RunProfiler, StageTimer
+from enacom_transcriptor.segments import FileInfo, InfraccionTable, Interner, SegmentStore, format_line
+from enacom_transcriptor.sinks import SinkSet, open_sinks, segment_record
+from enacom_transcriptor.storage import TEMP_PREFIX, temp_dir
+from enacom_transcriptor.timefmt import hhmmss, hhmmss_cs
+from enacom_transcriptor.tuning import AutoTuner
+
+
+# Motor de transcripción sin Streamlit. Es el único pipeline por archivo y
+# por corrida: run_processing lo maneja con sus callbacks de UI (ver
+# RunHooks) y la vigilancia de carpetas con el logger del servicio.
+
+_logger = logging.getLogger("enacom.engine")
+
+IND_HEADERS = ("Inicio", "Fin", "Hablante", "Texto")
+LOTE_HEADERS = ("Archivo", "Inicio", "Fin", "Hablante", "Texto")
+
+
+def _mktemp_wav() -> str:
+    fd, p = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=".wav", dir=temp_dir())
+    os.close(fd)
+    return p
+
+
+def transcribe_range(
+    model,
+    source: AudioSource,
+    start_sec: float,
+    end_sec: float,
+    lang: str | None = None,
+    word_timestamps: bool = True,
+    timer: StageTimer | None = None,
+    preprocessor: Preprocessor | None = None,
+) -> dict:
+    """
+    Transcribe un tramo del audio y devuelve el resultado de
+    `model.transcribe`. Con `preprocessor` (activo) el tramo se lleva a
+    16 kHz mono en memoria y se pasa como array; si no, se vuelca a un WAV
+    temporal y Whisper lo decodifica con ffmpeg. Con `timer` se miden por
+    separado "segmentacion", "preproceso" y "asr" (sin la espera del
+    model_lock, que se toma alrededor de la llamada al modelo).
+    """
+    import soundfile as sf
+
+    timer = timer or StageTimer()
+    options = dict(language=lang, verbose=False, fp16=False, word_timestamps=word_timestamps)
+    if preprocessor is not None and preprocessor.enabled:
+        with timer.stage("segmentacion"):
+            data = source.read(start_sec, end_sec)
+        with timer.stage("preproceso"):
+            audio = preprocessor(data, source.samplerate)
+        del data
+        with model_lock(model), timer.stage("asr"):
+            return model.transcribe(audio, **options)
+
+    seg_path = _mktemp_wav()
+    try:
+        with timer.stage("segmentacion"):
+            sf.write(seg_path, source.read(start_sec, end_sec), source.samplerate)
+        with model_lock(model), timer.stage("asr"):
+            return model.transcribe(seg_path, **options)
+    finally:
+        try:
+            os.remove(seg_path)
+        except Exception:
+            pass
+
+
+# =========================
+# Callbacks de la corrida
+# =========================
+
+class RunHooks:
+    """
+    Todo lo que una corrida informa hacia afuera. Por defecto los mensajes
+    van a `log` (una línea cada uno; sin `log`, al logger "enacom.engine") y
+    `on_segment(rec)` recibe cada registro (esquema de sinks) apenas se
+    transcribe; el resto no hace nada. run_processing la extiende para el
+    panel de Streamlit.
+    """
+
+    def __init__(self, log: Callable[[str], None] | None = None, on_segment: Callable[[dict], None] | None = None) -> None:
+        self.log = log or _logger.info
+        self.on_segment = on_segment
+
+    # Mensajes
+    def info(self, msg: str, icon: str | None = None) -> None:
+        self.log(msg)
+
+    def caption(self, msg: str) -> None:
+        self.log(msg)
+
+    def warning(self, msg: str) -> None:
+        self.log(msg)
+
+    def error(self, msg: str) -> None:
+        self.log(msg)
+
+    def busy(self, label: str):
+        """Contexto alrededor de una espera larga (idioma, huella, diarización)."""
+        return nullcontext()
+
+    # Avance
+    def file_started(self, idx: int, archivo: str, audio_path: str, source, num_segments: int, por_canal: bool) -> None:
+        pass
+
+    def segment(self, store: SegmentStore, seg_idx: int, rec: dict) -> None:
+        if self.on_segment is not None:
+            self.on_segment(rec)
+
+    def progress(self, done: int, num_segments: int, errores: int, seg_rate: float, eta_sec: int) -> None:
+        pass
+
+    def file_done(self, idx: int, result: dict) -> None:
+        pass
+
+    def files_progress(self, done: int, total: int) -> None:
+        pass
+
+    # Salidas de la corrida
+    def lote_done(self, outputs: list[str]) -> None:
+        pass
+
+    def package_done(self, zip_path: str) -> None:
+        pass
+
+
+def _speaker_for(t: float, diar: list[dict] | None) -> str:
+    if not diar:
+        return ""
+    for s in diar:
+        if float(s.get("start", 0.0)) <= t <= float(s.get("end", 0.0)):
+            return str(s.get("speaker", "") or "")
+    return ""
+
+
+def _finalize(paths: list[str], hooks: RunHooks) -> list[str]:
+    """
+    Renombra las salidas terminadas (.~part.ext -> .ext). El rename es atómico:
+    el historial y las descargas nunca ven un archivo a medio escribir.
+    """
+    out: list[str] = []
+    for p in paths:
+        if not p or not os.path.exists(p):
+            continue
+        try:
+            out.append(finalize_partial(p))
+        except OSError as e:
+            hooks.warning(f"No se pudo finalizar {Path(p).name}: {e}")
+    return out
+
+
+def _zip_add(
+    run_zip: RunZipWriter | None,
+    paths: list[str],
+    hooks: RunHooks,
+    arcname: str | None = None,
+    root: Path | None = None,
+) -> RunZipWriter | None:
+    """
+    Agrega archivos terminados al ZIP de la corrida (con `root`, respetando
+    las subcarpetas relativas a la carpeta de la corrida). Si el ZIP falla se
+    descarta (se avisa una vez) y la corrida sigue sin paquete.
+    """
+    if run_zip is None:
+        return None
+    try:
+        if arcname is not None:
+            run_zip.add(paths[0], arcname=arcname)
+        else:
+            for p in paths:
+                rel = os.path.relpath(p, root) if root is not None else Path(p).name
+                run_zip.add(p, arcname=rel.replace(os.sep, "/"))
+        return run_zip
+    except Exception as e:
+        hooks.warning(f"No se pudo armar el paquete ZIP: {e}")
+        run_zip.abort()
+        return None
+
+
+def _catalog_safe(hooks: RunHooks, what: str, fn, *args, **kwargs) -> None:
+    """El catálogo del historial nunca debe cortar un procesamiento."""
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        hooks.log(f"No se pudo registrar {what} en el catálogo: {e}")
+
+
+def _save_progress(path: str, next_segment: int, store: SegmentStore) -> None:
+    try:
+        with open(path, "wb") as f:
+            pickle.dump({"next_segment": next_segment, "segments_done": store}, f)
+    except Exception:
+        pass
+
+
+# =========================
+# Un archivo
+# =========================
+
+def process_file(
+    model,
+    audio_path: str,
+    cfg: dict,
+    run_dir: Path,
+    run_base: str,
+    archivo: str | None = None,
+    canal: int | None = None,
+    idx: int = 0,
+    speakers: Interner | None = None,
+    hooks: RunHooks | None = None,
+    timer: StageTimer | None = None,
+    tuner: AutoTuner | None = None,
+    preprocessor: Preprocessor | None = None,
+    lote: dict | None = None,
+    alertas=None,
+) -> dict:
+    """
+    Transcribe un archivo completo y escribe sus salidas individuales
+    (TXT, XLSX, JSONL/Parquet, SRT/VTT y, fuera del modo combinado, DOCX) en
+    `run_dir/<nombre>/`, con renombrado atómico al terminar y registro en el
+    catálogo. `canal` (base 0) elige un canal de la fuente; None = mezcla.
+
+    Con `lote` (ver `_open_lote`) cada segmento también va a las salidas
+    consolidadas de la corrida. Las infracciones se envían a `alertas` (un
+    AlertDispatcher) y el avance a `hooks`. `timer` acumula los tiempos por
+    etapa; `tuner` define los tramos (por defecto, según
+    cfg["segment_duration"] / cfg["auto_tune"]) y `preprocessor` el
+    preprocesamiento (por defecto, según cfg["preproceso"]).
+
+    Devuelve {"archivo", "file_base", "outputs", "txt", "xlsx", "docx",
+    "duracion_sec", "infracciones", "revision", "segments", "errores",
+    "idioma", "filtrados", "canales", "reutilizado", "diarizacion",
+    "peak_rss_mb"}.
+    """
+    archivo = archivo or Path(audio_path).name
+    hooks = hooks or RunHooks()
+    infracciones_cfg = cfg.get("infracciones") or []
+    coincidencia_parcial = bool(cfg.get("coincidencia_parcial", True))
+    segment_duration = int(cfg.get("segment_duration", 30))
+    lang = cfg.get("lang")  # None => auto
+    model_size = cfg.get("model_size", "")
+    word_timestamps = bool(cfg.get("word_timestamps", True))
+    formats = (("jsonl", "parquet") if cfg.get("machine_outputs", True) else ()) + (
+        ("srt", "vtt") if cfg.get("subtitles", True) else ()
+    )
+
+    timer = timer or StageTimer()
+    tuner = tuner or AutoTuner(bool(cfg.get("auto_tune", False)), segment_duration, model_size)
+    preprocessor = preprocessor or Preprocessor(cfg.get("preproceso"))
+
+    reset_peak_rss()
+    # El audio se lee por tramos desde el archivo (nunca entero en memoria),
+    # con soundfile o con el pipe de ffmpeg según el formato.
+    with timer.stage("decode"):
+        try:
+            source = open_audio(audio_path, canal)
+        except ValueError as e:
+            if canal is None:
+                raise
+            hooks.warning(f"{archivo}: {e} Se usa la mezcla de canales.")
+            source = open_audio(audio_path)
+
+    channel_tx = None
+    try:
+        total_duration = source.duration
+        num_segments = tuner.estimate(0, 0.0, total_duration)
+        cpu_pre_0 = preprocessor.cpu_sec
+
+        # Con "auto", el idioma se detecta una vez por archivo (ver language.py).
+        pin = LanguagePin(
+            model, source, lang,
+            float(cfg.get("lang_threshold", DEFAULT_THRESHOLD)), float(cfg.get("lang_recheck_sec", 0.0) or 0.0),
+            preprocessor=preprocessor,
+        )
+        if lang is None:
+            with timer.stage("idioma"), hooks.busy("Detectando idioma…"):
+                pin.detect()
+            if pin.lang is None:
+                hooks.info(f"{archivo}: idioma no concluyente; Whisper lo detecta por segmento.")
+
+        # Un canal por hablante en grabaciones estéreo/multipista (ver channels.py).
+        if cfg.get("por_canal") and source.channels > 1:
+            channel_tx = ChannelTranscriber(model, source, word_timestamps, preprocessor=preprocessor)
+            hooks.caption(f"Transcripción por canal: {source.channels} canales, cada uno como hablante.")
+
+        def _asr(a: float, b: float) -> dict:
+            if channel_tx is not None:
+                return channel_tx.transcribe(a, b, pin.lang, timer=timer)
+            return transcribe_range(
+                model, source, a, b, pin.lang, word_timestamps, timer=timer, preprocessor=preprocessor
+            )
+
+        # Audio ya transcripto en corridas anteriores se reutiliza (ver fingerprint.py).
+        dedup = None
+        if cfg.get("deduplicar", True):
+            try:
+                with timer.stage("huella"), hooks.busy("Buscando audio ya transcripto…"):
+                    dedup = Dedup(source, transcript_settings(cfg, pin.lang, channel_tx is not None))
+                if dedup.regions:
+                    hooks.info(
+                        f"{archivo}: {hhmmss(int(dedup.covered_sec))} ya transcriptos en "
+                        f"{', '.join(dedup.summary()['de'])}; se reutilizan y solo se transcribe el audio nuevo.",
+                        icon="♻️",
+                    )
+            except Exception as e:
+                dedup = None
+                hooks.info(f"Huella acústica no disponible para {archivo}: {e}")
+
+        diar = None
+        if cfg.get("diarization") and channel_tx is not None:
+            hooks.info("Con transcripción por canal el hablante es el canal; se omite la diarización.")
+        elif cfg.get("diarization"):
+            try:
+                from enacom_transcriptor.diarization import diarize_audio
+
+                with timer.stage("diarizacion"), hooks.busy("Diarización (experimental)…"):
+                    diar = diarize_audio(source.read(), source.samplerate)
+            except Exception:
+                diar = None
+            if diar is None:
+                hooks.info("Diarización no disponible. Se continúa sin hablantes.")
+
+        with timer.stage("ui"):
+            hooks.file_started(idx, archivo, audio_path, source, num_segments, channel_tx is not None)
+
+        file_base = os.path.splitext(archivo)[0]
+        file_dir = unique_dir(Path(run_dir) / file_base)
+        # Las salidas se escriben como .~part.ext y se renombran al terminar.
+        txt_path = partial_path(str(file_dir / f"{file_base}.txt"))
+        xlsx_path = partial_path(str(file_dir / f"{file_base}.xlsx"))
+        docx_path = partial_path(str(file_dir / f"{file_base}.docx"))
+        progress_path = str(file_dir / f"{file_base}_progreso.pkl")
+
+        ensure_excel_file(xlsx_path, {"Transcripción": IND_HEADERS})
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(f"Transcripción iniciada: {datetime.datetime.now():%Y-%m-%d %H:%M:%S}\n")
+            f.write(f"Archivo: {archivo}\n\n")
+
+        outputs = [txt_path, xlsx_path]
+        sinks = open_sinks(partial_base(str(file_dir / file_base)), formats)
+        for err in sinks.errors:
+            hooks.info(f"Salida omitida para {archivo} — {err}")
+        # Al cerrar solo se informan los errores nuevos (los de apertura ya se mostraron).
+        n_open = len(sinks.errors)
+
+        if lote is not None:
+            with open(lote["txt"], "a", encoding="utf-8") as f:
+                f.write("\n\n" + "=" * 70 + "\n")
+                f.write(f"ARCHIVO: {archivo}\n")
+                f.write("=" * 70 + "\n\n")
+        lote_sinks = lote["sinks"] if lote is not None else SinkSet()
+
+        store = SegmentStore(archivo=archivo, speakers=speakers)
+        infracciones = InfraccionTable()
+        errores = 0
+        seg_filter = SegmentFilter(cfg.get("filtro"), [t.get("termino", "") for t in infracciones_cfg])
+
+        t0 = time.time()
+        for i, start_sec, end_sec in tuner.ranges(total_duration):
+            num_segments = tuner.estimate(i, start_sec, total_duration)
+            result = {}
+
+            with timer.stage("idioma"):
+                if pin.recheck(start_sec):
+                    hooks.info(f"{archivo}: cambio de idioma a '{pin.lang}' desde {hhmmss(int(start_sec))}.", icon="🌐")
+
+            tuner.before()
+            t_seg = time.perf_counter()
+            try:
+                if dedup is not None and dedup.regions:
+                    result, audio_sec = dedup.transcribe(start_sec, end_sec, _asr)
+                else:
+                    result, audio_sec = _asr(start_sec, end_sec), end_sec - start_sec
+                if audio_sec > 0:
+                    metrics.record_segment(model_size, audio_sec, time.perf_counter() - t_seg)
+                if tuner.after(audio_sec, time.perf_counter() - t_seg):
+                    hooks.info(
+                        f"Ajuste automático: segmentos de {tuner.segment_duration} s "
+                        f"(RTF medido {tuner.rtf:.2f} con {tuner.threads or '—'} hilos).",
+                        icon="⚙️",
+                    )
+            except Exception as e:
+                errores += 1
+                metrics.record_segment(model_size, end_sec - start_sec, time.perf_counter() - t_seg, ok=False)
+                hooks.error(f"Error en el segmento {i+1} del archivo {archivo}: {e}")
+                _save_progress(progress_path, i + 1, store)
+
+            for s in result.get("segments", []) if isinstance(result, dict) else []:
+                mid = (float(s.get("start", 0)) + float(s.get("end", 0))) / 2.0 + start_sec
+                spk = s.get("speaker") or _speaker_for(mid, diar)
+
+                motivo = seg_filter.check(s)
+                if motivo is not None:
+                    if seg_filter.drop:
+                        continue
+                    s = seg_filter.mark(s)
+
+                with timer.stage("store"):
+                    seg_idx = store.append_whisper(s, offset=start_sec, speaker=spk)
+                if seg_idx is None:
+                    continue
+                s_text = store.texts[seg_idx]
+                s_start = float(store.start[seg_idx])
+                s_end = float(store.end[seg_idx])
+                ini_h, fin_h = hhmmss(int(s_start)), hhmmss(int(s_end))
+                line = format_line(s_start, s_end, spk, s_text) + "\n"
+
+                with timer.stage("txt"):
+                    with open(txt_path, "a", encoding="utf-8") as f:
+                        f.write(line)
+                    if lote is not None:
+                        with open(lote["txt"], "a", encoding="utf-8") as f:
+                            f.write(line)
+
+                with timer.stage("xlsx"):
+                    append_to_excel(
+                        xlsx_path, [ini_h, fin_h, spk, s_text], sheet_name="Transcripción", headers=IND_HEADERS
+                    )
+                    if lote is not None:
+                        append_to_excel(
+                            lote["xlsx"],
+                            [archivo, ini_h, fin_h, spk, s_text],
+                            sheet_name="Transcripción",
+                            headers=LOTE_HEADERS,
+                        )
+
+                nuevos = []
+                if motivo is None:
+                    with timer.stage("infracciones"):
+                        nuevos = detectar_infracciones_en_texto(
+                            archivo=archivo,
+                            texto=s_text,
+                            inicio=ini_h,
+                            fin=fin_h,
+                            infracciones_cfg=infracciones_cfg,
+                            coincidencia_parcial=coincidencia_parcial,
+                            palabras=store.words_of(seg_idx),
+                        )
+                for inf in nuevos:
+                    infracciones.add(
+                        archivo=archivo,
+                        termino=inf["termino"],
+                        seg_start=s_start,
+                        seg_end=s_end,
+                        texto=s_text,
+                        speaker=spk,
+                        t_inicio=inf.get("t_inicio", math.nan),
+                        t_fin=inf.get("t_fin", math.nan),
+                    )
+                    if alertas is not None:
+                        alertas.push({**inf, "speaker": spk})
+
+                rec = segment_record(
+                    archivo=archivo,
+                    start=s_start,
+                    end=s_end,
+                    speaker=spk,
+                    text=s_text,
+                    confidence=store.confidence_of(seg_idx),
+                    terminos=[inf["termino"] for inf in nuevos],
+                )
+                with timer.stage("sinks"):
+                    sinks.write(rec)
+                    lote_sinks.write(rec)
+                with timer.stage("ui"):
+                    hooks.segment(store, seg_idx, rec)
+
+            with timer.stage("progreso"):
+                _save_progress(progress_path, i + 1, store)
+
+            elapsed = time.time() - t0
+            seg_rate = (i + 1) / elapsed if elapsed > 0 else 0.0
+            eta = int((num_segments - (i + 1)) / seg_rate) if seg_rate > 0 else 0
+            with timer.stage("ui"):
+                hooks.progress(i + 1, num_segments, errores, seg_rate, eta)
+
+        with timer.stage("sinks"):
+            outputs.extend(sinks.close())
+        for err in sinks.errors[n_open:]:
+            hooks.warning(f"Error en salida de {archivo}: {err}")
+
+        canales = None
+        if channel_tx is not None:
+            channel_tx.close()
+            canales = channel_tx.summary()
+        # Solo se indexan transcripciones completas (sin tramos con error).
+        if dedup is not None and errores == 0 and len(store):
+            try:
+                dedup.register(archivo, store, run_id=run_base)
+            except Exception as e:
+                hooks.info(f"No se pudo guardar la huella de {archivo}: {e}")
+        try:
+            os.remove(progress_path)
+        except Exception:
+            pass
+
+        if preprocessor.enabled:
+            hooks.caption(
+                f"Preprocesamiento: {preprocessor.cpu_sec - cpu_pre_0:.2f} s de CPU "
+                f"({source.samplerate} Hz, {source.channels} canal/es → 16 kHz mono)"
+                + (f" — canal {source.channel + 1} de {source.source_channels}" if source.channel is not None else "")
+            )
+        if seg_filter.total:
+            c = seg_filter.counts
+            hooks.caption(
+                f"Segmentos {'descartados' if seg_filter.drop else 'marcados'} por el filtro: {seg_filter.total} "
+                f"(sin habla {c['sin_habla']}, repetición {c['repeticion'] + c['compresion']}, "
+                f"frases típicas {c['frase_conocida']})"
+            )
+        peak = peak_rss_bytes()
+        peak_mb = round(peak / 1024**2, 1) if peak is not None else None
+        if peak_mb is not None:
+            hooks.caption(f"Pico de memoria del proceso durante este archivo: {peak_mb:.1f} MB")
+
+        revision = [
+            {
+                "inicio": hhmmss_cs(r["start"]),
+                "fin": hhmmss_cs(r["end"]),
+                "confianza": round(r["confianza"], 3) if r["confianza"] == r["confianza"] else "",
+                "texto": r["text"],
+            }
+            for r in store.review_regions()
+        ]
+        with timer.stage("xlsx"):
+            write_infracciones_excel(xlsx_path, infracciones or None)
+            write_revision_excel(xlsx_path, revision)
+
+        # En el modo combinado el informe es uno solo, el del lote.
+        word_path = None
+        if lote is None:
+            meta = {
+                "generado": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "model_size": model_size,
+                "lang": (lang or "auto"),
+                "idioma_detectado": pin.label() if lang is None else "",
+                "segment_duration": tuner.segment_duration,
+                "total_files": 1,
+                "total_duration_hhmmss": hhmmss(int(total_duration)),
+                "diarization": bool(diar),
+                "por_canal": channel_tx is not None,
+                "zip": bool(cfg.get("export_zip", True)),
+            }
+            try:
+                with timer.stage("docx"):
+                    word_path = generar_informe_word(
+                        titulo=archivo,
+                        docx_out_path=docx_path,
+                        combinado=False,
+                        meta=meta,
+                        txt_path=txt_path,
+                        infracciones=infracciones or None,
+                        segmentos=store,
+                    )
+                if word_path and os.path.exists(word_path):
+                    outputs.append(word_path)
+            except Exception as e:
+                hooks.warning(f"No se pudo generar el DOCX (individual) para {archivo}: {e}")
+
+        outputs = _finalize(outputs, hooks)
+        final_of = {Path(p).suffix: p for p in outputs}
+
+        with timer.stage("catalogo"):
+            _catalog_safe(
+                hooks,
+                archivo,
+                catalog.register_outputs,
+                run_base,
+                catalog.group_for(str(file_dir / file_base)),
+                outputs,
+                archivo=archivo,
+                tipo=catalog.TIPO_IND,
+                duracion_sec=total_duration,
+                infracciones=len(infracciones),
+            )
+
+        store.compact()
+        if lote is not None:
+            lote["files_info"].append(
+                FileInfo(archivo, final_of.get(".txt"), total_duration, segments=store, idioma=pin.label())
+            )
+            lote["infracciones"].extend(infracciones)
+        metrics.record_file(model_size, ok=not (len(store) == 0 and errores > 0))
+        return {
+            "archivo": archivo,
+            "file_base": file_base,
+            "outputs": outputs,
+            "txt": final_of.get(".txt"),
+            "xlsx": final_of.get(".xlsx"),
+            "docx": final_of.get(".docx") if word_path else None,
+            "duracion_sec": total_duration,
+            "infracciones": infracciones,
+            "revision": revision,
+            "segments": store,
+            "errores": errores,
+            "idioma": pin.label(),
+            "filtrados": seg_filter.summary(),
+            "canales": canales,
+            "reutilizado": dedup.summary() if dedup is not None and dedup.reused_sec else None,
+            "diarizacion": bool(diar),
+            "peak_rss_mb": peak_mb,
+        }
+    finally:
+        if channel_tx is not None:
+            channel_tx.close()
+        source.close()
+
+
+# =========================
+# Una corrida
+# =========================
+
+def _open_lote(run_dir: Path, lote_base: str, formats: tuple[str, ...], hooks: RunHooks) -> dict:
+    """Salidas consolidadas del modo combinado (TXT, XLSX y JSONL/Parquet)."""
+    txt_path = partial_path(str(run_dir / f"{lote_base}.txt"))
+    xlsx_path = partial_path(str(run_dir / f"{lote_base}.xlsx"))
+    ensure_excel_file(xlsx_path, {"Transcripción": LOTE_HEADERS})
+    with open(txt_path, "w", encoding="utf-8") as f:
+        f.write(f"Transcripción consolidada ENACOM — {datetime.datetime.now():%Y-%m-%d %H:%M:%S}\n\n")
+    sinks = open_sinks(partial_base(str(run_dir / lote_base)), formats)
+    for err in sinks.errors:
+        hooks.info(f"Salida del lote omitida — {err}")
+    return {
+        "base": lote_base,
+        "txt": txt_path,
+        "xlsx": xlsx_path,
+        "docx": partial_path(str(run_dir / f"{lote_base}.docx")),
+        "sinks": sinks,
+        "sink_errors_open": len(sinks.errors),
+        "outputs": [txt_path, xlsx_path],
+        "infracciones": InfraccionTable(),
+        "files_info": [],
+    }
+
+
+def _close_lote(lote: dict, run_meta: dict, lang: str | None, timer: StageTimer, hooks: RunHooks) -> list[str]:
+    """Hojas de infracciones, informe DOCX del lote y renombrado final."""
+    files_info = lote["files_info"]
+    with timer.stage("xlsx"):
+        write_infracciones_excel(lote["xlsx"], lote["infracciones"] or None)
+
+    meta_lote = dict(run_meta)
+    if lang is None and run_meta.get("idiomas"):
+        conteo = Counter(label.split()[0] for label in run_meta["idiomas"].values())
+        meta_lote["idioma_detectado"] = ", ".join(f"{code} ×{n}" for code, n in conteo.most_common())
+    try:
+        with timer.stage("docx"):
+            word_path = generar_informe_word(
+                titulo=lote["base"],
+                docx_out_path=lote["docx"],
+                combinado=True,
+                meta=meta_lote,
+                infracciones=lote["infracciones"] or None,
+                files_info=files_info,
+            )
+        if word_path and os.path.exists(word_path):
+            lote["outputs"].append(word_path)
+    except Exception as e:
+        hooks.warning(f"No se pudo generar el DOCX (lote): {e}")
+
+    with timer.stage("sinks"):
+        lote["outputs"].extend(lote["sinks"].close())
+    for err in lote["sinks"].errors[lote["sink_errors_open"]:]:
+        hooks.warning(f"Error en salida del lote: {err}")
+    return _finalize(lote["outputs"], hooks)
+
+
+def _entrada(item) -> dict:
+    """
+    Normaliza un elemento de la corrida: una ruta, o un dict con "archivo" y
+    "ruta" (o "abrir", que devuelve la ruta de un temporal propio) y,
+    opcionalmente, "canal".
+    """
+    if isinstance(item, dict):
+        return item
+    return {"archivo": Path(item).name, "ruta": str(item)}
+
+
+def process_batch(
+    model,
+    entradas: list,
+    cfg: dict,
+    modo: str = "Individual",
+    hooks: RunHooks | None = None,
+    alertas=None,
+) -> dict:
+    """
+    Corrida completa: una carpeta `corrida_<fecha>` con una subcarpeta por
+    archivo, salidas consolidadas con modo="Combinado", ZIP escrito a medida
+    que cada archivo termina (cfg["export_zip"], activo si no se indica, y
+    cfg["zip_audio"]) y
+    registro de la corrida en el catálogo. `entradas` son rutas o dicts (ver
+    `_entrada`); un temporal de "abrir" se borra al terminar su archivo.
+    Devuelve el run_meta.
+    """
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Una carpeta por corrida y, dentro, una por archivo: dos sesiones en el
+    # mismo segundo o dos audios con el mismo nombre no se pisan.
+    run_dir = unique_dir(BACKUP_DIR / f"corrida_{timestamp}")
+    # Con ENACOM_PROFILE, perfil completo; se apaga aunque la corrida se corte.
+    with run_active(run_dir), RunProfiler(run_dir) as profiler:
+        return _run_batch(model, entradas, cfg, modo, hooks or RunHooks(), alertas, run_dir, timestamp, profiler)
+
+
+def _run_batch(
+    model, entradas: list, cfg: dict, modo: str, hooks: RunHooks, alertas, run_dir: Path, timestamp: str,
+    profiler: RunProfiler,
+) -> dict:
+    model_size = cfg.get("model_size", "")
+    lang = cfg.get("lang")
+    export_zip = bool(cfg.get("export_zip", True))
+    zip_audio = export_zip and bool(cfg.get("zip_audio", False))
+    combinado = modo == "Combinado"
+    run_base = run_dir.name
+
+    # Tiempo por etapa (run_meta["perfil"]).
+    timer = StageTimer()
+    # Con auto_tune, el primer tramo calibra la duración de segmento (ver tuning.py).
+    auto_tune = bool(cfg.get("auto_tune", False))
+    tuner = AutoTuner(auto_tune, int(cfg.get("segment_duration", 30)), model_size)
+    # Remuestreo/mezcla/normalización en memoria antes de Whisper (ver preprocess.py).
+    preprocessor = Preprocessor(cfg.get("preproceso"))
+    speakers = Interner()
+
+    # El ZIP se escribe en disco a medida que cada archivo termina.
+    run_zip: RunZipWriter | None = None
+    if export_zip:
+        try:
+            run_zip = RunZipWriter(str(run_dir / f"{run_base}.zip"), zstd=bool(cfg.get("zip_zstd", False)))
+        except Exception as e:
+            hooks.warning(f"No se pudo crear el paquete ZIP: {e}")
+
+    lote = None
+    if combinado:
+        # Subtítulos solo por archivo: en el lote los tiempos de cada archivo se superponen.
+        machine_formats = ("jsonl", "parquet") if cfg.get("machine_outputs", True) else ()
+        lote = _open_lote(run_dir, f"lote_{timestamp}", machine_formats, hooks)
+
+    t0 = time.time()
+    results = []
+    total = len(entradas)
+    for idx, item in enumerate(entradas):
+        entrada = _entrada(item)
+        archivo = entrada["archivo"]
+        metrics.set_queue_depth("lote", total - idx - 1)
+        tmp_path = r = None
+        try:
+            if entrada.get("ruta"):
+                path = entrada["ruta"]
+            else:
+                with timer.stage("decode"):
+                    path = tmp_path = entrada["abrir"]()
+            r = process_file(
+                model, path, cfg, run_dir, run_base,
+                archivo=archivo, canal=entrada.get("canal", cfg.get("canal")), idx=idx,
+                speakers=speakers, hooks=hooks, timer=timer, tuner=tuner, preprocessor=preprocessor,
+                lote=lote, alertas=alertas,
+            )
+            results.append(r)
+            if zip_audio:
+                run_zip = _zip_add(run_zip, [path], hooks, arcname=f"audio/{archivo}")
+            with timer.stage("zip"):
+                run_zip = _zip_add(run_zip, r["outputs"], hooks, root=run_dir)
+        except Exception as e:
+            metrics.record_file(model_size, ok=False)
+            hooks.error(f"No se pudo procesar {archivo}: {e}")
+        finally:
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+        if r is not None:
+            hooks.file_done(idx, r)
+        hooks.files_progress(idx + 1, total)
+    metrics.set_queue_depth("lote", 0)
+
+    total_dur = sum(r["duracion_sec"] for r in results)
+    infracciones_total = sum(len(r["infracciones"]) for r in results)
+    run_meta = {
+        "modo": modo,
+        "generado": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "model_size": model_size,
+        "lang": (lang or "auto"),
+        "segment_duration": tuner.segment_duration,
+        "total_files": len(results),
+        "total_duration_hhmmss": hhmmss(int(total_dur)),
+        "total_duration_sec": total_dur,
+        "infracciones_total": infracciones_total,
+        "archivos_con_infracciones": sum(1 for r in results if len(r["infracciones"])),
+        "archivos": [r["archivo"] for r in results],
+        "diarization": bool(cfg.get("diarization", False)),
+        "zip": export_zip,
+        "peak_rss_mb": {r["archivo"]: r["peak_rss_mb"] for r in results if r["peak_rss_mb"] is not None},
+        "idiomas": {r["archivo"]: r["idioma"] for r in results},
+        "filtrados": merge_counts([r["filtrados"] for r in results]),
+        "elapsed_sec": round(time.time() - t0, 2),
+    }
+    canales = {r["archivo"]: r["canales"] for r in results if r["canales"]}
+    if canales:
+        run_meta["por_canal"] = canales
+    reutilizado = {r["archivo"]: r["reutilizado"] for r in results if r["reutilizado"]}
+    if reutilizado:
+        run_meta["reutilizado"] = reutilizado
+    if auto_tune:
+        run_meta["autoajuste"] = tuner.summary()
+    if preprocessor.enabled:
+        run_meta["preproceso"] = preprocessor.summary()
+    if alertas is not None:
+        run_meta["alertas"] = alertas.stats()
+    perfil_path = profiler.stop()
+    if perfil_path:
+        run_meta["perfil_archivo"] = os.path.relpath(perfil_path, run_dir).replace(os.sep, "/")
+
+    if lote is not None:
+        lote_paths = _close_lote(lote, run_meta, lang, timer, hooks) if results else _finalize(lote["outputs"], hooks)
+        if results:
+            _catalog_safe(
+                hooks,
+                "el lote",
+                catalog.register_outputs,
+                run_base,
+                catalog.group_for(str(run_dir / lote["base"])),
+                lote_paths,
+                tipo=catalog.TIPO_LOTE,
+                duracion_sec=total_dur,
+                infracciones=infracciones_total,
+            )
+            hooks.lote_done(lote_paths)
+        with timer.stage("zip"):
+            run_zip = _zip_add(run_zip, lote_paths, hooks, root=run_dir)
+
+    if run_zip is not None:
+        zip_path = None
+        try:
+            run_meta["perfil"] = timer.summary()
+            with timer.stage("zip"):
+                zip_path = run_zip.close(run_meta)
+        except Exception as e:
+            hooks.warning(f"No se pudo cerrar el paquete ZIP: {e}")
+        if zip_path and os.path.exists(zip_path):
+            _catalog_safe(
+                hooks,
+                "el paquete ZIP",
+                catalog.register_outputs,
+                run_base,
+                catalog.group_for(zip_path),
+                [zip_path],
+                tipo=catalog.TIPO_CORRIDA,
+                duracion_sec=total_dur,
+                infracciones=infracciones_total,
+            )
+            hooks.package_done(zip_path)
+
+    run_meta["perfil"] = timer.summary()
+    _catalog_safe(hooks, "la corrida", catalog.register_run, run_base, run_meta)
+    return run_meta
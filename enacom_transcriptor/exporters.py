@@ -1,16 +1,22 @@
 from __future__ import annotations
 
 import datetime as dt
+import re
 from collections import Counter, defaultdict
+from itertools import islice
 from pathlib import Path
-from typing import Iterable
-
-from docx import Document
-from docx.shared import Inches
-from openpyxl import Workbook, load_workbook
+from typing import TYPE_CHECKING, Iterable, Iterator
+from xml.sax.saxutils import escape as _xml_escape
 
 from enacom_transcriptor.paths import LOGO_PATH, ensure_dirs
 
+# openpyxl y python-docx se importan dentro de cada función: la UI importa este
+# módulo en cada rerun de Streamlit y no conviene pagar su carga hasta exportar.
+if TYPE_CHECKING:
+    from docx.document import Document
+
+    from enacom_transcriptor.segments import SegmentStore
+
 
 # =========================
 # Excel helpers
@@ -23,6 +29,8 @@ def ensure_excel_file(xlsx_path: str, sheets: dict[str, tuple[str, ...] | None])
     - Si headers es None: crea la hoja sin encabezados.
     - Si headers no es None: escribe encabezados solo si la hoja está vacía.
     """
+    from openpyxl import Workbook, load_workbook
+
     ensure_dirs()
     p = Path(xlsx_path)
     p.parent.mkdir(parents=True, exist_ok=True)
@@ -54,6 +62,8 @@ def append_to_excel(
     sheet_name: str = "Transcripción",
     headers: tuple[str, ...] = ("Inicio", "Fin", "Texto"),
 ) -> None:
+    from openpyxl import load_workbook
+
     ensure_excel_file(xlsx_path, {sheet_name: headers})
 
     p = Path(xlsx_path)
@@ -65,13 +75,15 @@ def append_to_excel(
 
 def write_infracciones_excel(
     xlsx_path: str,
-    infracciones: list[dict] | None,
+    infracciones: Iterable[dict] | None,
     sheet_name: str = "Infracciones",
     resumen_sheet: str = "Resumen_infracciones",
 ) -> None:
     """
     Escribe (reemplazando) la hoja de infracciones y una hoja resumen.
     """
+    from openpyxl import load_workbook
+
     ensure_excel_file(xlsx_path, {sheet_name: ("Archivo", "Término", "Inicio", "Fin", "Texto")})
 
     p = Path(xlsx_path)
@@ -108,6 +120,38 @@ def write_infracciones_excel(
     wb.save(str(p))
 
 
+def write_revision_excel(
+    xlsx_path: str,
+    regiones: list[dict] | None,
+    sheet_name: str = "Revisión",
+) -> None:
+    """
+    Escribe (reemplazando) la hoja con regiones de baja confianza a re-escuchar.
+    Cada región: {"inicio", "fin", "confianza", "texto"}.
+    """
+    from openpyxl import load_workbook
+
+    ensure_excel_file(xlsx_path, {sheet_name: None})
+
+    p = Path(xlsx_path)
+    wb = load_workbook(str(p))
+
+    if sheet_name in wb.sheetnames:
+        wb.remove(wb[sheet_name])
+    ws = wb.create_sheet(sheet_name)
+    ws.append(["Inicio", "Fin", "Confianza", "Texto"])
+
+    for r in regiones or []:
+        ws.append([
+            r.get("inicio", ""),
+            r.get("fin", ""),
+            r.get("confianza", ""),
+            r.get("texto", ""),
+        ])
+
+    wb.save(str(p))
+
+
 # =========================
 # DOCX helpers
 # =========================
@@ -118,6 +162,8 @@ def _template_path() -> Path:
 
 
 def _load_doc() -> Document:
+    from docx import Document
+
     tp = _template_path()
     if tp.exists():
         try:
@@ -128,6 +174,8 @@ def _load_doc() -> Document:
 
 
 def _add_logo_if_exists(doc: Document) -> None:
+    from docx.shared import Inches
+
     try:
         if LOGO_PATH.exists():
             doc.add_picture(str(LOGO_PATH), width=Inches(1.35))
@@ -163,17 +211,72 @@ def _kv_table(doc: Document, rows: Iterable[tuple[str, str]]) -> None:
         r[1].text = str(v)
 
 
+# Caracteres de control que XML 1.0 no admite (pueden venir de Whisper).
+_XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_BULK_CHUNK = 2000
+
+
+def _append_paragraphs_bulk(doc: Document, lines: Iterable[str]) -> int:
+    """
+    Agrega un párrafo simple (estilo por defecto) por línea, construyendo el XML
+    de a bloques y parseándolo de una vez con lxml. Equivale a llamar
+    doc.add_paragraph(ln) por línea, pero sin crear un objeto Paragraph por
+    línea (python-docx se vuelve lento con decenas de miles de párrafos).
+    Devuelve la cantidad de párrafos agregados.
+    """
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    body = doc.element.body
+    sect = body.sectPr
+    open_tag = f"<w:body {nsdecls('w')}>"
+    n = 0
+
+    def _flush(buf: list[str]) -> None:
+        frag = parse_xml(open_tag + "".join(buf) + "</w:body>")
+        for p in list(frag):
+            if sect is not None:
+                sect.addprevious(p)
+            else:
+                body.append(p)
+
+    buf: list[str] = []
+    for ln in lines:
+        txt = _xml_escape(_XML_INVALID.sub("", ln))
+        buf.append(f'<w:p><w:r><w:t xml:space="preserve">{txt}</w:t></w:r></w:p>')
+        n += 1
+        if len(buf) >= _BULK_CHUNK:
+            _flush(buf)
+            buf = []
+    if buf:
+        _flush(buf)
+    return n
+
+
+def _store_lines(store: SegmentStore) -> Iterator[str]:
+    from enacom_transcriptor.segments import format_line
+
+    for r in store.rows():
+        yield format_line(r["start"], r["end"], r["speaker"], r["text"])
+
+
 def generar_informe_word(
     titulo: str,
     docx_out_path: str,
     combinado: bool,
     meta: dict,
     txt_path: str | None = None,
-    infracciones: list[dict] | None = None,
-    files_info: list[dict] | None = None,
+    infracciones: Iterable[dict] | None = None,
+    files_info: list | None = None,
+    segmentos: SegmentStore | None = None,
 ) -> str:
     """
     Genera informe DOCX (individual o combinado), robusto a plantillas sin estilos.
+
+    El cuerpo de la transcripción se toma de los segmentos en memoria
+    (`segmentos`, o `info.segments` de cada archivo en `files_info`); si no
+    están, se re-lee el TXT como antes.
     """
     ensure_dirs()
 
@@ -186,15 +289,22 @@ def generar_informe_word(
 
     _add_heading_safe(doc, "Datos del procesamiento", level=2)
     generado = meta.get("generado") or dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    _kv_table(doc, [
+    filas = [
         ("Archivo/Lote", titulo),
         ("Generado", str(generado)),
         ("Modelo Whisper", str(meta.get("model_size", ""))),
         ("Idioma", str(meta.get("lang", "auto") or "auto")),
+    ]
+    if meta.get("idioma_detectado"):
+        filas.append(("Idioma detectado", str(meta["idioma_detectado"])))
+    if meta.get("por_canal"):
+        filas.append(("Hablantes", "Un canal por hablante (transcripción por canal)"))
+    filas += [
         ("Duración segmento (s)", str(meta.get("segment_duration", ""))),
         ("Cantidad de archivos", str(meta.get("total_files", ""))),
         ("Duración total", str(meta.get("total_duration_hhmmss", ""))),
-    ])
+    ]
+    _kv_table(doc, filas)
 
     doc.add_paragraph("")
 
@@ -222,7 +332,15 @@ def generar_informe_word(
 
                 arch = info.get("archivo", f"archivo_{j}")
                 dur = info.get("duracion_hhmmss", "")
-                _add_heading_safe(doc, f"{arch} — Duración: {dur}", level=3)
+                idioma = info.get("idioma")
+                titulo_arch = f"{arch} — Duración: {dur}" + (f" — Idioma: {idioma}" if idioma else "")
+                _add_heading_safe(doc, titulo_arch, level=3)
+
+                store = info.get("segments")
+                if store is not None:
+                    if not _append_paragraphs_bulk(doc, _store_lines(store)):
+                        doc.add_paragraph("(Sin texto para mostrar.)")
+                    continue
 
                 tp = info.get("txt_path")
                 if not tp:
@@ -234,19 +352,20 @@ def generar_informe_word(
                     doc.add_paragraph("(Sin texto para mostrar.)")
                     continue
 
-                for ln in lines:
-                    doc.add_paragraph(ln)
+                _append_paragraphs_bulk(doc, lines)
 
     else:
-        if not txt_path:
+        if segmentos is not None:
+            if not _append_paragraphs_bulk(doc, _store_lines(segmentos)):
+                doc.add_paragraph("(No se detectó texto en el archivo.)")
+        elif not txt_path:
             doc.add_paragraph("(No se indicó txt_path.)")
         else:
             lines = _read_body_lines(txt_path)
             if not lines:
                 doc.add_paragraph("(No se detectó texto en el archivo.)")
             else:
-                for ln in lines:
-                    doc.add_paragraph(ln)
+                _append_paragraphs_bulk(doc, lines)
 
     # Infracciones
     doc.add_page_break()
@@ -286,7 +405,7 @@ def generar_informe_word(
         h2[3].text = "Fin"
         h2[4].text = "Texto"
 
-        for inf in infracciones[:300]:
+        for inf in islice(infracciones, 300):
             r = t2.add_row().cells
             r[0].text = str(inf.get("archivo", ""))
             r[1].text = str(inf.get("termino", ""))
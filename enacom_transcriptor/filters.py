@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import deque
+
+
+# Filtro de alucinaciones y tramos sin habla, con las estadísticas que Whisper
+# ya devuelve por segmento. En silencios y ruido de radio Whisper suele
+# "inventar" frases de cierre de videos o repetir la misma línea; esos
+# segmentos inflan el TXT/XLSX y disparan infracciones falsas.
+#
+# Modos:
+#   "marcar":    se escribe con el prefijo MARK, pero no se buscan infracciones.
+#   "descartar": el segmento no llega a las salidas ni al detector.
+#
+# El texto solo no alcanza para filtrar: las reglas de texto (frase conocida,
+# repeticiones) exigen además alguna señal estadística de Whisper, porque en
+# radio "Recibido." tres veces seguidas o "Gracias por verificar..." son
+# tráfico real. Un segmento que contiene un término de infracción configurado
+# nunca se filtra.
+
+MARK = "[dudoso] "
+
+DEFAULT_FILTER = {
+    "enabled": True,
+    "modo": "marcar",
+    # Regla de Whisper para saltear ventanas sin habla: ambas condiciones.
+    # Para las reglas de texto alcanza con una sola (señal de duda).
+    "no_speech_prob": 0.6,
+    "avg_logprob": -1.0,
+    # Texto muy comprimible = repeticiones (mismo umbral que Whisper usa para reintentar).
+    "compression_ratio": 2.4,
+    # Compresión que ya cuenta como señal de duda para las reglas de texto.
+    "compression_ratio_dudoso": 1.8,
+    # Misma línea N veces seguidas (con señal de duda): desde la N-ésima se filtra.
+    "repeticiones": 3,
+    # Una palabra o frase corta repetida tantas veces seguidas dentro del
+    # segmento (con señal de duda).
+    "repeticion_interna": 8,
+}
+
+# Frases típicas de alucinación (datos de entrenamiento de subtítulos de video).
+KNOWN_HALLUCINATIONS = (
+    "gracias por ver el video",
+    "gracias por ver",
+    "gracias por su atencion",
+    "suscribete al canal",
+    "no olvides suscribirte",
+    "subtitulos realizados por la comunidad de amara.org",
+    "subtitulos por la comunidad de amara.org",
+    "amara.org",
+    "thanks for watching",
+    "thank you for watching",
+    "please subscribe",
+    "obrigado por assistir",
+)
+
+REASONS = ("sin_habla", "compresion", "frase_conocida", "repeticion")
+
+_PUNCT = re.compile(r"[^\w\s.]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SPACES.sub(" ", _PUNCT.sub(" ", text)).strip(" .")
+
+
+def _has_inner_loop(words: list[str], times: int) -> bool:
+    """¿Hay un n-grama (n<=4) repetido `times` veces seguidas?"""
+    if times <= 1:
+        return False
+    for n in range(1, 5):
+        need = n * times
+        for i in range(0, len(words) - need + 1):
+            gram = words[i : i + n]
+            if all(words[i + j * n : i + (j + 1) * n] == gram for j in range(1, times)):
+                return True
+    return False
+
+
+def _num(seg: dict, key: str) -> float | None:
+    v = seg.get(key)
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return v if v == v else None
+
+
+class SegmentFilter:
+    """
+    `check(seg)` devuelve el motivo ("sin_habla", "compresion",
+    "frase_conocida", "repeticion") o None si el segmento es válido, y lleva
+    la cuenta por motivo en `counts`. Mantiene las últimas líneas para
+    detectar repeticiones entre segmentos, por separado para cada
+    `seg["speaker"]` (canales intercalados): usar una instancia por archivo
+    o llamar a `reset()` entre archivos.
+
+    `protegidos`: términos de infracción; un segmento que contiene alguno
+    nunca se filtra, para que siempre llegue al detector.
+    """
+
+    def __init__(self, config: dict | None = None, protegidos: list[str] | None = None) -> None:
+        self.config = {**DEFAULT_FILTER, **(config or {})}
+        self.enabled = bool(self.config["enabled"])
+        self.drop = self.config["modo"] == "descartar"
+        self.counts = {r: 0 for r in REASONS}
+        self._recent: dict[str, deque[str]] = {}
+        self.protegidos = tuple(t for t in (_normalize(p or "") for p in protegidos or ()) if t)
+
+    def reset(self) -> None:
+        self._recent.clear()
+
+    def _doubtful(self, no_speech: float | None, logprob: float | None, ratio: float | None) -> bool:
+        """¿Whisper da alguna señal de que el texto no es confiable?"""
+        c = self.config
+        return (
+            (no_speech is not None and no_speech > c["no_speech_prob"])
+            or (logprob is not None and logprob < c["avg_logprob"])
+            or (ratio is not None and ratio > c["compression_ratio_dudoso"])
+        )
+
+    def _protected(self, norm: str) -> bool:
+        # Subcadena, como la coincidencia parcial del detector: mejor de más.
+        return any(t in norm for t in self.protegidos)
+
+    def _reason(self, seg: dict) -> str | None:
+        c = self.config
+        norm = _normalize(seg.get("text") or "")
+        if norm and self._protected(norm):
+            return None
+
+        no_speech = _num(seg, "no_speech_prob")
+        logprob = _num(seg, "avg_logprob")
+        if no_speech is not None and logprob is not None:
+            if no_speech > c["no_speech_prob"] and logprob < c["avg_logprob"]:
+                return "sin_habla"
+
+        ratio = _num(seg, "compression_ratio")
+        if ratio is not None and ratio > c["compression_ratio"]:
+            return "compresion"
+
+        if not norm:
+            return None
+        # La línea repetida se registra siempre, aunque este segmento no tenga
+        # señal de duda: una racha de repeticiones puede terminar en uno que sí.
+        repeated = False
+        if int(c["repeticiones"]) > 1:
+            recent = self._recent.get(seg.get("speaker") or "")
+            if recent is None:
+                recent = self._recent[seg.get("speaker") or ""] = deque(maxlen=int(c["repeticiones"]) - 1)
+            repeated = len(recent) == recent.maxlen and all(r == norm for r in recent)
+            recent.append(norm)
+
+        if not self._doubtful(no_speech, logprob, ratio):
+            return None
+        # Solo el enunciado completo: "gracias por verificar la frecuencia" no es alucinación.
+        if norm in KNOWN_HALLUCINATIONS:
+            return "frase_conocida"
+        if repeated or _has_inner_loop(norm.split(), int(c["repeticion_interna"])):
+            return "repeticion"
+        return None
+
+    def check(self, seg: dict) -> str | None:
+        if not self.enabled:
+            return None
+        reason = self._reason(seg)
+        if reason is not None:
+            self.counts[reason] += 1
+        return reason
+
+    def mark(self, seg: dict) -> dict:
+        """Copia del segmento con el texto marcado como dudoso."""
+        text = (seg.get("text") or "").strip()
+        return {**seg, "text": text if text.startswith(MARK) else MARK + text}
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> dict:
+        return {"modo": "descartar" if self.drop else "marcar", **self.counts, "total": self.total}
+
+
+def merge_counts(summaries: list[dict]) -> dict:
+    """Suma los resúmenes de varios archivos (para run_meta)."""
+    out: dict = {}
+    for s in summaries:
+        for key, v in s.items():
+            if isinstance(v, int):
+                out[key] = out.get(key, 0) + v
+            else:
+                out.setdefault(key, v)
+    return out
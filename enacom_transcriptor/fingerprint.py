@@ -0,0 +1,516 @@
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Callable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from enacom_transcriptor.filters import MARK, SegmentFilter
+from enacom_transcriptor.paths import FINGERPRINT_PATH, ensure_dirs
+from enacom_transcriptor.preprocess import Preprocessor, resample_filter
+
+
+# Huellas acústicas para no volver a transcribir grabaciones repetidas.
+#
+# Las estaciones reenvían la misma hora capturada dos veces o archivos que se
+# superponen. Cada archivo procesado deja en BACKUP_DIR/huellas.sqlite sus
+# hashes de picos espectrales (un pico ancla con dos picos destino
+# consecutivos: frecuencias y distancias en tramas, como los identificadores
+# de música) y sus segmentos transcriptos. Al ingresar un
+# archivo nuevo se buscan sus hashes en el índice: muchas coincidencias con
+# la misma diferencia de tiempo respecto de una grabación anterior indican
+# audio compartido, y en ese rango se reutilizan los segmentos guardados
+# (desplazados) en lugar de llamar al modelo. Solo se transcribe lo nuevo.
+#
+# Solo se reutiliza lo transcripto con los mismos ajustes que cambian el
+# texto (SETTINGS_COLUMNS): con otro modelo, idioma, preprocesamiento o
+# filtro el resultado no sería el que daría la corrida actual.
+
+FP_SR = 8000                  # la voz de radio no tiene información útil arriba de 4 kHz
+N_FFT = 512
+HOP = 256                     # 32 ms por trama
+FRAME_SEC = HOP / FP_SR
+PEAK_TIME = 7                 # vecindario del máximo local: ±7 tramas
+PEAK_FREQ = 10                # y ±10 bins (156 Hz)
+PEAKS_PER_SEC = 12
+PEAK_FLOOR_DB = -60.0         # picos más débiles (respecto de fondo de escala) no cuentan
+FAN_OUT = 5                   # destinos por ancla (pares consecutivos: FAN_OUT - 1 hashes)
+TARGET_DT = (1, 63)           # tramas entre ancla y destino (6 bits)
+BLOCK_SEC = 120.0             # el audio se recorre por bloques
+# Versión del formato de hash: las grabaciones indexadas con otra no se comparan.
+HASH_VERSION = 2
+
+MIN_MATCHES = 25              # hashes alineados para aceptar una coincidencia
+MIN_OVERLAP_SEC = 20.0        # superposiciones más cortas no se reutilizan
+MAX_GAP_SEC = 8.0             # hueco sin coincidencias que corta una región
+MIN_NOVEL_SEC = 1.0           # restos nuevos más cortos se transcriben con contexto vecino
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS grabaciones (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    created       REAL NOT NULL,
+    archivo       TEXT,
+    run_id        TEXT,
+    duracion_sec  REAL,
+    model_size    TEXT,
+    por_canal     INTEGER NOT NULL DEFAULT 0,
+    idioma        TEXT,
+    word_timestamps INTEGER,
+    preproceso    TEXT,
+    filtro        TEXT,
+    version_hash  INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS hashes (
+    hash          INTEGER NOT NULL,
+    grabacion     INTEGER NOT NULL,
+    t             INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_hashes_hash ON hashes (hash);
+CREATE TABLE IF NOT EXISTS segmentos (
+    grabacion     INTEGER NOT NULL,
+    start         REAL NOT NULL,
+    end           REAL NOT NULL,
+    speaker       TEXT,
+    text          TEXT NOT NULL,
+    avg_logprob   REAL,
+    no_speech_prob REAL,
+    compression_ratio REAL,
+    words_json    TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_segmentos_grabacion ON segmentos (grabacion, start);
+"""
+
+# Columnas de `grabaciones` que deben coincidir para reutilizar (ver
+# transcript_settings). Índices anteriores no las tienen: se agregan vacías
+# y esas grabaciones ya no coinciden con nada.
+SETTINGS_COLUMNS = {
+    "model_size": "TEXT",
+    "por_canal": "INTEGER",
+    "idioma": "TEXT",
+    "word_timestamps": "INTEGER",
+    "preproceso": "TEXT",
+    "filtro": "TEXT",
+}
+
+_write_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    ensure_dirs()
+    con = sqlite3.connect(str(FINGERPRINT_PATH), timeout=30)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(_SCHEMA)
+    have = {r["name"] for r in con.execute("PRAGMA table_info(grabaciones)")}
+    for col, kind in SETTINGS_COLUMNS.items():
+        if col not in have:
+            con.execute(f"ALTER TABLE grabaciones ADD COLUMN {col} {kind}")
+    if "version_hash" not in have:
+        # Lo indexado antes de HASH_VERSION usa el hash anterior (22 bits)
+        con.execute("ALTER TABLE grabaciones ADD COLUMN version_hash INTEGER NOT NULL DEFAULT 1")
+    return con
+
+
+def transcript_settings(cfg: dict, lang: str | None = None, por_canal: bool = False) -> dict:
+    """
+    Ajustes de la corrida que cambian el texto transcripto, con las columnas
+    de SETTINGS_COLUMNS. `lang` es el idioma efectivo (configurado o fijado
+    por la detección; None = Whisper lo detecta por segmento).
+    """
+    return {
+        "model_size": cfg.get("model_size", "") or "",
+        "por_canal": int(bool(por_canal)),
+        "idioma": lang or "",
+        "word_timestamps": int(bool(cfg.get("word_timestamps", True))),
+        "preproceso": json.dumps(Preprocessor(cfg.get("preproceso")).config, sort_keys=True),
+        "filtro": json.dumps(_filter_settings(cfg), sort_keys=True),
+    }
+
+
+def _filter_settings(cfg: dict) -> dict:
+    # Los términos de infracción cambian qué segmentos se filtran.
+    terms = [t.get("termino", "") for t in cfg.get("infracciones") or []]
+    seg_filter = SegmentFilter(cfg.get("filtro"), terms)
+    return {**seg_filter.config, "protegidos": sorted(seg_filter.protegidos)}
+
+
+# =========================
+# Huella
+# =========================
+
+def _sliding_max(a: np.ndarray, half: int, axis: int) -> np.ndarray:
+    pad = [(0, 0)] * a.ndim
+    pad[axis] = (half, half)
+    padded = np.pad(a, pad, constant_values=-np.inf)
+    return sliding_window_view(padded, 2 * half + 1, axis=axis).max(axis=-1)
+
+
+def spectral_peaks(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(trama, bin) de los picos del espectrograma de `x` (mono, FP_SR)."""
+    if len(x) < N_FFT:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    frames = sliding_window_view(x, N_FFT)[::HOP] * np.hanning(N_FFT).astype(np.float32)
+    # Se descarta el bin de Nyquist: quedan 256 bins (8 bits).
+    spec = np.abs(np.fft.rfft(frames, axis=1))[:, : N_FFT // 2]
+    db = 20.0 * np.log10(spec / (N_FFT / 4) + 1e-10)
+
+    local = _sliding_max(_sliding_max(db, PEAK_TIME, 0), PEAK_FREQ, 1)
+    t, f = np.nonzero((db == local) & (db > PEAK_FLOOR_DB))
+    keep = max(1, int(PEAKS_PER_SEC * len(db) * FRAME_SEC))
+    if len(t) > keep:
+        strongest = np.argpartition(db[t, f], -keep)[-keep:]
+        t, f = t[strongest], f[strongest]
+    order = np.lexsort((f, t))
+    return t[order], f[order]
+
+
+def peak_hashes(t: np.ndarray, f: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes (f_ancla:8 | f_destino1:8 | dt1:6 | f_destino2:8 | dt2:6, 36 bits)
+    con dos destinos consecutivos por ancla, y la trama del ancla de cada uno.
+    Con un solo destino (22 bits) un índice de miles de horas repite cada
+    hash en miles de grabaciones.
+    """
+    hashes, times = [], []
+    for k in range(1, FAN_OUT):
+        if len(t) <= k + 1:
+            break
+        n = len(t) - k - 1
+        dt1 = t[k : k + n] - t[:n]
+        dt2 = t[k + 1 :] - t[:n]
+        ok = (dt1 >= TARGET_DT[0]) & (dt2 <= TARGET_DT[1])
+        hashes.append(
+            (f[:n][ok] << 28) | (f[k : k + n][ok] << 20) | (dt1[ok] << 14) | (f[k + 1 :][ok] << 6) | dt2[ok]
+        )
+        times.append(t[:n][ok])
+    if not hashes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(hashes).astype(np.int64), np.concatenate(times).astype(np.int64)
+
+
+def fingerprint_source(source, block_sec: float = BLOCK_SEC) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes de todo el archivo (mezcla mono a FP_SR), recorrido por bloques
+    con `source.read` (nunca entero en memoria). Devuelve (hashes, tramas).
+    """
+    all_h, all_t = [], []
+    start = 0.0
+    frame0 = 0
+    duration = source.duration
+    while start < duration:
+        end = min(start + block_sec, duration)
+        data = source.read(start, end)
+        mono = data.mean(axis=1) if data.ndim > 1 else data
+        x = resample_filter(mono.astype(np.float32, copy=False), source.samplerate, FP_SR)
+        h, t = peak_hashes(*spectral_peaks(x))
+        all_h.append(h)
+        all_t.append(t + frame0)
+        frame0 += int(round((end - start) / FRAME_SEC))
+        start = end
+    if not all_h:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(all_h), np.concatenate(all_t)
+
+
+# =========================
+# Índice
+# =========================
+
+def find_overlaps(hashes: np.ndarray, times: np.ndarray, settings: dict) -> list[dict]:
+    """
+    Regiones del audio nuevo ya transcriptas en grabaciones del índice
+    (con los mismos `settings`, ver transcript_settings), sin superponerse entre sí:
+    [{"inicio", "fin", "grabacion", "archivo", "desfase"}] con tiempos en
+    segundos del audio nuevo; desfase = t_grabacion - t_nuevo.
+    """
+    if not len(hashes):
+        return []
+    regions: list[dict] = []
+    max_gap = int(MAX_GAP_SEC / FRAME_SEC)
+    with closing(_connect()) as con:
+        con.execute("CREATE TEMP TABLE q (hash INTEGER, t INTEGER)")
+        con.executemany("INSERT INTO q VALUES (?, ?)", zip(hashes.tolist(), times.tolist()))
+        # Votos (grabación, desfase) contados en SQLite: a Python solo llegan
+        # los candidatos, no cada coincidencia de hash.
+        votes = con.execute(
+            """
+            SELECT h.grabacion AS g, h.t - q.t AS d, COUNT(*) AS n, r.archivo AS archivo,
+                   r.duracion_sec AS duracion_sec
+            FROM q JOIN hashes h ON h.hash = q.hash
+            JOIN grabaciones r ON r.id = h.grabacion
+            WHERE r.version_hash = ? AND """ + " AND ".join(f"r.{col} = ?" for col in SETTINGS_COLUMNS) + """
+            GROUP BY h.grabacion, h.t - q.t
+            HAVING COUNT(*) >= ?
+            ORDER BY n DESC
+            """,
+            (HASH_VERSION, *(settings[col] for col in SETTINGS_COLUMNS), MIN_MATCHES // 3),
+        ).fetchall()
+
+        seen: set[tuple[int, int]] = set()
+        for v in votes:
+            rec, off = int(v["g"]), int(v["d"])
+            # Los desfases vecinos de uno ya visto dan las mismas coincidencias
+            if any((rec, off + k) in seen for k in (-1, 0, 1)):
+                continue
+            seen.add((rec, off))
+            # ±1 trama de tolerancia por el redondeo del inicio de cada bloque.
+            hits = np.array(
+                [r[0] for r in con.execute(
+                    """
+                    SELECT DISTINCT q.t FROM q JOIN hashes h ON h.hash = q.hash
+                    WHERE h.grabacion = ? AND h.t - q.t BETWEEN ? AND ?
+                    ORDER BY q.t
+                    """,
+                    (rec, off - 1, off + 1),
+                )],
+                dtype=np.int64,
+            )
+            if len(hits) < MIN_MATCHES:
+                continue
+            cuts = np.nonzero(np.diff(hits) > max_gap)[0] + 1
+            for run in np.split(hits, cuts):
+                ini, fin = run[0] * FRAME_SEC, (run[-1] + 1) * FRAME_SEC
+                if len(run) < MIN_MATCHES or fin - ini < MIN_OVERLAP_SEC:
+                    continue
+                if any(ini < r["fin"] and r["inicio"] < fin for r in regions):
+                    continue
+                regions.append({
+                    "inicio": ini, "fin": fin, "grabacion": rec,
+                    "archivo": v["archivo"] or "", "desfase": off * FRAME_SEC,
+                    "duracion_grabacion": float(v["duracion_sec"] or 0.0),
+                })
+    return sorted(regions, key=lambda r: r["inicio"])
+
+
+def register(
+    archivo: str,
+    duracion_sec: float,
+    hashes: np.ndarray,
+    times: np.ndarray,
+    store,
+    settings: dict,
+    run_id: str = "",
+) -> int:
+    """Agrega la grabación al índice con su huella y sus segmentos (SegmentStore)."""
+    segs = []
+    for i in range(len(store)):
+        words = [{"word": w, "start": s, "end": e, "probability": p} for w, s, e, p in store.words_of(i)]
+        segs.append((
+            float(store.start[i]), float(store.end[i]), store.speaker(i), store.texts[i],
+            _nan_to_none(store.avg_logprob[i]), _nan_to_none(store.no_speech_prob[i]),
+            _nan_to_none(store.compression_ratio[i]), json.dumps(words, ensure_ascii=False) if words else None,
+        ))
+    with _write_lock, closing(_connect()) as con, con:
+        cur = con.execute(
+            f"INSERT INTO grabaciones (created, archivo, run_id, duracion_sec, version_hash, {', '.join(SETTINGS_COLUMNS)}) "
+            f"VALUES (?, ?, ?, ?, ?{', ?' * len(SETTINGS_COLUMNS)})",
+            (
+                time.time(), archivo, run_id, float(duracion_sec), HASH_VERSION,
+                *(settings[col] for col in SETTINGS_COLUMNS),
+            ),
+        )
+        rec = int(cur.lastrowid)
+        con.executemany(
+            "INSERT INTO hashes (hash, grabacion, t) VALUES (?, ?, ?)",
+            ((h, rec, t) for h, t in zip(hashes.tolist(), times.tolist())),
+        )
+        con.executemany(
+            """
+            INSERT INTO segmentos
+                (grabacion, start, end, speaker, text, avg_logprob, no_speech_prob, compression_ratio, words_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            ((rec, *s) for s in segs),
+        )
+    return rec
+
+
+def prune(older_than: float) -> int:
+    """
+    Borra del índice las grabaciones registradas antes de `older_than`
+    (epoch), con sus hashes y segmentos, y compacta el archivo. Devuelve
+    cuántas grabaciones se borraron.
+    """
+    if not FINGERPRINT_PATH.exists():
+        return 0
+    with _write_lock, closing(_connect()) as con:
+        with con:
+            ids = [r[0] for r in con.execute("SELECT id FROM grabaciones WHERE created < ?", (float(older_than),))]
+            if not ids:
+                return 0
+            con.execute("CREATE TEMP TABLE viejas (id INTEGER PRIMARY KEY)")
+            con.executemany("INSERT INTO viejas VALUES (?)", ((i,) for i in ids))
+            for table, col in (("hashes", "grabacion"), ("segmentos", "grabacion"), ("grabaciones", "id")):
+                con.execute(f"DELETE FROM {table} WHERE {col} IN (SELECT id FROM viejas)")
+        # SQLite no devuelve al disco las páginas libres: VACUUM reescribe el archivo.
+        con.execute("VACUUM")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return len(ids)
+
+
+def _nan_to_none(v) -> float | None:
+    v = float(v)
+    return None if math.isnan(v) else v
+
+
+def _clip_words(seg: dict, start: float, end: float) -> dict | None:
+    """Recorta un segmento con marcas por palabra a las palabras con el punto medio en [start, end)."""
+    words = [
+        w for w in seg["words"]
+        if start <= (float(w.get("start", 0.0)) + float(w.get("end", 0.0))) / 2.0 < end
+    ]
+    if not words:
+        return None
+    if len(words) == len(seg["words"]):
+        return seg
+    text = " ".join(str(w.get("word", "")).strip() for w in words)
+    if seg["text"].startswith(MARK):
+        text = MARK + text
+    return {
+        **seg, "text": text, "words": words,
+        "start": max(float(seg["start"]), float(words[0].get("start", 0.0))),
+        "end": min(float(seg["end"]), float(words[-1].get("end", 0.0))),
+    }
+
+
+def _stored_segments(rec: int, start: float, end: float) -> list[dict]:
+    """
+    Segmentos guardados de `rec` dentro de [start, end). Los que cruzan un
+    borde se recortan por palabras; sin marcas por palabra el texto no se
+    puede partir y entra entero si su punto medio cae adentro.
+    """
+    with closing(_connect()) as con:
+        rows = con.execute(
+            "SELECT * FROM segmentos WHERE grabacion = ? AND start < ? AND end > ? ORDER BY start",
+            (rec, end, start),
+        ).fetchall()
+    out = []
+    for r in rows:
+        seg = {"start": r["start"], "end": r["end"], "text": r["text"], "speaker": r["speaker"] or ""}
+        for key in ("avg_logprob", "no_speech_prob", "compression_ratio"):
+            if r[key] is not None:
+                seg[key] = r[key]
+        if r["words_json"]:
+            seg["words"] = json.loads(r["words_json"])
+            seg = _clip_words(seg, start, end)
+        elif not start <= (r["start"] + r["end"]) / 2.0 < end:
+            seg = None
+        if seg is not None:
+            out.append(seg)
+    return out
+
+
+def shift_segments(segments: list[dict], delta: float) -> list[dict]:
+    """Copia de segmentos estilo Whisper con tiempos (y palabras) desplazados."""
+    out = []
+    for s in segments:
+        seg = {**s, "start": float(s.get("start", 0.0)) + delta, "end": float(s.get("end", 0.0)) + delta}
+        if s.get("words"):
+            seg["words"] = [
+                {**w, "start": float(w.get("start", 0.0)) + delta, "end": float(w.get("end", 0.0)) + delta}
+                for w in s["words"]
+            ]
+        out.append(seg)
+    return out
+
+
+# =========================
+# Uso por archivo
+# =========================
+
+class Dedup:
+    """
+    Huella y superposiciones de un archivo. `transcribe(start, end, fn)`
+    arma el resultado del tramo con los segmentos reutilizados y llama a
+    `fn(a, b)` (la transcripción habitual) solo para los subtramos nuevos.
+    `settings` viene de transcript_settings.
+    """
+
+    def __init__(self, source, settings: dict) -> None:
+        self.source = source
+        self.settings = settings
+        self.hashes, self.times = fingerprint_source(source)
+        self.regions = find_overlaps(self.hashes, self.times, settings)
+        self.reused_sec = 0.0
+        # Fin (s del audio nuevo) del último segmento reutilizado: si quedó
+        # después del tramo, el tramo siguiente no vuelve a transcribir ese audio.
+        self._reused_until = 0.0
+        # Las anclas no llegan a los bordes del audio compartido (los hashes
+        # miran hasta TARGET_DT tramas adelante): se extienden las regiones
+        # hasta el borde real si quedan a pocos segundos.
+        for r in self.regions:
+            first = max(0.0, -r["desfase"])
+            last = min(source.duration, r["duracion_grabacion"] - r["desfase"])
+            if r["inicio"] - first < 2 * MIN_NOVEL_SEC + TARGET_DT[1] * FRAME_SEC:
+                r["inicio"] = first
+            if last - r["fin"] < 2 * MIN_NOVEL_SEC + TARGET_DT[1] * FRAME_SEC:
+                r["fin"] = last
+
+    @property
+    def covered_sec(self) -> float:
+        return sum(r["fin"] - r["inicio"] for r in self.regions)
+
+    def transcribe(
+        self, start_sec: float, end_sec: float, fn: Callable[[float, float], dict]
+    ) -> tuple[dict, float]:
+        """(resultado del tramo con tiempos relativos a start_sec, segundos transcriptos)."""
+        segments: list[dict] = []
+        novel: list[tuple[float, float]] = []
+        pos = min(max(start_sec, self._reused_until), end_sec)
+        for r in self.regions:
+            a, b = max(pos, r["inicio"]), min(end_sec, r["fin"])
+            if b <= a:
+                continue
+            stored = shift_segments(
+                _stored_segments(r["grabacion"], a + r["desfase"], b + r["desfase"]), -r["desfase"]
+            )
+            # Lo nuevo termina donde empieza el primer segmento reutilizado y
+            # sigue donde termina el último (un segmento sin marcas por palabra
+            # puede pasarse del borde de la región).
+            first = min(a, stored[0]["start"]) if stored else a
+            if first > pos:
+                novel.append((pos, first))
+            segments += shift_segments(stored, -start_sec)
+            self.reused_sec += b - a
+            pos = max(b, stored[-1]["end"]) if stored else b
+            self._reused_until = max(self._reused_until, pos)
+        if pos < end_sec:
+            novel.append((pos, end_sec))
+
+        transcribed = 0.0
+        for a, b in novel:
+            if b <= a:
+                continue
+            # Un resto muy corto se transcribe con audio vecino como contexto
+            # (Whisper inventa texto en fragmentos de una fracción de segundo)
+            # y se queda solo lo que cae en el resto.
+            lo, hi = a, b
+            if b - a < MIN_NOVEL_SEC:
+                pad = MIN_NOVEL_SEC - (b - a)
+                lo = max(0.0, a - pad)
+                hi = min(self.source.duration, b + pad)
+            result = fn(lo, hi)
+            new = shift_segments(result.get("segments", []) if isinstance(result, dict) else [], lo)
+            if (lo, hi) != (a, b):
+                new = [s for s in new if a <= (s["start"] + s["end"]) / 2.0 < b]
+            segments += shift_segments(new, -start_sec)
+            transcribed += hi - lo
+        segments.sort(key=lambda s: float(s.get("start", 0.0)))
+        return {"segments": segments}, transcribed
+
+    def register(self, archivo: str, store, run_id: str = "") -> int:
+        return register(
+            archivo, self.source.duration, self.hashes, self.times, store, self.settings, run_id=run_id,
+        )
+
+    def summary(self) -> dict:
+        return {
+            "reutilizado_sec": round(self.reused_sec, 1),
+            "de": sorted({r["archivo"] for r in self.regions}),
+        }
@@ -23,6 +23,46 @@ def parse_infracciones_text(text: str) -> list[dict]:
     return out
 
 
+_WORD_STRIP = ".,;:!?¡¿\"'()[]«»…-—"
+
+
+def _norm_word(w: str) -> str:
+    return (w or "").strip().strip(_WORD_STRIP).lower()
+
+
+def ubicar_en_palabras(
+    termino: str,
+    palabras: list[tuple] | None,
+    coincidencia_parcial: bool = True,
+) -> tuple[float, float] | None:
+    """
+    Busca `termino` (una o varias palabras) en la lista de palabras con marcas
+    de tiempo [(texto, start, end, ...), ...] y devuelve (start, end) de la
+    primera ocurrencia, o None si no se puede ubicar.
+    """
+    if not palabras:
+        return None
+
+    partes = [_norm_word(x) for x in (termino or "").split()]
+    partes = [x for x in partes if x]
+    if not partes:
+        return None
+
+    norm = [_norm_word(p[0]) for p in palabras]
+    k = len(partes)
+
+    for i in range(len(norm) - k + 1):
+        ventana = norm[i : i + k]
+        if coincidencia_parcial:
+            ok = " ".join(partes) in " ".join(ventana)
+        else:
+            ok = ventana == partes
+        if ok:
+            return float(palabras[i][1]), float(palabras[i + k - 1][2])
+
+    return None
+
+
 def detectar_infracciones_en_texto(
     archivo: str,
     texto: str,
@@ -30,10 +70,14 @@ def detectar_infracciones_en_texto(
     fin: str,
     infracciones_cfg: list[dict] | None,
     coincidencia_parcial: bool,
+    palabras: list[tuple] | None = None,
 ) -> list[dict]:
     """
     Detecta coincidencias de términos configurados dentro de un texto.
     Devuelve una lista de dicts con campos: archivo, termino, inicio, fin, texto.
+
+    Si se pasan `palabras` (marcas por palabra de Whisper), cada hallazgo suma
+    t_inicio/t_fin (segundos) con la ubicación exacta del término.
     """
     if not texto or not infracciones_cfg:
         return []
@@ -52,14 +96,16 @@ def detectar_infracciones_en_texto(
             ok = bool(re.search(rf"\b{re.escape(termino)}\b", texto, flags=re.IGNORECASE))
 
         if ok:
-            halladas.append(
-                {
-                    "archivo": archivo,
-                    "termino": termino,
-                    "inicio": inicio,
-                    "fin": fin,
-                    "texto": texto,
-                }
-            )
+            hit = {
+                "archivo": archivo,
+                "termino": termino,
+                "inicio": inicio,
+                "fin": fin,
+                "texto": texto,
+            }
+            span = ubicar_en_palabras(termino, palabras, coincidencia_parcial)
+            if span:
+                hit["t_inicio"], hit["t_fin"] = span
+            halladas.append(hit)
 
     return halladas
@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from enacom_transcriptor.storage import TEMP_PREFIX, temp_dir
+
+
+_SPOOL_CHUNK = 1024 * 1024
+_ENVELOPE_POINTS = 20_000
+_ENVELOPE_SR = 2000             # frecuencia de la pasada de envolvente con ffmpeg
+_PIPE_CHUNK_SEC = 10.0          # bloque de lectura/descarte del pipe de ffmpeg
+
+# Formatos con acceso aleatorio exacto en libsndfile (seek + read). El resto
+# (mp3, m4a, ogg/opus, amr, contenedores de video…) va por el pipe de ffmpeg:
+# soundfile no los lee o depende de la versión de libsndfile instalada.
+SOUNDFILE_EXTENSIONS = (".wav", ".flac", ".aiff", ".aif")
+
+
+# =========================
+# Subidas
+# =========================
+
+def spool_upload(uploaded, chunk_size: int = _SPOOL_CHUNK) -> str:
+    """
+    Copia un UploadedFile de Streamlit a un temporal en disco por bloques (sin
+    `read()` completo) y cierra el buffer para liberarlo cuanto antes. Después
+    de esto solo debe usarse `uploaded.name`. Devuelve la ruta del temporal.
+    """
+    suffix = Path(uploaded.name).suffix or ".wav"
+    try:
+        uploaded.seek(0)
+    except Exception:
+        pass
+
+    with tempfile.NamedTemporaryFile(delete=False, prefix=TEMP_PREFIX, suffix=suffix, dir=temp_dir()) as tmp:
+        try:
+            shutil.copyfileobj(uploaded, tmp, chunk_size)
+        except Exception:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+        path = tmp.name
+
+    try:
+        uploaded.close()
+    except Exception:
+        pass
+    return path
+
+
+# =========================
+# Lectura por streaming
+# =========================
+
+class AudioSource:
+    """
+    Audio en disco leído por tramos con soundfile (seek + read): nunca se
+    decodifica el archivo entero. `read(start_sec, end_sec)` devuelve float32.
+    Con `channel` (base 0) solo se entrega ese canal, como audio mono.
+    """
+
+    def __init__(self, path: str, channel: int | None = None) -> None:
+        import soundfile as sf
+
+        self.path = str(path)
+        info = sf.info(self.path)
+        self.samplerate = int(info.samplerate)
+        self.source_channels = int(info.channels)
+        self.channel = _check_channel(channel, self.source_channels)
+        self.channels = 1 if self.channel is not None else self.source_channels
+        self.frames = int(info.frames)
+        self._sf = sf
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+    def read(self, start_sec: float = 0.0, end_sec: float | None = None) -> np.ndarray:
+        start = max(0, int(start_sec * self.samplerate))
+        stop = self.frames if end_sec is None else min(self.frames, int(end_sec * self.samplerate))
+        if stop <= start:
+            return np.zeros((0, self.channels) if self.channels > 1 else 0, dtype=np.float32)
+        with self._sf.SoundFile(self.path) as f:
+            f.seek(start)
+            data = f.read(stop - start, dtype="float32")
+        if self.channel is not None and data.ndim > 1:
+            data = np.ascontiguousarray(data[:, self.channel])
+        return data
+
+    def close(self) -> None:
+        pass
+
+    def envelope(self, points: int = _ENVELOPE_POINTS, per_channel: bool = False) -> tuple[np.ndarray, float]:
+        """
+        Envolvente (máximo absoluto mono por bloque) para la forma de onda,
+        calculada por bloques. Devuelve (valores, muestras_por_segundo); con
+        `per_channel`, valores es (bloques, canales).
+        """
+        width = self.channels if per_channel else 1
+        if not self.frames or not self.samplerate:
+            return np.zeros((0, width) if per_channel else 0, dtype=np.float32), float(self.samplerate or 1)
+
+        step = max(1, self.frames // max(1, points))
+        out = np.empty((self.frames // step + 1, width), dtype=np.float32)
+        n = 0
+        block = step * 4096
+        for buf in self._sf.blocks(self.path, blocksize=block, dtype="float32", always_2d=True):
+            if self.channel is not None:
+                buf = buf[:, self.channel : self.channel + 1]
+            n = _envelope_block(np.abs(buf) if per_channel else np.abs(buf).max(axis=1, keepdims=True), step, out, n)
+        return (out[:n] if per_channel else out[:n, 0]), self.samplerate / step
+
+
+class FfmpegSource:
+    """
+    Misma interfaz que AudioSource para formatos que soundfile no lee, con un
+    único proceso ffmpeg que entrega float32 a 16 kHz por un pipe (ya en la
+    frecuencia de Whisper). Los tramos se piden en orden, así que el proceso
+    se reutiliza de un `read` al siguiente; un salto hacia adelante descarta
+    lo intermedio y solo un salto hacia atrás relanza ffmpeg con `-ss`.
+    """
+
+    def __init__(self, path: str, channel: int | None = None) -> None:
+        from enacom_transcriptor.decoding import WHISPER_SR, probe_audio
+
+        self.path = str(path)
+        info = probe_audio(self.path)
+        self.samplerate = WHISPER_SR
+        self.source_channels = int(info["channels"])
+        self.channel = _check_channel(channel, self.source_channels)
+        self.channels = 1 if self.channel is not None else self.source_channels
+        self._proc: subprocess.Popen | None = None
+        self._pos = 0
+        self._envelope: tuple[np.ndarray, float] | None = None
+        if info["duration"] is not None:
+            self.frames = int(info["duration"] * self.samplerate)
+        else:
+            # Sin duración en el contenedor: se cuenta con la pasada de envolvente.
+            self.frames = 0
+            self._envelope = self._envelope_pass(_ENVELOPE_POINTS)
+            env, rate = self._envelope
+            self.frames = int(len(env) * self.samplerate / rate)
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+    def _open(self, start: int) -> None:
+        from enacom_transcriptor.decoding import ffmpeg_pcm_args
+        from enacom_transcriptor.runtime import ensure_ffmpeg
+
+        self.close()
+        ffmpeg = ensure_ffmpeg()
+        if not ffmpeg:
+            raise RuntimeError("No se encontró ffmpeg.")
+        args = ffmpeg_pcm_args(
+            ffmpeg, self.path, self.samplerate,
+            sample_fmt="f32le", channels=None, channel=self.channel, start_sec=start / self.samplerate,
+        )
+        self._proc = subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+        )
+        self._pos = start
+
+    def _pull(self, frames: int) -> np.ndarray:
+        from enacom_transcriptor.decoding import read_exact
+
+        width = 4 * self.channels
+        data = read_exact(self._proc.stdout, frames * width) if self._proc is not None else b""
+        usable = len(data) // width * width
+        self._pos += usable // width
+        return np.frombuffer(data[:usable], dtype="<f4").reshape(-1, self.channels)
+
+    def read(self, start_sec: float = 0.0, end_sec: float | None = None) -> np.ndarray:
+        start = max(0, int(start_sec * self.samplerate))
+        stop = self.frames if end_sec is None else min(self.frames, int(end_sec * self.samplerate))
+        if stop <= start:
+            return np.zeros((0, self.channels) if self.channels > 1 else 0, dtype=np.float32)
+
+        if self._proc is None or start < self._pos:
+            self._open(start)
+        skip_block = int(_PIPE_CHUNK_SEC * self.samplerate)
+        while self._pos < start:
+            if not len(self._pull(min(skip_block, start - self._pos))):
+                break
+
+        data = self._pull(stop - start)
+        if len(data) < stop - start:
+            # Fin real antes de lo que anunciaba el contenedor.
+            self.close()
+            self.frames = start + len(data)
+        return data[:, 0].copy() if self.channels == 1 else data.copy()
+
+    def _envelope_pass(self, points: int, per_channel: bool = False) -> tuple[np.ndarray, float]:
+        """Segunda pasada a baja frecuencia (mezcla, canal elegido o todos), por bloques."""
+        from enacom_transcriptor.decoding import close_stream, ffmpeg_pcm_args, popen_pcm, read_exact
+        from enacom_transcriptor.runtime import ensure_ffmpeg
+
+        ffmpeg = ensure_ffmpeg()
+        if not ffmpeg:
+            raise RuntimeError("No se encontró ffmpeg.")
+        width = self.channels if per_channel else 1
+        expected = int(self.duration * _ENVELOPE_SR)
+        step = max(1, expected // max(1, points)) if expected else max(1, _ENVELOPE_SR // 10)
+        proc = popen_pcm(
+            ffmpeg_pcm_args(
+                ffmpeg, self.path, _ENVELOPE_SR, sample_fmt="f32le",
+                channels=None if width > 1 else 1, channel=self.channel,
+            )
+        )
+        # Un bloque de salida cada `step` tramas; el pipe se lee en múltiplos exactos.
+        out = np.empty((max(expected // step, 1024) + 1, width), dtype=np.float32)
+        n = 0
+        try:
+            while True:
+                data = read_exact(proc.stdout, 4 * width * step * 4096)
+                usable = len(data) // (4 * width) * (4 * width)
+                if not usable:
+                    break
+                if len(out) - n < 4097:
+                    out = np.concatenate([out, np.empty_like(out)])
+                n = _envelope_block(np.abs(np.frombuffer(data[:usable], dtype="<f4").reshape(-1, width)), step, out, n)
+        finally:
+            close_stream(proc)
+        return (out[:n] if per_channel else out[:n, 0]), _ENVELOPE_SR / step
+
+    def envelope(self, points: int = _ENVELOPE_POINTS, per_channel: bool = False) -> tuple[np.ndarray, float]:
+        """Envolvente para la forma de onda; se calcula una vez por archivo."""
+        per_channel = per_channel and self.channels > 1
+        if self._envelope is None or (self._envelope[0].ndim == 2) != per_channel:
+            self._envelope = self._envelope_pass(points, per_channel)
+        return self._envelope
+
+    def close(self) -> None:
+        if self._proc is not None:
+            from enacom_transcriptor.decoding import close_stream
+
+            close_stream(self._proc)
+            self._proc = None
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _envelope_block(a: np.ndarray, step: int, out: np.ndarray, n: int) -> int:
+    """Máximos de `a` (tramas, canales) cada `step` tramas, escritos en out[n:]."""
+    usable = len(a) // step * step
+    if usable:
+        peaks = a[:usable].reshape(-1, step, a.shape[1]).max(axis=1)
+        out[n : n + len(peaks)] = peaks
+        n += len(peaks)
+    if usable < len(a):
+        out[n] = a[usable:].max(axis=0)
+        n += 1
+    return n
+
+
+def _check_channel(channel: int | None, available: int) -> int | None:
+    if channel is None or (available <= 1 and int(channel) == 0):
+        return None
+    if not 0 <= int(channel) < available:
+        raise ValueError(f"El audio tiene {available} canales; no existe el canal {int(channel) + 1}.")
+    return int(channel)
+
+
+def open_audio(path: str, channel: int | None = None):
+    """
+    AudioSource (soundfile) para WAV/FLAC/AIFF; para el resto, o si
+    soundfile no puede abrirlo, FfmpegSource. `channel` (base 0) elige un
+    canal; None mezcla como hasta ahora.
+    """
+    if Path(path).suffix.lower() in SOUNDFILE_EXTENSIONS:
+        try:
+            return AudioSource(path, channel)
+        except ValueError:
+            raise
+        except Exception:
+            pass
+    return FfmpegSource(path, channel)
+
+
+# =========================
+# Memoria
+# =========================
+
+def reset_peak_rss() -> None:
+    """
+    Reinicia el pico de memoria del proceso (Linux: /proc/self/clear_refs)
+    para medirlo por archivo. En otros sistemas no hace nada y el pico medido
+    es el acumulado del proceso.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _proc_status_kb(field: str) -> int | None:
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _win_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class _PMC(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    pmc = _PMC()
+    pmc.cb = ctypes.sizeof(_PMC)
+    proc = ctypes.windll.kernel32.GetCurrentProcess()
+    if ctypes.windll.psapi.GetProcessMemoryInfo(proc, ctypes.byref(pmc), pmc.cb):
+        return pmc
+    return None
+
+
+def rss_bytes() -> int | None:
+    """Memoria residente actual del proceso en bytes (None si no se puede medir)."""
+    rss = _proc_status_kb("VmRSS:")
+    if rss is not None or sys.platform != "win32":
+        return rss
+    try:
+        pmc = _win_memory_counters()
+        return int(pmc.WorkingSetSize) if pmc is not None else None
+    except Exception:
+        return None
+
+
+def peak_rss_bytes() -> int | None:
+    """Pico de memoria residente del proceso en bytes (None si no se puede medir)."""
+    peak = _proc_status_kb("VmHWM:")
+    if peak is not None:
+        return peak
+
+    if sys.platform == "win32":
+        try:
+            pmc = _win_memory_counters()
+            return int(pmc.PeakWorkingSetSize) if pmc is not None else None
+        except Exception:
+            return None
+
+    try:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(rss) if sys.platform == "darwin" else int(rss) * 1024
+    except Exception:
+        return None
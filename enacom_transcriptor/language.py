@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+
+
+# Detección de idioma una vez por archivo. Con language=None, Whisper detecta
+# el idioma en cada llamada a `transcribe` (una pasada extra del encoder por
+# segmento) y en audio de radio ruidoso puede cambiar de idioma a mitad del
+# archivo. Acá se detecta sobre los primeros tramos con habla y se fija.
+
+PROBE_SEC = 30.0              # ventana de Whisper
+MAX_PROBES = 3                # tramos con habla a promediar como máximo
+DEFAULT_THRESHOLD = 0.6       # probabilidad mínima para fijar el idioma
+SPEECH_RMS = 0.01             # por debajo, el tramo se considera silencio
+
+
+def _probe(model, source, start_sec: float, end_sec: float, preprocessor=None) -> dict[str, float] | None:
+    """Probabilidades de idioma de un tramo (None si es silencio)."""
+    import soundfile as sf
+    import whisper
+
+    from enacom_transcriptor.channels import model_lock
+    from enacom_transcriptor.engine import _mktemp_wav
+
+    data = source.read(start_sec, end_sec)
+    mono = data.mean(axis=1) if data.ndim > 1 else data
+    if not len(mono) or float(np.sqrt(np.mean(np.square(mono, dtype=np.float64)))) < SPEECH_RMS:
+        return None
+
+    if preprocessor is not None and preprocessor.enabled:
+        audio = whisper.pad_or_trim(preprocessor(mono, source.samplerate))
+    else:
+        path = _mktemp_wav()
+        try:
+            sf.write(path, mono, source.samplerate)
+            # load_audio remuestrea a 16 kHz con ffmpeg, igual que transcribe.
+            audio = whisper.pad_or_trim(whisper.load_audio(path))
+        finally:
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    n_mels = getattr(getattr(model, "dims", None), "n_mels", 80)
+    mel = whisper.log_mel_spectrogram(audio, n_mels=n_mels).to(model.device)
+    with model_lock(model):
+        _, probs = model.detect_language(mel)
+    return dict(probs)
+
+
+class LanguagePin:
+    """
+    Idioma fijado para un archivo.
+
+    `lang` es el idioma a pasar a `transcribe`: el configurado, el detectado
+    (si superó `threshold`) o None (Whisper sigue detectando por segmento,
+    como antes). Con `recheck_sec` > 0 se vuelve a detectar cada tantos
+    segundos de audio y, si otro idioma supera el umbral, se cambia.
+    """
+
+    def __init__(
+        self,
+        model,
+        source,
+        lang: str | None = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        recheck_sec: float = 0.0,
+        preprocessor=None,
+    ) -> None:
+        self.model = model
+        self.source = source
+        self.preprocessor = preprocessor
+        self.threshold = float(threshold)
+        self.recheck_sec = float(recheck_sec or 0.0)
+        self.fixed = lang is not None
+        self.lang = lang
+        self.probability: float | None = None   # de la detección inicial
+        self.changes: list[dict] = []
+        self._next_check = self.recheck_sec
+
+    def detect(self) -> str | None:
+        """Promedia hasta MAX_PROBES tramos con habla desde el inicio."""
+        if self.fixed:
+            return self.lang
+        total: dict[str, float] = {}
+        probes = 0
+        start = 0.0
+        duration = self.source.duration
+        while start < duration and probes < MAX_PROBES:
+            end = min(start + PROBE_SEC, duration)
+            try:
+                probs = _probe(self.model, self.source, start, end, self.preprocessor)
+            except Exception:
+                return None
+            start = end
+            if probs is None:
+                continue
+            probes += 1
+            for code, p in probs.items():
+                total[code] = total.get(code, 0.0) + p
+            best = max(total, key=total.get)
+            if total[best] / probes >= self.threshold:
+                break
+
+        if not total:
+            return None
+        best = max(total, key=total.get)
+        self.probability = total[best] / probes
+        if self.probability >= self.threshold:
+            self.lang = best
+        return self.lang
+
+    def recheck(self, position_sec: float) -> bool:
+        """Llamar antes de cada segmento; devuelve True si cambió el idioma."""
+        if self.fixed or self.lang is None or self.recheck_sec <= 0 or position_sec < self._next_check:
+            return False
+        self._next_check = position_sec + self.recheck_sec
+        try:
+            end = min(position_sec + PROBE_SEC, self.source.duration)
+            probs = _probe(self.model, self.source, position_sec, end, self.preprocessor)
+        except Exception:
+            return False
+        if not probs:
+            return False
+        best = max(probs, key=probs.get)
+        if best == self.lang or probs[best] < self.threshold:
+            return False
+        self.changes.append({"desde_sec": round(position_sec, 1), "de": self.lang, "a": best, "prob": round(probs[best], 3)})
+        self.lang = best
+        return True
+
+    def label(self) -> str:
+        """Texto para informes: 'es (0.97)', 'es (configurado)' o 'auto'."""
+        if self.lang is None:
+            return "auto" if self.probability is None else f"auto (no concluyente, {self.probability:.2f})"
+        if self.fixed:
+            return f"{self.lang} (configurado)"
+        first = self.changes[0]["de"] if self.changes else self.lang
+        text = f"{first} ({self.probability:.2f})" if self.probability is not None else first
+        if self.changes:
+            text += " — cambios: " + ", ".join(f"{c['a']} desde {int(c['desde_sec'])} s" for c in self.changes)
+        return text
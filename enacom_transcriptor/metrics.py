@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+
+# Métricas del proceso en formato de texto de Prometheus, sin dependencias.
+# Se exportan si se define alguna de estas variables de entorno (la app, la
+# vigilancia y el monitoreo en vivo llaman a `start_exporter` al arrancar):
+#   ENACOM_METRICS_PORT=9464              -> http://<host>:9464/metrics
+#   ENACOM_METRICS_ADDR=0.0.0.0           -> por defecto solo 127.0.0.1
+#   ENACOM_METRICS_TEXTFILE=/var/lib/node_exporter/enacom.prom
+#                                         -> textfile collector de node_exporter
+#   ENACOM_METRICS_INTERVAL=15            -> cada cuánto se reescribe el textfile
+# Con varios procesos en la misma máquina, cada uno necesita su puerto o su
+# propio .prom.
+
+PORT_ENV = "ENACOM_METRICS_PORT"
+ADDR_ENV = "ENACOM_METRICS_ADDR"
+TEXTFILE_ENV = "ENACOM_METRICS_TEXTFILE"
+INTERVAL_ENV = "ENACOM_METRICS_INTERVAL"
+
+log = logging.getLogger("enacom.metricas")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v == v else "NaN"
+
+
+class Registry:
+    """
+    Contadores y gauges con etiquetas. Los gauges también pueden ser
+    funciones que se evalúan al exportar (profundidad de cola, memoria).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._meta: dict[str, tuple[str, str]] = {}
+        self._values: dict[str, dict[tuple, float]] = {}
+        self._fns: dict[str, dict[tuple, Callable[[], float | None]]] = {}
+
+    def _declare(self, name: str, kind: str, help_: str) -> None:
+        if name not in self._meta:
+            self._meta[name] = (kind, help_)
+            self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, help_: str = "", **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "counter", help_)
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, help_: str = "", **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "gauge", help_)
+            self._values[name][key] = float(value)
+
+    def gauge_fn(self, name: str, fn: Callable[[], float | None], help_: str = "", **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "gauge", help_)
+            self._fns.setdefault(name, {})[key] = fn
+
+    def remove_fn(self, name: str, **labels) -> None:
+        with self._lock:
+            self._fns.get(name, {}).pop(tuple(sorted(labels.items())), None)
+
+    def get(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._values.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> str:
+        with self._lock:
+            meta = dict(self._meta)
+            values = {n: dict(s) for n, s in self._values.items()}
+            fns = {n: dict(s) for n, s in self._fns.items()}
+
+        for name, series in fns.items():
+            for key, fn in series.items():
+                try:
+                    v = fn()
+                except Exception:
+                    v = None
+                if v is not None:
+                    values.setdefault(name, {})[key] = float(v)
+
+        lines = []
+        for name in sorted(meta):
+            kind, help_ = meta[name]
+            if not values.get(name):
+                continue
+            if help_:
+                lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, v in sorted(values[name].items()):
+                lines.append(f"{name}{_labels(dict(key))} {_num(v)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# =========================
+# Instrumentación
+# =========================
+
+def record_segment(model: str, audio_sec: float, elapsed_sec: float, ok: bool = True) -> None:
+    """Un tramo enviado a Whisper: audio cubierto y tiempo de pared que tardó."""
+    model = model or "desconocido"
+    REGISTRY.inc("enacom_audio_seconds_total", max(0.0, audio_sec), "Segundos de audio transcriptos.", model=model)
+    REGISTRY.inc(
+        "enacom_transcribe_seconds_total", max(0.0, elapsed_sec), "Tiempo de pared en model.transcribe.", model=model
+    )
+    REGISTRY.inc("enacom_segments_total", 1, "Tramos enviados a Whisper.", model=model)
+    if not ok:
+        REGISTRY.inc("enacom_segment_errors_total", 1, "Tramos que fallaron (segment_errors).", model=model)
+    audio = REGISTRY.get("enacom_audio_seconds_total", model=model)
+    if audio > 0:
+        REGISTRY.set(
+            "enacom_realtime_factor",
+            REGISTRY.get("enacom_transcribe_seconds_total", model=model) / audio,
+            "Tiempo de transcripción / duración del audio (acumulado; < 1 es más rápido que tiempo real).",
+            model=model,
+        )
+
+
+def record_file(model: str, ok: bool = True) -> None:
+    REGISTRY.inc(
+        "enacom_files_total", 1, "Archivos procesados.", model=model or "desconocido", resultado="ok" if ok else "error"
+    )
+
+
+def record_model_load(model: str, seconds: float) -> None:
+    REGISTRY.set("enacom_model_load_seconds", seconds, "Duración de la última carga del modelo.", model=model)
+    REGISTRY.inc("enacom_model_loads_total", 1, "Cargas del modelo.", model=model)
+
+
+def set_queue_depth(cola: str, depth: float | Callable[[], float | None] | None) -> None:
+    """
+    Profundidad de una cola: un número, o una función que se evalúa al
+    exportar (p. ej. `queue.qsize`). None quita la función registrada.
+    """
+    help_ = "Elementos esperando en la cola."
+    if depth is None:
+        REGISTRY.remove_fn("enacom_queue_depth", cola=cola)
+    elif callable(depth):
+        REGISTRY.gauge_fn("enacom_queue_depth", depth, help_, cola=cola)
+    else:
+        REGISTRY.set("enacom_queue_depth", depth, help_, cola=cola)
+
+
+def _rss() -> float | None:
+    from enacom_transcriptor.ingest import rss_bytes
+
+    return rss_bytes()
+
+
+REGISTRY.gauge_fn("enacom_process_resident_memory_bytes", _rss, "Memoria residente del proceso.")
+REGISTRY.set("enacom_process_start_time_seconds", time.time(), "Inicio del proceso (epoch).")
+
+
+# =========================
+# Exportación
+# =========================
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args) -> None:
+        pass
+
+
+def write_textfile(path: str) -> None:
+    """Escribe las métricas de forma atómica (node_exporter no ve archivos a medias)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_exporter() -> None:
+    """Arranca el servidor HTTP y/o el textfile según el entorno (una vez por proceso)."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+
+    port = (os.environ.get(PORT_ENV) or "").strip()
+    if port:
+        addr = (os.environ.get(ADDR_ENV) or "127.0.0.1").strip()
+        try:
+            server = ThreadingHTTPServer((addr, int(port)), _Handler)
+        except (OSError, ValueError) as e:
+            log.warning("no se pudo exponer métricas en %s:%s: %s", addr, port, e)
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="enacom-metricas", daemon=True).start()
+
+    path = (os.environ.get(TEXTFILE_ENV) or "").strip()
+    if path:
+        try:
+            interval = max(1.0, float(os.environ.get(INTERVAL_ENV) or 15))
+        except ValueError:
+            interval = 15.0
+
+        def _loop() -> None:
+            while True:
+                try:
+                    write_textfile(path)
+                except OSError as e:
+                    log.warning("no se pudo escribir %s: %s", path, e)
+                time.sleep(interval)
+
+        threading.Thread(target=_loop, name="enacom-metricas-archivo", daemon=True).start()
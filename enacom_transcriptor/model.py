@@ -1,24 +1,47 @@
 from __future__ import annotations
 
+import time
+
 import streamlit as st
-import whisper
+
+from enacom_transcriptor import metrics
 
 
 ALLOWED_MODELS = ("small", "medium")
 
 
+def normalize_model_size(model_size: str | None) -> str:
+    """Solo permite small/medium; cualquier otro valor se corrige a 'small'."""
+    model_size = (model_size or "small").strip().lower()
+    return model_size if model_size in ALLOWED_MODELS else "small"
+
+
+def load_model(model_size: str):
+    """
+    Carga Whisper sin caché ni UI (procesos sin Streamlit, p. ej. la
+    vigilancia de carpetas). Lanza la excepción si falla.
+    """
+    # Import diferido: whisper arrastra torch (varios segundos de arranque)
+    # y solo hace falta al iniciar un procesamiento.
+    import whisper
+
+    model_size = normalize_model_size(model_size)
+    t0 = time.perf_counter()
+    model = whisper.load_model(model_size)
+    metrics.record_model_load(model_size, time.perf_counter() - t0)
+    return model
+
+
 @st.cache_resource(show_spinner=False)
 def load_model_cached(model_size: str):
     """
     Carga Whisper (cacheado). Solo permite small/medium.
     Si llega otro, lo corrige a 'small'.
     """
-    model_size = (model_size or "small").strip().lower()
-    if model_size not in ALLOWED_MODELS:
-        model_size = "small"
+    model_size = normalize_model_size(model_size)
 
     try:
-        return whisper.load_model(model_size)
+        return load_model(model_size)
     except Exception as e:
         st.error(f"No se pudo cargar el modelo Whisper '{model_size}': {e}")
         return None
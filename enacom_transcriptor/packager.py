@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import zipfile
+from pathlib import Path
+
+from enacom_transcriptor.paths import finalize_partial, partial_path
+
+
+# Formatos que ya vienen comprimidos (XLSX/DOCX son ZIP; Parquet usa zstd;
+# audio/video con códec propio): volver a comprimirlos solo gasta CPU.
+STORED_EXTS = frozenset(
+    {
+        ".xlsx", ".docx", ".zip", ".parquet", ".png", ".jpg",
+        ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".flac", ".amr", ".wma",
+        ".mp4", ".mkv", ".webm", ".mov", ".wav",
+    }
+)
+
+# Deflate por defecto: es lo único que abren el Explorador de Windows y la
+# mayoría de los descompresores. zstd (zipfile desde Python 3.14) comprime
+# mejor y más rápido, pero solo se usa si se pide explícitamente.
+ZSTD_AVAILABLE = hasattr(zipfile, "ZIP_ZSTANDARD")
+
+_CHUNK = 1024 * 1024
+
+
+def compression_for(name: str, zstd: bool = False) -> int:
+    """Método de compresión por entrada según la extensión."""
+    if Path(name).suffix.lower() in STORED_EXTS:
+        return zipfile.ZIP_STORED
+    if zstd and ZSTD_AVAILABLE:
+        return zipfile.ZIP_ZSTANDARD
+    return zipfile.ZIP_DEFLATED
+
+
+class RunZipWriter:
+    """
+    ZIP de una corrida escrito directamente en disco a medida que los archivos
+    quedan listos (`add`), con compresión elegida por entrada y copia por
+    bloques (nunca se carga un archivo entero en memoria).
+
+    Se escribe como `.~part.zip` y se renombra al cerrar: nadie ve un ZIP a medias.
+    Con `zstd=True` (y Python 3.14+) los archivos de texto van con zstd.
+    """
+
+    def __init__(self, zip_path: str, zstd: bool = False) -> None:
+        self.path = str(zip_path)
+        self.zstd = bool(zstd) and ZSTD_AVAILABLE
+        self._tmp = partial_path(self.path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._zf = zipfile.ZipFile(self._tmp, "w", allowZip64=True)
+        self._names: set[str] = set()
+        self._added: set[str] = set()
+
+    def _unique(self, arcname: str) -> str:
+        if arcname not in self._names:
+            return arcname
+        p = Path(arcname)
+        n = 2
+        while True:
+            cand = str(p.with_name(f"{p.stem}_{n}{p.suffix}")).replace(os.sep, "/")
+            if cand not in self._names:
+                return cand
+            n += 1
+
+    def add(self, path: str, arcname: str | None = None) -> bool:
+        """Agrega un archivo (una sola vez por ruta). Devuelve False si no existe."""
+        if not path or path in self._added or not os.path.exists(path):
+            return False
+
+        arcname = self._unique(arcname or Path(path).name)
+        zinfo = zipfile.ZipInfo.from_file(path, arcname=arcname)
+        zinfo.compress_type = compression_for(arcname, self.zstd)
+
+        with open(path, "rb") as src, self._zf.open(zinfo, "w") as dst:
+            shutil.copyfileobj(src, dst, _CHUNK)
+
+        self._names.add(arcname)
+        self._added.add(path)
+        return True
+
+    def add_many(self, paths: list[str]) -> int:
+        return sum(1 for p in paths if self.add(p))
+
+    def add_bytes(self, arcname: str, data: bytes) -> None:
+        arcname = self._unique(arcname)
+        self._zf.writestr(arcname, data, compress_type=compression_for(arcname, self.zstd))
+        self._names.add(arcname)
+
+    def close(self, meta: dict | None = None) -> str | None:
+        """Escribe meta.json (si se pasa) y cierra. Devuelve la ruta del ZIP."""
+        try:
+            if meta is not None:
+                self.add_bytes("meta.json", json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
+        finally:
+            self._zf.close()
+        finalize_partial(self._tmp)
+        return self.path if os.path.exists(self.path) else None
+
+    def abort(self) -> None:
+        try:
+            self._zf.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self._tmp)
+        except Exception:
+            pass
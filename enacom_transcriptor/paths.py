@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import os
+from contextlib import contextmanager
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -7,7 +9,12 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 ASSETS_DIR = BASE_DIR / "assets"
 STYLES_DIR = BASE_DIR / "styles"
 BIN_DIR = BASE_DIR / "bin"
-BACKUP_DIR = BASE_DIR / "transcripciones"
+# Con ENACOM_DATA_DIR, corridas, catálogo y huellas van a otra carpeta
+# (benchmarks, pruebas o un disco de datos aparte).
+DATA_DIR_ENV = "ENACOM_DATA_DIR"
+BACKUP_DIR = Path(os.environ.get(DATA_DIR_ENV) or BASE_DIR / "transcripciones")
+CATALOG_PATH = BACKUP_DIR / "catalogo.sqlite"
+FINGERPRINT_PATH = BACKUP_DIR / "huellas.sqlite"
 LOGO_PATH = ASSETS_DIR / "logo_enacom.png"
 CSS_PATH = STYLES_DIR / "enacom.css"
 TEMPLATE_PATH = ASSETS_DIR / "plantilla_enacom.docx"
@@ -16,3 +23,100 @@ def ensure_dirs() -> None:
     """Crea carpetas esperadas por la app (idempotente)."""
     for p in (ASSETS_DIR, STYLES_DIR, BIN_DIR, BACKUP_DIR):
         p.mkdir(parents=True, exist_ok=True)
+
+
+def unique_dir(base: Path) -> Path:
+    """
+    Crea y devuelve un directorio nuevo `base` (o `base_2`, `base_3`, ...).
+    mkdir es atómico: dos sesiones concurrentes nunca reciben el mismo.
+    """
+    base.parent.mkdir(parents=True, exist_ok=True)
+    cand, n = base, 1
+    while True:
+        try:
+            cand.mkdir()
+            return cand
+        except FileExistsError:
+            n += 1
+            cand = base.with_name(f"{base.name}_{n}")
+
+
+# Salidas en curso: salida.~part.ext. Con ".part" a secas, un audio subido
+# como "reunion.part.1.wav" generaba salidas terminadas que parecían a medio
+# escribir (y el barrido de huérfanos las borraba).
+PART_MARKER = ".~part"
+# Carpeta de corrida en uso: contiene el PID del proceso que la escribe.
+ACTIVE_MARKER = ".~en_curso"
+
+
+def partial_path(final: str) -> str:
+    """Ruta de escritura en curso: salida.txt -> salida.~part.txt (conserva la extensión)."""
+    p = Path(final)
+    return str(p.with_name(f"{p.stem}{PART_MARKER}{p.suffix}"))
+
+
+def partial_base(base: str) -> str:
+    """Base en curso para open_sinks: salida -> salida.~part (+ .jsonl, .srt, ...)."""
+    return f"{base}{PART_MARKER}"
+
+
+def finalize_partial(part: str) -> str:
+    """Renombra (atómico) salida.~part.ext -> salida.ext y devuelve la ruta final."""
+    p = Path(part)
+    marker = f"{PART_MARKER}{p.suffix}"
+    if not p.name.endswith(marker):
+        return str(p)
+    final = p.with_name(p.name[: -len(marker)] + p.suffix)
+    os.replace(str(p), str(final))
+    return str(final)
+
+
+@contextmanager
+def run_active(run_dir: Path):
+    """
+    Marca `run_dir` como en uso por este proceso mientras dura el bloque:
+    storage.sweep_orphans no toca sus archivos en curso.
+    """
+    marker = Path(run_dir) / ACTIVE_MARKER
+    marker.write_text(str(os.getpid()), encoding="utf-8")
+    try:
+        yield
+    finally:
+        try:
+            marker.unlink()
+        except OSError:
+            pass
+
+
+def pid_alive(pid: int) -> bool:
+    """True si el proceso `pid` sigue vivo (o existe y no tenemos permiso sobre él)."""
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        try:
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def run_is_active(run_dir: Path) -> bool:
+    """True si `run_dir` tiene la marca de run_active de un proceso vivo."""
+    try:
+        pid = int((Path(run_dir) / ACTIVE_MARKER).read_text(encoding="utf-8").strip())
+    except (OSError, ValueError):
+        return False
+    return pid_alive(pid)
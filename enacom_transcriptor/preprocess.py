@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import numpy as np
+
+
+# Preprocesamiento del audio antes de Whisper, vectorizado con NumPy y por
+# tramo (cada segmento de transcripción es un bloque independiente):
+#
+#   1. Mezcla a mono.
+#   2. Remuestreo a 16 kHz en el dominio de la frecuencia (una rfft/irfft):
+#      recortar el espectro sobre la nueva Nyquist es el antialias ideal, y en
+#      la misma pasada se quita la continua (< LOW_CUT_HZ) y, opcionalmente,
+#      se limita a la banda de voz de radio.
+#   3. Compuerta de ruido opcional: atenúa las tramas de 20 ms cercanas al
+#      piso de ruido del tramo.
+#   4. Normalización de sonoridad: RMS de las tramas activas a TARGET_RMS
+#      (con ganancia máxima acotada) y limitador suave de picos.
+#
+# El resultado (float32 mono 16 kHz) se pasa directo a `model.transcribe`,
+# sin WAV temporal ni decodificación con ffmpeg.
+
+TARGET_SR = 16000
+LOW_CUT_HZ = 60.0
+VOICE_BAND_HZ = (250.0, 3800.0)
+TRANSITION_HZ = 50.0
+TARGET_RMS = 0.1               # -20 dBFS
+MAX_GAIN = 10.0                # +20 dB
+FRAME_SEC = 0.02
+GATE_OVER_FLOOR = 2.0          # +6 dB sobre el piso de ruido
+GATE_ATTENUATION = 0.1         # -20 dB
+LIMIT_KNEE = 0.9
+
+DEFAULT_PREPROCESS = {
+    "enabled": True,
+    "normalizar": True,
+    "banda_voz": False,
+    "puerta_ruido": False,
+}
+
+
+def _fast_len(n: int) -> int:
+    """Menor largo >= n de la forma 2^a·3^b·5^c (FFT rápida)."""
+    best = 1 << max(0, (n - 1).bit_length())
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            m = p35
+            while m < n:
+                m *= 2
+            best = min(best, m)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _band_mask(freqs: np.ndarray, low: float, high: float | None) -> np.ndarray:
+    """Máscara con transiciones de coseno alzado (evita el ringing de un corte abrupto)."""
+    mask = np.clip((freqs - (low - TRANSITION_HZ)) / TRANSITION_HZ, 0.0, 1.0)
+    if high is not None:
+        mask *= np.clip(((high + TRANSITION_HZ) - freqs) / TRANSITION_HZ, 0.0, 1.0)
+    return 0.5 - 0.5 * np.cos(np.pi * mask)
+
+
+def resample_filter(
+    x: np.ndarray, sr: int, target_sr: int = TARGET_SR, low_hz: float = LOW_CUT_HZ, high_hz: float | None = None
+) -> np.ndarray:
+    """Remuestrea `x` (mono) a `target_sr` y aplica el pasa-banda, en una sola FFT."""
+    n = len(x)
+    out_len = int(round(n * target_sr / sr))
+    if not n or not out_len:
+        return np.zeros(out_len, dtype=np.float32)
+
+    # Relleno: la FFT es circular y sin él el final "contamina" el comienzo.
+    nfft = _fast_len(n + int(0.05 * sr))
+    spec = np.fft.rfft(x, nfft)
+    spec *= _band_mask(np.fft.rfftfreq(nfft, 1.0 / sr), low_hz, high_hz)
+
+    m = int(round(nfft * target_sr / sr))
+    out = np.zeros(m // 2 + 1, dtype=spec.dtype)
+    k = min(len(out), len(spec))
+    out[:k] = spec[:k]
+    y = np.fft.irfft(out, m) * (m / nfft)
+    return y[:out_len].astype(np.float32)
+
+
+def _frame_rms(y: np.ndarray, frame: int) -> np.ndarray:
+    usable = len(y) // frame * frame
+    if not usable:
+        return np.sqrt(np.mean(np.square(y, dtype=np.float64), keepdims=True))
+    rms = np.sqrt(np.mean(np.square(y[:usable].reshape(-1, frame), dtype=np.float64), axis=1))
+    if usable < len(y):
+        rms = np.append(rms, np.sqrt(np.mean(np.square(y[usable:], dtype=np.float64))))
+    return rms
+
+
+def _active(rms: np.ndarray) -> np.ndarray:
+    """Tramas por encima del piso de ruido (todas las no silenciosas si no hay dinámica)."""
+    threshold = max(float(np.percentile(rms, 10)) * GATE_OVER_FLOOR, 1e-4)
+    if threshold >= float(np.percentile(rms, 90)):
+        threshold = 1e-4
+    return rms > threshold
+
+
+def noise_gate(y: np.ndarray, sr: int = TARGET_SR) -> np.ndarray:
+    frame = max(1, int(FRAME_SEC * sr))
+    gain = np.where(_active(_frame_rms(y, frame)), 1.0, GATE_ATTENUATION)
+    # Suavizado de 5 tramas (100 ms) para no generar clics.
+    gain = np.convolve(gain, np.ones(5) / 5, mode="same")
+    return (y * np.repeat(gain, frame)[: len(y)]).astype(np.float32)
+
+
+def normalize_loudness(y: np.ndarray, sr: int = TARGET_SR) -> np.ndarray:
+    rms = _frame_rms(y, max(1, int(FRAME_SEC * sr)))
+    active = rms[_active(rms)]
+    level = float(np.sqrt(np.mean(np.square(active)))) if len(active) else 0.0
+    if level > 0:
+        y = y * min(MAX_GAIN, TARGET_RMS / level)
+    # Limitador suave: lo que pasa de LIMIT_KNEE se comprime hacia 1.0.
+    a = np.abs(y)
+    over = a > LIMIT_KNEE
+    if over.any():
+        y = np.where(over, np.sign(y) * (LIMIT_KNEE + (1 - LIMIT_KNEE) * np.tanh((a - LIMIT_KNEE) / (1 - LIMIT_KNEE))), y)
+    return y.astype(np.float32)
+
+
+class Preprocessor:
+    """
+    `pre(data, samplerate)` devuelve float32 mono a 16 kHz. Acumula el
+    costo de CPU y el audio procesado para informarlo (`summary()`); se
+    puede llamar desde varios hilos (transcripción por canal).
+    """
+
+    def __init__(self, config: dict | None = None) -> None:
+        self.config = {**DEFAULT_PREPROCESS, **(config or {})}
+        self.enabled = bool(self.config["enabled"])
+        self.cpu_sec = 0.0
+        self.audio_sec = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, data: np.ndarray, samplerate: int) -> np.ndarray:
+        t0 = time.thread_time()
+        x = data.mean(axis=1) if data.ndim > 1 else data
+        x = x.astype(np.float32, copy=False)
+
+        high = VOICE_BAND_HZ[1] if self.config["banda_voz"] else None
+        low = VOICE_BAND_HZ[0] if self.config["banda_voz"] else LOW_CUT_HZ
+        y = resample_filter(x, samplerate, TARGET_SR, low, high)
+        if self.config["puerta_ruido"]:
+            y = noise_gate(y)
+        if self.config["normalizar"]:
+            y = normalize_loudness(y)
+
+        cpu = time.thread_time() - t0
+        with self._lock:
+            self.cpu_sec += cpu
+            self.audio_sec += len(x) / samplerate if samplerate else 0.0
+        return y
+
+    def summary(self) -> dict:
+        return {
+            **{k: bool(v) for k, v in self.config.items()},
+            "cpu_s": round(self.cpu_sec, 3),
+            "audio_s": round(self.audio_sec, 1),
+            "cpu_por_hora_audio_s": round(3600 * self.cpu_sec / self.audio_sec, 2) if self.audio_sec else None,
+        }
@@ -1,37 +1,20 @@
 from __future__ import annotations
 
-import datetime
 import html
-import json
-import math
-import os
-import pickle
-import tempfile
-import time
-import zipfile
+from functools import partial
 from pathlib import Path
 
-import pandas as pd
-import soundfile as sf
 import streamlit as st
 
-from enacom_transcriptor.audio_ui import hhmmss, visualizar_audio, audio_player_with_jumps
-from enacom_transcriptor.exporters import (
-    append_to_excel,
-    ensure_excel_file,
-    generar_informe_word,
-    write_infracciones_excel,
-)
-from enacom_transcriptor.infracciones import detectar_infracciones_en_texto
+from enacom_transcriptor import alerts
+from enacom_transcriptor.audio_ui import hhmmss, hhmmss_cs, visualizar_audio, audio_player_with_jumps
+from enacom_transcriptor.engine import RunHooks, process_batch
+from enacom_transcriptor.infracciones import ubicar_en_palabras
+from enacom_transcriptor.ingest import spool_upload
 from enacom_transcriptor.model import load_model_cached
-from enacom_transcriptor.paths import BACKUP_DIR
 from enacom_transcriptor.runtime import ensure_ffmpeg
-
-
-def _mktemp_wav() -> str:
-    fd, p = tempfile.mkstemp(suffix=".wav")
-    os.close(fd)
-    return p
+from enacom_transcriptor.ui import k, reset_lazy_downloads
+from enacom_transcriptor.segments import format_line
 
 
 def render_live_transcript(container, text: str, height: int = 200) -> None:
@@ -53,32 +36,158 @@ def render_live_transcript(container, text: str, height: int = 200) -> None:
     )
 
 
-def _speaker_for(t: float, diar: list[dict] | None) -> str:
-    if not diar:
-        return ""
-    for s in diar:
-        if float(s.get("start", 0.0)) <= t <= float(s.get("end", 0.0)):
-            return str(s.get("speaker", "") or "")
-    return ""
+class _PanelHooks(RunHooks):
+    """
+    Callbacks del motor (engine.RunHooks) para el panel de procesamiento:
+    tarjeta, forma de onda y reproductor por archivo, transcripción en vivo,
+    coincidencias, chips de avance y resultados en session_state.
+    """
+
+    def __init__(self, total_files: int, query: str, files_status, files_bar) -> None:
+        super().__init__(log=lambda msg: None)
+        self.total_files = total_files
+        self.query = query
+        self.files_status = files_status
+        self.files_bar = files_bar
+
+    def info(self, msg: str, icon: str | None = None) -> None:
+        st.info(msg, icon=icon)
+
+    def caption(self, msg: str) -> None:
+        st.caption(msg)
+
+    def warning(self, msg: str) -> None:
+        st.warning(msg)
+
+    def error(self, msg: str) -> None:
+        st.error(msg)
+
+    def busy(self, label: str):
+        return st.spinner(label)
+
+    def file_started(self, idx, archivo, audio_path, source, num_segments, por_canal) -> None:
+        st.markdown("<hr>", unsafe_allow_html=True)
+        st.markdown(
+            f"<div class='enacom-card'><b>🎧 Archivo {idx+1}/{self.total_files}:</b> {html.escape(archivo)}</div>",
+            unsafe_allow_html=True,
+        )
+        col_left, col_right = st.columns([2.3, 1.2], gap="large")
+
+        with col_right:
+            with st.container(border=True):
+                env, env_rate = source.envelope(per_channel=por_canal)
+                visualizar_audio(env_rate, env, title=f"📈 Forma de onda — {archivo}")
+                del env
+                audio_player_with_jumps(audio_path, key_suffix=f"_{idx}")
+
+                st.divider()
+                st.markdown("#### 🔎 Coincidencias")
+                self.search_box = st.empty()
+
+        with col_left:
+            with st.container(border=True):
+                st.markdown("#### Estado")
+                st.caption(f"Duración: {hhmmss(int(source.duration))} • Segmentos: {num_segments}")
+
+                chip_c1, chip_c2, chip_c3 = st.columns(3)
+                self.chip_seg = chip_c1.empty()
+                self.chip_speed = chip_c2.empty()
+                self.chip_err = chip_c3.empty()
+
+                self.progress_bar = st.progress(0.0)
+                self.progress_caption = st.empty()
+
+                st.divider()
+                st.markdown("#### 📝 Transcripción en vivo")
+                self.live_box = st.empty()
+
+        self.chip_seg.metric("Segmento", f"0/{num_segments}")
+        self.chip_speed.metric("Velocidad", "—")
+        self.chip_err.metric("Errores", "0")
+        self.progress_caption.caption("0.0% • 0/0 • ETA 0:00:00")
+
+    def segment(self, store, seg_idx, rec) -> None:
+        live_text = "\n".join(format_line(x["start"], x["end"], x["speaker"], x["text"]) for x in store.tail(60))
+        render_live_transcript(self.live_box, live_text, height=200)
+
+        if not self.query:
+            self.search_box.empty()
+            return
+        hits = store.search(self.query)
+        if not hits:
+            self.search_box.markdown("_Sin coincidencias hasta el momento._")
+            return
+        out_lines = []
+        for h in hits[-6:]:
+            span = ubicar_en_palabras(self.query, store.words_of(h), coincidencia_parcial=True)
+            if span:
+                ini, fin = hhmmss_cs(span[0]), hhmmss_cs(span[1])
+            else:
+                ini, fin = hhmmss(int(store.start[h])), hhmmss(int(store.end[h]))
+            out_lines.append(f"- [{ini} → {fin}] {store.texts[h]}")
+        self.search_box.markdown("#### 🔎 Coincidencias\n" + "\n".join(out_lines))
+
+    def progress(self, done, num_segments, errores, seg_rate, eta_sec) -> None:
+        percent = min(1.0, done / num_segments) if num_segments else 1.0
+        self.chip_seg.metric("Segmento", f"{done}/{num_segments}")
+        self.chip_speed.metric("Velocidad", f"{seg_rate:.2f} seg/s" if seg_rate > 0 else "—")
+        self.chip_err.metric("Errores", str(errores))
+        self.progress_bar.progress(percent)
+        self.progress_caption.caption(f"{percent*100:.1f}% • {done}/{num_segments} • ETA {hhmmss(eta_sec)}")
+
+    def file_done(self, idx, result) -> None:
+        import pandas as pd
+
+        archivo = result["archivo"]
+        if len(result["segments"]) == 0 and result["errores"] > 0:
+            st.error(f"⚠️ {archivo}: no se obtuvo texto (segmentos con error: {result['errores']}).")
+        else:
+            st.success(f"✅ Transcripción finalizada: {archivo}")
+
+        with st.expander("⚠️ Infracciones detectadas en este archivo", expanded=False):
+            if result["infracciones"]:
+                st.dataframe(pd.DataFrame(list(result["infracciones"])), use_container_width=True)
+            else:
+                st.info("No se detectaron infracciones (según la configuración).")
 
+        revision = result["revision"]
+        with st.expander(f"🔁 Regiones de baja confianza a revisar ({len(revision)})", expanded=False):
+            if revision:
+                st.dataframe(pd.DataFrame(revision), use_container_width=True)
+            else:
+                st.info("No hay regiones de baja confianza.")
 
-def _make_run_zip(zip_path: str, meta: dict, paths: list[str]) -> str | None:
-    try:
-        zp = Path(zip_path)
-        zp.parent.mkdir(parents=True, exist_ok=True)
+        st.session_state.resultados.append(
+            {key: result[key] for key in ("archivo", "file_base", "txt", "xlsx", "docx")}
+        )
 
-        with zipfile.ZipFile(str(zp), "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            zf.writestr("meta.json", json.dumps(meta, ensure_ascii=False, indent=2))
-            for p in paths:
-                if p and os.path.exists(p):
-                    zf.write(p, arcname=Path(p).name)
+    def files_progress(self, done, total) -> None:
+        self.files_status.metric("Archivos procesados", f"{done} / {total}")
+        self.files_bar.progress(done / total if total else 1.0)
 
-        return str(zp) if zp.exists() else None
-    except Exception:
-        return None
+    def lote_done(self, outputs) -> None:
+        final_of = {Path(p).suffix: p for p in outputs}
+        lote_base = Path(outputs[0]).stem if outputs else ""
+        st.session_state.lote_result = {
+            "archivo": f"LOTE — {lote_base}",
+            "file_base": lote_base,
+            "txt": final_of.get(".txt"),
+            "xlsx": final_of.get(".xlsx"),
+            "docx": final_of.get(".docx"),
+        }
+        st.success("🎉 Lote completo procesado.")
+
+    def package_done(self, zip_path) -> None:
+        st.session_state.run_package = zip_path
+        st.success("📦 Paquete ZIP de archivos generado.")
 
 
 def run_processing(cfg: dict, sidebar: dict) -> None:
+    """
+    Panel de procesamiento por lotes. La corrida la hace el motor
+    (engine.process_batch); acá solo se arma la configuración, se vuelcan
+    las subidas a disco de a una y se muestra el avance con _PanelHooks.
+    """
     st.session_state.setdefault("procesado", False)
     st.session_state.setdefault("resultados", [])
     st.session_state.setdefault("lote_result", None)
@@ -87,27 +196,23 @@ def run_processing(cfg: dict, sidebar: dict) -> None:
 
     audio_files = sidebar.get("audio_files") or []
     query_busqueda = (sidebar.get("query_busqueda") or "").strip()
-    coincidencia_parcial = bool(sidebar.get("coincidencia_parcial", True))
+    canales = sidebar.get("canales") or {}  # archivo -> canal (base 0) o None = mezcla
 
     infracciones_cfg = cfg.get("infracciones") or []
     segment_duration = int(cfg.get("segment_duration", 30))
+    auto_tune = bool(cfg.get("auto_tune", False))
     modo_lote = cfg.get("modo_lote", "Individual")
 
-    export_zip = bool(cfg.get("export_zip", True))
-    diarization = bool(cfg.get("diarization", False))
-
     model_size = (cfg.get("model_size") or "small").strip().lower()
     if model_size not in ("small", "medium"):
         model_size = "small"
 
-    lang = cfg.get("lang")  # None => auto
-
     if audio_files:
         st.markdown("#### 📊 Panel de control del procesamiento")
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("Archivos cargados", len(audio_files))
         c2.metric("Modo", modo_lote)
-        c3.metric("Duración segmento (s)", segment_duration)
+        c3.metric("Duración segmento (s)", "auto" if auto_tune else segment_duration)
         c4.metric("Términos de infracción", len(infracciones_cfg))
 
     iniciar = st.button("Iniciar procesamiento de audios", use_container_width=True)
@@ -130,6 +235,8 @@ def run_processing(cfg: dict, sidebar: dict) -> None:
     st.session_state.lote_result = None
     st.session_state.run_meta = None
     st.session_state.run_package = None
+    st.session_state.run_package_fallback = None
+    reset_lazy_downloads()
 
     total_files = len(audio_files)
 
@@ -139,388 +246,99 @@ def run_processing(cfg: dict, sidebar: dict) -> None:
     files_bar = s2.progress(0.0)
     files_status.metric("Archivos procesados", f"0 / {total_files}")
 
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_base = f"corrida_{timestamp}"
-    lote_base = f"lote_{timestamp}"
-
-    L_TXT_PATH = str(BACKUP_DIR / f"{lote_base}.txt")
-    L_XLSX_PATH = str(BACKUP_DIR / f"{lote_base}.xlsx")
-    L_DOCX_PATH = str(BACKUP_DIR / f"{lote_base}.docx")
-    RUN_ZIP_PATH = str(BACKUP_DIR / f"{run_base}.zip")
-
-    infracciones_lote: list[dict] = []
-    files_info: list[dict] = []
-    generated_paths: list[str] = []
-
-    IND_HEADERS = ("Inicio", "Fin", "Hablante", "Texto")
-    LOTE_HEADERS = ("Archivo", "Inicio", "Fin", "Hablante", "Texto")
+    run_cfg = {
+        **cfg,
+        "model_size": model_size,
+        "coincidencia_parcial": bool(sidebar.get("coincidencia_parcial", True)),
+        "export_zip": bool(cfg.get("export_zip", True)),
+    }
+    # Ingesta: cada subida se vuelca a disco por bloques recién cuando le
+    # toca y se libera; el motor borra el temporal al terminar el archivo.
+    entradas = [
+        {"archivo": f.name, "abrir": partial(spool_upload, f), "canal": canales.get(f.name)} for f in audio_files
+    ]
+    hooks = _PanelHooks(total_files, query_busqueda, files_status, files_bar)
+    st.session_state.run_meta = process_batch(
+        model, entradas, run_cfg, modo=modo_lote, hooks=hooks, alertas=alerts.get_dispatcher()
+    )
+    st.session_state.procesado = True
 
-    if modo_lote == "Combinado":
-        ensure_excel_file(L_XLSX_PATH, {"Transcripción": LOTE_HEADERS})
-        with open(L_TXT_PATH, "w", encoding="utf-8") as f:
-            f.write(f"Transcripción consolidada ENACOM — {datetime.datetime.now():%Y-%m-%d %H:%M:%S}\n\n")
-        generated_paths.extend([L_TXT_PATH, L_XLSX_PATH])
 
-    for idx, audio_file in enumerate(audio_files):
-        st.markdown("<hr>", unsafe_allow_html=True)
-        st.markdown(
-            f"<div class='enacom-card'><b>🎧 Archivo {idx+1}/{total_files}:</b> {audio_file.name}</div>",
-            unsafe_allow_html=True,
+def run_live(cfg: dict) -> None:
+    """
+    Monitoreo en vivo: transcribe una fuente que no termina (stream, URL o
+    archivo que sigue creciendo) en ventanas móviles, con el mismo panel de
+    transcripción en vivo y alertas en el momento de cada infracción.
+    """
+    with st.expander("📡 Monitoreo en vivo (stream / grabación en curso)", expanded=False):
+        c1, c2 = st.columns([3, 1])
+        fuente = c1.text_input(
+            "Fuente",
+            "",
+            key=k("live_src"),
+            placeholder="rtsp://…, http://…/radio.mp3 o ruta a una grabación en curso",
         )
-
-        suffix = Path(audio_file.name).suffix or ".wav"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(audio_file.read())
-            tmp_path = tmp.name
-
-        try:
-            data, samplerate = sf.read(tmp_path)
-        except Exception as e:
-            st.error(f"No se pudo leer el audio {audio_file.name}: {e}")
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
-            files_status.metric("Archivos procesados", f"{idx+1} / {total_files}")
-            files_bar.progress((idx + 1) / total_files)
-            continue
-
-        total_duration = len(data) / samplerate if samplerate else 0.0
-        num_segments = max(1, math.ceil(total_duration / segment_duration))
-
-        diar = None
-        if diarization:
-            try:
-                from enacom_transcriptor.diarization import diarize_audio
-
-                with st.spinner("Diarización (experimental)…"):
-                    diar = diarize_audio(data, samplerate)
-
-                if diar is None:
-                    st.info("Diarización no disponible. Se continúa sin hablantes.")
-            except Exception:
-                diar = None
-                st.info("Diarización no disponible. Se continúa sin hablantes.")
-
-        col_left, col_right = st.columns([2.3, 1.2], gap="large")
-
-        with col_right:
-            with st.container(border=True):
-                visualizar_audio(samplerate, data, title=f"📈 Forma de onda — {audio_file.name}")
-                audio_player_with_jumps(tmp_path, key_suffix=f"_{idx}")
-
-                st.divider()
-                st.markdown("#### 🔎 Coincidencias")
-                search_box = st.empty()
-
-        with col_left:
-            with st.container(border=True):
-                st.markdown("#### Estado")
-                st.caption(f"Duración: {hhmmss(int(total_duration))} • Segmentos: {num_segments}")
-
-                chip_c1, chip_c2, chip_c3 = st.columns(3)
-                chip_seg = chip_c1.empty()
-                chip_speed = chip_c2.empty()
-                chip_err = chip_c3.empty()
-
-                progress_bar = st.progress(0.0)
-                progress_caption = st.empty()
-
-                st.divider()
-                st.markdown("#### 📝 Transcripción en vivo")
-                live_box = st.empty()
-              
-
-        file_base = os.path.splitext(audio_file.name)[0]
-        TXT_PATH = str(BACKUP_DIR / f"{file_base}.txt")
-        EXCEL_PATH = str(BACKUP_DIR / f"{file_base}.xlsx")
-        DOCX_PATH = str(BACKUP_DIR / f"{file_base}.docx")
-        PROGRESS_PATH = str(BACKUP_DIR / f"{file_base}_progreso.pkl")
-
-        ensure_excel_file(EXCEL_PATH, {"Transcripción": IND_HEADERS})
-
-        Path(TXT_PATH).parent.mkdir(parents=True, exist_ok=True)
-        with open(TXT_PATH, "w", encoding="utf-8") as f:
-            f.write(f"Transcripción iniciada: {datetime.datetime.now():%Y-%m-%d %H:%M:%S}\n")
-            f.write(f"Archivo: {audio_file.name}\n\n")
-
-        generated_paths.extend([TXT_PATH, EXCEL_PATH])
-
-        if modo_lote == "Combinado":
-            with open(L_TXT_PATH, "a", encoding="utf-8") as f:
-                f.write("\n\n" + "=" * 70 + "\n")
-                f.write(f"ARCHIVO: {audio_file.name}\n")
-                f.write("=" * 70 + "\n\n")
-
-        segments_done: list[dict] = []
-        infracciones_encontradas: list[dict] = []
-        segment_errors = 0
-
-        t0 = time.time()
-        chip_seg.metric("Segmento", f"0/{num_segments}")
-        chip_speed.metric("Velocidad", "—")
-        chip_err.metric("Errores", "0")
-        progress_caption.caption("0.0% • 0/0 • ETA 0:00:00")
-
-        for i in range(num_segments):
-            start_sec = i * segment_duration
-            end_sec = min((i + 1) * segment_duration, total_duration)
-
-            seg_path = _mktemp_wav()
-            result = {}
-
-            try:
-                seg = data[int(start_sec * samplerate) : int(end_sec * samplerate)]
-                sf.write(seg_path, seg, samplerate)
-
-                result = model.transcribe(
-                    seg_path,
-                    language=lang,
-                    verbose=False,
-                    fp16=False,
-                )
-
-            except Exception as e:
-                segment_errors += 1
-                st.error(f"Error en el segmento {i+1} del archivo {audio_file.name}: {e}")
-                try:
-                    with open(PROGRESS_PATH, "wb") as f:
-                        pickle.dump({"next_segment": i + 1, "segments_done": segments_done}, f)
-                except Exception:
-                    pass
-
-            finally:
-                try:
-                    os.remove(seg_path)
-                except Exception:
-                    pass
-
-            for s in result.get("segments", []) if isinstance(result, dict) else []:
-                s_start = float(s.get("start", 0)) + start_sec
-                s_end = float(s.get("end", 0)) + start_sec
-                s_text = (s.get("text") or "").strip()
-                if not s_text:
-                    continue
-
-                mid = (s_start + s_end) / 2.0
-                spk = _speaker_for(mid, diar)
-
-                segments_done.append({"start": s_start, "end": s_end, "text": s_text, "speaker": spk})
-
-                tail = segments_done[-60:]
-                live_text = "\n".join(
-                    [
-                        f"[{hhmmss(int(x['start']))} → {hhmmss(int(x['end']))}]"
-                        + (f" [{x['speaker']}]" if x.get("speaker") else "")
-                        + f" {x['text']}"
-                        for x in tail
-                    ]
-                )
-                render_live_transcript(live_box, live_text, height=200)
-
-                if query_busqueda:
-                    q = query_busqueda.lower()
-                    hits = [x for x in segments_done if q in (x.get("text", "").lower())]
-                    if hits:
-                        out_lines = []
-                        for h in hits[-6:]:
-                            ini = hhmmss(int(h.get("start", 0)))
-                            fin = hhmmss(int(h.get("end", 0)))
-                            out_lines.append(f"- [{ini} → {fin}] {h.get('text','')}")
-                        search_box.markdown("#### 🔎 Coincidencias\n" + "\n".join(out_lines))
-                    else:
-                        search_box.markdown("_Sin coincidencias hasta el momento._")
-                else:
-                    search_box.empty()
-
-                ini_h = hhmmss(int(s_start))
-                fin_h = hhmmss(int(s_end))
-
-                line = f"[{ini_h} → {fin_h}]"
-                if spk:
-                    line += f" [{spk}]"
-                line += f" {s_text}\n"
-
-                with open(TXT_PATH, "a", encoding="utf-8") as f:
-                    f.write(line)
-
-                append_to_excel(
-                    EXCEL_PATH,
-                    [ini_h, fin_h, spk, s_text],
-                    sheet_name="Transcripción",
-                    headers=IND_HEADERS,
-                )
-
-                if modo_lote == "Combinado":
-                    with open(L_TXT_PATH, "a", encoding="utf-8") as f:
-                        f.write(line)
-
-                    append_to_excel(
-                        L_XLSX_PATH,
-                        [audio_file.name, ini_h, fin_h, spk, s_text],
-                        sheet_name="Transcripción",
-                        headers=LOTE_HEADERS,
-                    )
-
-                nuevos = detectar_infracciones_en_texto(
-                    archivo=audio_file.name,
-                    texto=s_text,
-                    inicio=ini_h,
-                    fin=fin_h,
-                    infracciones_cfg=infracciones_cfg,
-                    coincidencia_parcial=coincidencia_parcial,
-                )
-                for inf in nuevos:
-                    inf["speaker"] = spk
-                infracciones_encontradas.extend(nuevos)
-
-            try:
-                with open(PROGRESS_PATH, "wb") as f:
-                    pickle.dump({"next_segment": i + 1, "segments_done": segments_done}, f)
-            except Exception:
-                pass
-
-            percent = (i + 1) / num_segments
-            elapsed = time.time() - t0
-            seg_rate = (i + 1) / elapsed if elapsed > 0 else 0.0
-            eta = int((num_segments - (i + 1)) / seg_rate) if seg_rate > 0 else 0
-
-            chip_seg.metric("Segmento", f"{i+1}/{num_segments}")
-            chip_speed.metric("Velocidad", f"{seg_rate:.2f} seg/s" if seg_rate > 0 else "—")
-            chip_err.metric("Errores", str(segment_errors))
-
-            progress_bar.progress(percent)
-            progress_caption.caption(f"{percent*100:.1f}% • {i+1}/{num_segments} • ETA {hhmmss(eta)}")
-
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-        try:
-            os.remove(PROGRESS_PATH)
-        except Exception:
-            pass
-
-        files_status.metric("Archivos procesados", f"{idx+1} / {total_files}")
-        files_bar.progress((idx + 1) / total_files)
-
-        if len(segments_done) == 0 and segment_errors > 0:
-            st.error(f"⚠️ {audio_file.name}: no se obtuvo texto (segmentos con error: {segment_errors}).")
-        else:
-            st.success(f"✅ Transcripción finalizada: {audio_file.name}")
-
-        write_infracciones_excel(EXCEL_PATH, infracciones_encontradas or None)
-
-        with st.expander("⚠️ Infracciones detectadas en este archivo", expanded=False):
-            if infracciones_encontradas:
-                st.dataframe(pd.DataFrame(infracciones_encontradas), use_container_width=True)
-            else:
-                st.info("No se detectaron infracciones (según la configuración).")
-
-        word_path = None
-        if modo_lote == "Individual":
-            meta_ind = {
-                "generado": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "model_size": model_size,
-                "lang": (lang or "auto"),
-                "segment_duration": segment_duration,
-                "total_files": 1,
-                "total_duration_hhmmss": hhmmss(int(total_duration)),
-                "diarization": diarization and bool(diar),
-                "zip": export_zip,
-            }
-            try:
-                word_path = generar_informe_word(
-                    titulo=audio_file.name,
-                    docx_out_path=DOCX_PATH,
-                    combinado=False,
-                    meta=meta_ind,
-                    txt_path=TXT_PATH,
-                    infracciones=infracciones_encontradas or None,
-                )
-                if word_path and os.path.exists(word_path):
-                    generated_paths.append(word_path)
-            except Exception as e:
-                st.warning(f"No se pudo generar el DOCX (individual) para {audio_file.name}: {e}")
-
-        files_info.append(
-            {
-                "archivo": audio_file.name,
-                "txt_path": TXT_PATH,
-                "duracion_sec": total_duration,
-                "duracion_hhmmss": hhmmss(int(total_duration)),
-            }
+        seguir = c2.toggle(
+            "Archivo en crecimiento",
+            value=False,
+            key=k("live_follow"),
+            help="La fuente es un archivo que otra aplicación sigue grabando.",
         )
-        infracciones_lote.extend(infracciones_encontradas)
-
-        st.session_state.resultados.append(
-            {
-                "archivo": audio_file.name,
-                "file_base": file_base,
-                "txt": TXT_PATH if os.path.exists(TXT_PATH) else None,
-                "xlsx": EXCEL_PATH if os.path.exists(EXCEL_PATH) else None,
-                "docx": word_path if word_path and os.path.exists(word_path) else None,
-            }
+        ventana = st.slider("Latencia máxima (s)", 6, 30, 15, key=k("live_window"))
+
+        b1, b2 = st.columns(2)
+        iniciar = b1.button("▶️ Iniciar monitoreo", use_container_width=True, key=k("live_start"))
+        # Cualquier interacción (incluido este botón) corta la ejecución en curso.
+        b2.button("⏹️ Detener", use_container_width=True, key=k("live_stop"))
+
+        if not iniciar:
+            return
+        if not fuente.strip():
+            st.warning("Indicá una fuente para monitorear.")
+            return
+        if not ensure_ffmpeg():
+            st.error("No se encontró ffmpeg.exe para Whisper. Instalá imageio-ffmpeg o agregá ffmpeg al PATH.")
+            return
+
+        model = load_model_cached(cfg.get("model_size") or "small")
+        if model is None:
+            return
+
+        from contextlib import closing
+
+        from enacom_transcriptor.streaming import run_stream
+
+        status = st.empty()
+        live_box = st.empty()
+        st.markdown("#### 🚨 Alertas")
+        alert_box = st.empty()
+        vistas: list[str] = []
+        dispatcher = alerts.get_dispatcher()
+
+        def _alert(hit: dict) -> None:
+            if dispatcher is not None:
+                dispatcher.push(hit)
+            vistas.append(f"- **{hit['termino']}** [{hit['inicio']} → {hit['fin']}] {hit['texto']}")
+            st.toast(f"🚨 {hit['termino']}: {hit['texto'][:80]}")
+
+        status.info("Escuchando… (Detener para cortar)")
+        stream = run_stream(
+            model,
+            fuente.strip(),
+            cfg,
+            follow=seguir,
+            window_sec=float(ventana),
+            on_alert=_alert,
         )
-
-    total_dur = sum(float(i.get("duracion_sec", 0.0)) for i in files_info) if files_info else 0.0
-    archivos_con_inf = len({i.get("archivo") for i in infracciones_lote}) if infracciones_lote else 0
-
-    run_meta = {
-        "modo": modo_lote,
-        "generado": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "model_size": model_size,
-        "lang": (lang or "auto"),
-        "segment_duration": segment_duration,
-        "total_files": len(files_info),
-        "total_duration_hhmmss": hhmmss(int(total_dur)),
-        "infracciones_total": len(infracciones_lote),
-        "archivos_con_infracciones": archivos_con_inf,
-        "diarization": diarization,
-        "zip": export_zip,
-    }
-    st.session_state.run_meta = run_meta
-
-    if modo_lote == "Combinado" and audio_files:
-        write_infracciones_excel(L_XLSX_PATH, infracciones_lote or None)
-
-        meta_lote = {
-            **run_meta,
-            "total_files": len(files_info),
-            "total_duration_hhmmss": hhmmss(int(total_dur)),
-        }
-
-        word_path_lote = None
         try:
-            word_path_lote = generar_informe_word(
-                titulo=lote_base,
-                docx_out_path=L_DOCX_PATH,
-                combinado=True,
-                meta=meta_lote,
-                infracciones=infracciones_lote or None,
-                files_info=files_info,
-            )
-            if word_path_lote and os.path.exists(word_path_lote):
-                generated_paths.append(word_path_lote)
+            with closing(stream):
+                for store, _idx, hits in stream:
+                    live_text = "\n".join(
+                        format_line(x["start"], x["end"], x["speaker"], x["text"]) for x in store.tail(60)
+                    )
+                    render_live_transcript(live_box, live_text, height=260)
+                    if hits:
+                        alert_box.markdown("\n".join(vistas[-20:]))
+            status.success("La fuente terminó. Salidas guardadas en el historial.")
         except Exception as e:
-            st.warning(f"No se pudo generar el DOCX (lote): {e}")
-
-        st.session_state.lote_result = {
-            "archivo": f"LOTE — {lote_base}",
-            "file_base": lote_base,
-            "txt": L_TXT_PATH if os.path.exists(L_TXT_PATH) else None,
-            "xlsx": L_XLSX_PATH if os.path.exists(L_XLSX_PATH) else None,
-            "docx": word_path_lote if word_path_lote and os.path.exists(word_path_lote) else None,
-        }
-
-        st.success("🎉 Lote completo procesado.")
-
-    if export_zip:
-        generated_paths = [p for p in generated_paths if p and os.path.exists(p)]
-        generated_paths = list(dict.fromkeys(generated_paths))
-        zip_path = _make_run_zip(RUN_ZIP_PATH, run_meta, generated_paths)
-        if zip_path and os.path.exists(zip_path):
-            st.session_state.run_package = zip_path
-            st.success("📦 Paquete ZIP de archivos generado.")
-
-    st.session_state.procesado = True
+            status.error(f"Se interrumpió el monitoreo: {e}")
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# Perfilado opcional de una corrida completa, por variable de entorno:
+#   ENACOM_PROFILE=cprofile  -> perfil.prof (pstats; abrir con snakeviz)
+#   ENACOM_PROFILE=pyspy     -> perfil.svg (flamegraph de py-spy, si está en el PATH)
+PROFILE_ENV = "ENACOM_PROFILE"
+
+# Un solo perfil a la vez por proceso: cProfile es global (sesiones de
+# Streamlit y vigilancia comparten el intérprete).
+_profile_lock = threading.Lock()
+
+
+class StageTimer:
+    """
+    Acumula tiempo de pared por etapa del pipeline:
+
+        timer = StageTimer()
+        with timer.stage("asr"):
+            model.transcribe(...)
+
+    `summary()` devuelve {etapa: {"s", "n", "pct"}} ordenado de mayor a menor.
+    """
+
+    __slots__ = ("_t", "_n", "_t0")
+
+    def __init__(self) -> None:
+        self._t: dict[str, float] = {}
+        self._n: dict[str, int] = {}
+        self._t0 = time.perf_counter()
+
+    def add(self, name: str, seconds: float) -> None:
+        self._t[name] = self._t.get(name, 0.0) + seconds
+        self._n[name] = self._n.get(name, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def seconds(self, name: str) -> float:
+        return self._t.get(name, 0.0)
+
+    def summary(self) -> dict:
+        total = self.elapsed
+        out = {
+            name: {"s": round(t, 4), "n": self._n[name], "pct": round(100 * t / total, 1) if total else 0.0}
+            for name, t in sorted(self._t.items(), key=lambda kv: -kv[1])
+        }
+        other = total - sum(self._t.values())
+        if other > 0:
+            out["otros"] = {"s": round(other, 4), "n": 0, "pct": round(100 * other / total, 1) if total else 0.0}
+        return out
+
+
+class RunProfiler:
+    """
+    Hook de perfilado según ENACOM_PROFILE; sin la variable no hace nada.
+    `stop()` devuelve la ruta del perfil generado (o None) y se puede llamar
+    más de una vez. Usar como context manager para que un rerun o un error
+    no dejen el perfilador prendido en todo el proceso:
+
+        with RunProfiler(run_dir) as profiler:
+            ...
+
+    Si ya hay otra corrida perfilándose, esta no se perfila.
+    """
+
+    def __init__(self, out_dir: Path) -> None:
+        self.mode = (os.environ.get(PROFILE_ENV) or "").strip().lower()
+        self.out_dir = Path(out_dir)
+        self._prof = None
+        self._proc = None
+        self.path: str | None = None
+
+    def start(self) -> "RunProfiler":
+        if self.mode not in ("1", "cprofile", "pyspy", "py-spy"):
+            return self
+        if not _profile_lock.acquire(blocking=False):
+            return self  # otra corrida ya se está perfilando
+        try:
+            if self.mode in ("1", "cprofile"):
+                import cProfile
+
+                prof = cProfile.Profile()
+                prof.enable()
+                self._prof = prof
+                self.path = str(self.out_dir / "perfil.prof")
+            else:
+                exe = shutil.which("py-spy")
+                if exe:
+                    self.path = str(self.out_dir / "perfil.svg")
+                    self._proc = subprocess.Popen(
+                        [exe, "record", "--pid", str(os.getpid()), "--output", self.path, "--threads"],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+        except Exception:
+            self._prof = self._proc = None
+            self.path = None
+        if self._prof is None and self._proc is None:
+            _profile_lock.release()
+        return self
+
+    def stop(self) -> str | None:
+        if self._prof is None and self._proc is None:
+            return self.path if self.path and os.path.exists(self.path) else None
+        try:
+            if self._prof is not None:
+                prof, self._prof = self._prof, None
+                prof.disable()
+                prof.dump_stats(self.path)
+            if self._proc is not None:
+                proc, self._proc = self._proc, None
+                # py-spy escribe el flamegraph al recibir Ctrl-C.
+                if os.name == "nt":
+                    proc.terminate()
+                else:
+                    proc.send_signal(signal.SIGINT)
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+        finally:
+            _profile_lock.release()
+        return self.path if self.path and os.path.exists(self.path) else None
+
+    def __enter__(self) -> "RunProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
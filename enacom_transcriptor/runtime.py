@@ -13,11 +13,26 @@ def configure_runtime() -> None:
     - Crea directorios requeridos.
     - Agrega /bin al PATH del proceso.
     - Asegura disponibilidad de ffmpeg para Whisper.
+    - Barre temporales huérfanos de corridas cortadas (una vez por proceso).
+    - Expone métricas si ENACOM_METRICS_PORT / ENACOM_METRICS_TEXTFILE están definidas.
+    - Fija los hilos de torch del proceso si ENACOM_TORCH_THREADS está definida.
     """
     ensure_dirs()
     _prepend_bin_to_path(BIN_DIR)
     ensure_ffmpeg()
 
+    from enacom_transcriptor.tuning import configure_threads
+
+    configure_threads()
+
+    from enacom_transcriptor.metrics import start_exporter
+
+    start_exporter()
+
+    from enacom_transcriptor.storage import startup_maintenance
+
+    startup_maintenance()
+
 
 def ensure_ffmpeg() -> str | None:
     """
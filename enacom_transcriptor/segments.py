@@ -0,0 +1,505 @@
+from __future__ import annotations
+
+import math
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from enacom_transcriptor.timefmt import hhmmss, hhmmss_cs
+
+
+# Umbrales para marcar regiones a revisar (criterios habituales de Whisper).
+LOW_WORD_PROB = 0.45
+LOW_AVG_LOGPROB = -1.0
+HIGH_NO_SPEECH_PROB = 0.6
+
+
+def format_line(start: float, end: float, speaker: str, text: str) -> str:
+    """Línea de transcripción (sin salto final): [h:mm:ss → h:mm:ss] [SPK] texto"""
+    line = f"[{hhmmss(int(start))} → {hhmmss(int(end))}]"
+    if speaker:
+        line += f" [{speaker}]"
+    return f"{line} {text}"
+
+
+class Interner:
+    """
+    Diccionario str <-> id compacto (hablantes, archivos, términos).
+    Las columnas guardan el id (int) y el texto se almacena una sola vez.
+    """
+
+    __slots__ = ("_ids", "names")
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self.names: list[str] = []
+
+    def id(self, name: str) -> int:
+        name = name or ""
+        i = self._ids.get(name)
+        if i is None:
+            i = len(self.names)
+            self._ids[name] = i
+            self.names.append(name)
+        return i
+
+    def __getitem__(self, i: int) -> str:
+        return self.names[i]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getstate__(self):
+        return (self.names,)
+
+    def __setstate__(self, state) -> None:
+        self.names = list(state[0])
+        self._ids = {n: i for i, n in enumerate(self.names)}
+
+
+def _grow(arr: np.ndarray, need: int) -> np.ndarray:
+    if need <= len(arr):
+        return arr
+    new = np.empty(max(need, len(arr) * 2), dtype=arr.dtype)
+    new[: len(arr)] = arr
+    return new
+
+
+class SegmentStore:
+    """
+    Tabla columnar de segmentos y palabras de una transcripción.
+
+    Cada columna es un array NumPy que crece por duplicación (append amortizado
+    O(1)); los textos quedan en listas aparte. Las vistas `[: len(store)]` de las
+    columnas numéricas se pueden pasar a pandas/exporters sin copiar.
+
+    Segmentos: start, end, id de hablante, avg_logprob, no_speech_prob,
+    compression_ratio, rango [w0, w1) de palabras asociadas.
+    Palabras: start, end, probability, índice de segmento.
+
+    Un store corresponde a un archivo (`archivo`); el diccionario de hablantes
+    se puede compartir entre los stores de una corrida.
+    """
+
+    def __init__(self, archivo: str = "", speakers: Interner | None = None, capacity: int = 256) -> None:
+        cap = max(1, int(capacity))
+        self.archivo = archivo
+        self.speaker_names = speakers if speakers is not None else Interner()
+        self._n = 0
+        self._start = np.empty(cap, dtype=np.float64)
+        self._end = np.empty(cap, dtype=np.float64)
+        self._avg_logprob = np.empty(cap, dtype=np.float32)
+        self._no_speech = np.empty(cap, dtype=np.float32)
+        self._compression = np.empty(cap, dtype=np.float32)
+        self._speaker = np.empty(cap, dtype=np.int16)
+        self._w0 = np.empty(cap, dtype=np.int32)
+        self._w1 = np.empty(cap, dtype=np.int32)
+        self.texts: list[str] = []
+
+        self._wn = 0
+        self._w_start = np.empty(cap * 8, dtype=np.float64)
+        self._w_end = np.empty(cap * 8, dtype=np.float64)
+        self._w_prob = np.empty(cap * 8, dtype=np.float32)
+        self._w_seg = np.empty(cap * 8, dtype=np.int32)
+        self.word_texts: list[str] = []
+
+    # -----------------------------
+    # Crecimiento
+    # -----------------------------
+    def _reserve(self, n_seg: int, n_words: int) -> None:
+        need = self._n + n_seg
+        if need > len(self._start):
+            self._start = _grow(self._start, need)
+            self._end = _grow(self._end, need)
+            self._avg_logprob = _grow(self._avg_logprob, need)
+            self._no_speech = _grow(self._no_speech, need)
+            self._compression = _grow(self._compression, need)
+            self._speaker = _grow(self._speaker, need)
+            self._w0 = _grow(self._w0, need)
+            self._w1 = _grow(self._w1, need)
+
+        wneed = self._wn + n_words
+        if wneed > len(self._w_start):
+            self._w_start = _grow(self._w_start, wneed)
+            self._w_end = _grow(self._w_end, wneed)
+            self._w_prob = _grow(self._w_prob, wneed)
+            self._w_seg = _grow(self._w_seg, wneed)
+
+    def compact(self) -> None:
+        """Recorta la capacidad sobrante (útil antes de pickle/guardar)."""
+        n, wn = self._n, self._wn
+        for name in ("_start", "_end", "_avg_logprob", "_no_speech", "_compression", "_speaker", "_w0", "_w1"):
+            setattr(self, name, getattr(self, name)[:n].copy())
+        for name in ("_w_start", "_w_end", "_w_prob", "_w_seg"):
+            setattr(self, name, getattr(self, name)[:wn].copy())
+
+    def __getstate__(self) -> dict:
+        # Solo se serializa la parte usada de cada columna.
+        state = dict(self.__dict__)
+        for name in ("_start", "_end", "_avg_logprob", "_no_speech", "_compression", "_speaker", "_w0", "_w1"):
+            state[name] = state[name][: self._n]
+        for name in ("_w_start", "_w_end", "_w_prob", "_w_seg"):
+            state[name] = state[name][: self._wn]
+        return state
+
+    # -----------------------------
+    # Carga
+    # -----------------------------
+    def append(
+        self,
+        start: float,
+        end: float,
+        text: str,
+        speaker: str = "",
+        avg_logprob: float = math.nan,
+        no_speech_prob: float = math.nan,
+        compression_ratio: float = math.nan,
+        words: list[dict] | None = None,
+        offset: float = 0.0,
+    ) -> int:
+        """
+        Agrega un segmento. `words` usa el formato de Whisper con
+        word_timestamps=True: [{"word", "start", "end", "probability"}, ...],
+        con tiempos relativos al segmento de audio (se les suma `offset`).
+        Devuelve el índice del segmento.
+        """
+        words = [w for w in (words or []) if (w.get("word") or "").strip()]
+        self._reserve(1, len(words))
+
+        i = self._n
+        self._start[i] = start
+        self._end[i] = end
+        self._avg_logprob[i] = avg_logprob
+        self._no_speech[i] = no_speech_prob
+        self._compression[i] = compression_ratio
+        self._speaker[i] = self.speaker_names.id(speaker)
+        self._w0[i] = self._wn
+
+        for w in words:
+            j = self._wn
+            self._w_start[j] = float(w.get("start", 0.0)) + offset
+            self._w_end[j] = float(w.get("end", 0.0)) + offset
+            self._w_prob[j] = float(w.get("probability", math.nan))
+            self._w_seg[j] = i
+            self.word_texts.append(str(w.get("word", "")).strip())
+            self._wn += 1
+
+        self._w1[i] = self._wn
+        self.texts.append(text)
+        self._n += 1
+        return i
+
+    def append_whisper(self, seg: dict, offset: float, speaker: str = "") -> int | None:
+        """
+        Agrega un segmento tal como lo devuelve `model.transcribe` (tiempos
+        relativos al fragmento). Devuelve None si el texto está vacío.
+        """
+        text = (seg.get("text") or "").strip()
+        if not text:
+            return None
+        return self.append(
+            start=float(seg.get("start", 0.0)) + offset,
+            end=float(seg.get("end", 0.0)) + offset,
+            text=text,
+            speaker=speaker,
+            avg_logprob=float(seg.get("avg_logprob", math.nan)),
+            no_speech_prob=float(seg.get("no_speech_prob", math.nan)),
+            compression_ratio=float(seg.get("compression_ratio", math.nan)),
+            words=seg.get("words"),
+            offset=offset,
+        )
+
+    # -----------------------------
+    # Acceso
+    # -----------------------------
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def start(self) -> np.ndarray:
+        return self._start[: self._n]
+
+    @property
+    def end(self) -> np.ndarray:
+        return self._end[: self._n]
+
+    @property
+    def avg_logprob(self) -> np.ndarray:
+        return self._avg_logprob[: self._n]
+
+    @property
+    def no_speech_prob(self) -> np.ndarray:
+        return self._no_speech[: self._n]
+
+    @property
+    def compression_ratio(self) -> np.ndarray:
+        return self._compression[: self._n]
+
+    @property
+    def speaker_id(self) -> np.ndarray:
+        return self._speaker[: self._n]
+
+    def speaker(self, i: int) -> str:
+        return self.speaker_names[int(self._speaker[i])]
+
+    @property
+    def word_start(self) -> np.ndarray:
+        return self._w_start[: self._wn]
+
+    @property
+    def word_end(self) -> np.ndarray:
+        return self._w_end[: self._wn]
+
+    @property
+    def word_prob(self) -> np.ndarray:
+        return self._w_prob[: self._wn]
+
+    @property
+    def word_segment(self) -> np.ndarray:
+        return self._w_seg[: self._wn]
+
+    def confidence(self) -> np.ndarray:
+        """Confianza por segmento en [0, 1] (exp del avg_logprob; NaN si no hay dato)."""
+        return np.exp(self.avg_logprob.astype(np.float64))
+
+    def confidence_of(self, i: int) -> float:
+        return math.exp(float(self._avg_logprob[i]))
+
+    def words_of(self, i: int) -> list[tuple[str, float, float, float]]:
+        """Palabras del segmento i como (texto, start, end, probability)."""
+        a, b = int(self._w0[i]), int(self._w1[i])
+        return [
+            (self.word_texts[j], float(self._w_start[j]), float(self._w_end[j]), float(self._w_prob[j]))
+            for j in range(a, b)
+        ]
+
+    def row(self, i: int) -> dict:
+        return {
+            "start": float(self._start[i]),
+            "end": float(self._end[i]),
+            "text": self.texts[i],
+            "speaker": self.speaker(i),
+        }
+
+    def rows(self, start: int = 0) -> Iterator[dict]:
+        for i in range(max(0, start), self._n):
+            yield self.row(i)
+
+    def tail(self, n: int) -> Iterator[dict]:
+        return self.rows(self._n - n)
+
+    def columns(self) -> dict[str, np.ndarray | list]:
+        """
+        Columnas de segmentos como vistas (sin copia) para exporters/pandas.
+        `speaker` es la lista de nombres resuelta a partir del diccionario.
+        """
+        names = self.speaker_names.names
+        return {
+            "start": self.start,
+            "end": self.end,
+            "speaker": [names[j] for j in self.speaker_id],
+            "text": self.texts,
+            "confidence": self.confidence(),
+        }
+
+    def search(self, query: str) -> list[int]:
+        """Índices de segmentos cuyo texto contiene `query` (case-insensitive)."""
+        q = (query or "").lower()
+        if not q:
+            return []
+        return [i for i, t in enumerate(self.texts) if q in t.lower()]
+
+    # -----------------------------
+    # Confianza / revisión
+    # -----------------------------
+    def low_confidence_segments(
+        self,
+        min_word_prob: float = LOW_WORD_PROB,
+        min_avg_logprob: float = LOW_AVG_LOGPROB,
+        max_no_speech: float = HIGH_NO_SPEECH_PROB,
+    ) -> np.ndarray:
+        """Máscara booleana de segmentos a revisar."""
+        n = self._n
+        mask = (self.avg_logprob < min_avg_logprob) | (self.no_speech_prob > max_no_speech)
+
+        if self._wn:
+            low_w = self.word_prob < min_word_prob
+            if low_w.any():
+                hit = np.zeros(n, dtype=bool)
+                hit[np.unique(self.word_segment[low_w])] = True
+                mask |= hit
+
+        return mask
+
+    def review_regions(self, gap: float = 1.0, **thresholds) -> list[dict]:
+        """
+        Agrupa segmentos consecutivos de baja confianza en regiones
+        [{"start", "end", "text", "confianza"}] para re-escucha.
+        Dos segmentos se unen si están separados por menos de `gap` segundos.
+        """
+        mask = self.low_confidence_segments(**thresholds)
+        idx = np.flatnonzero(mask)
+        if not len(idx):
+            return []
+
+        conf = self.confidence()
+        regiones: list[dict] = []
+        cur: list[int] = [int(idx[0])]
+        for i in idx[1:]:
+            i = int(i)
+            if i == cur[-1] + 1 and self._start[i] - self._end[cur[-1]] <= gap:
+                cur.append(i)
+            else:
+                regiones.append(self._region(cur, conf))
+                cur = [i]
+        regiones.append(self._region(cur, conf))
+        return regiones
+
+    def _region(self, idx: list[int], conf: np.ndarray) -> dict:
+        c = conf[idx]
+        c = c[~np.isnan(c)]
+        return {
+            "start": float(self._start[idx[0]]),
+            "end": float(self._end[idx[-1]]),
+            "text": " ".join(self.texts[i] for i in idx),
+            "confianza": float(c.min()) if len(c) else math.nan,
+        }
+
+
+class FileInfo:
+    """Registro compacto (con __slots__) de un archivo procesado en la corrida."""
+
+    __slots__ = ("archivo", "txt_path", "duracion_sec", "segments", "idioma")
+
+    def __init__(
+        self,
+        archivo: str,
+        txt_path: str | None,
+        duracion_sec: float,
+        segments: SegmentStore | None = None,
+        idioma: str | None = None,
+    ) -> None:
+        self.archivo = archivo
+        self.txt_path = txt_path
+        self.duracion_sec = float(duracion_sec)
+        self.segments = segments
+        self.idioma = idioma
+
+    @property
+    def duracion_hhmmss(self) -> str:
+        return hhmmss(int(self.duracion_sec))
+
+    def get(self, key: str, default=None):
+        """Compatibilidad con el formato dict usado por los exporters."""
+        return getattr(self, key, default)
+
+
+class InfraccionTable:
+    """
+    Tabla columnar de infracciones detectadas.
+
+    Archivo, término y hablante se guardan como ids de diccionarios
+    compartidos; el texto es una referencia al mismo `str` del segmento (sin
+    copia). Iterar la tabla produce dicts con el formato de
+    `detectar_infracciones_en_texto` (archivo, termino, inicio, fin, texto,
+    speaker) para los exporters.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        cap = max(1, int(capacity))
+        self.files = Interner()
+        self.terms = Interner()
+        self.speakers = Interner()
+        self._n = 0
+        self._file = np.empty(cap, dtype=np.int32)
+        self._term = np.empty(cap, dtype=np.int32)
+        self._speaker = np.empty(cap, dtype=np.int16)
+        self._seg_start = np.empty(cap, dtype=np.float64)
+        self._seg_end = np.empty(cap, dtype=np.float64)
+        self._t_start = np.empty(cap, dtype=np.float64)
+        self._t_end = np.empty(cap, dtype=np.float64)
+        self.texts: list[str] = []
+
+    def _reserve(self, n: int) -> None:
+        need = self._n + n
+        if need > len(self._file):
+            for name in ("_file", "_term", "_speaker", "_seg_start", "_seg_end", "_t_start", "_t_end"):
+                setattr(self, name, _grow(getattr(self, name), need))
+
+    def add(
+        self,
+        archivo: str,
+        termino: str,
+        seg_start: float,
+        seg_end: float,
+        texto: str,
+        speaker: str = "",
+        t_inicio: float = math.nan,
+        t_fin: float = math.nan,
+    ) -> None:
+        self._reserve(1)
+        i = self._n
+        self._file[i] = self.files.id(archivo)
+        self._term[i] = self.terms.id(termino)
+        self._speaker[i] = self.speakers.id(speaker)
+        self._seg_start[i] = seg_start
+        self._seg_end[i] = seg_end
+        self._t_start[i] = t_inicio
+        self._t_end[i] = t_fin
+        self.texts.append(texto)
+        self._n += 1
+
+    def extend(self, other: "InfraccionTable") -> None:
+        for hit in other.raw():
+            self.add(**hit)
+
+    def raw(self) -> Iterator[dict]:
+        """Filas con tiempos numéricos (segundos), sin formatear."""
+        for i in range(self._n):
+            yield {
+                "archivo": self.files[int(self._file[i])],
+                "termino": self.terms[int(self._term[i])],
+                "seg_start": float(self._seg_start[i]),
+                "seg_end": float(self._seg_end[i]),
+                "texto": self.texts[i],
+                "speaker": self.speakers[int(self._speaker[i])],
+                "t_inicio": float(self._t_start[i]),
+                "t_fin": float(self._t_end[i]),
+            }
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(self._n):
+            ts, te = self._t_start[i], self._t_end[i]
+            if math.isnan(ts):
+                inicio = hhmmss(int(self._seg_start[i]))
+                fin = hhmmss(int(self._seg_end[i]))
+            else:
+                inicio, fin = hhmmss_cs(ts), hhmmss_cs(te)
+            yield {
+                "archivo": self.files[int(self._file[i])],
+                "termino": self.terms[int(self._term[i])],
+                "inicio": inicio,
+                "fin": fin,
+                "texto": self.texts[i],
+                "speaker": self.speakers[int(self._speaker[i])],
+            }
+
+    def archivos_con_infracciones(self) -> int:
+        return int(len(np.unique(self._file[: self._n])))
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        for name in ("_file", "_term", "_speaker", "_seg_start", "_seg_end", "_t_start", "_t_end"):
+            state[name] = state[name][: self._n]
+        return state
+
+
+def iter_segment_rows(stores: Iterable[SegmentStore]) -> Iterator[dict]:
+    """Recorre varias tablas (p. ej. todos los archivos de un lote) como filas."""
+    for st_ in stores:
+        for row in st_.rows():
+            row["archivo"] = st_.archivo
+            yield row
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import html
+import json
+import math
+from pathlib import Path
+
+
+# =========================
+# Esquema de salida (estable)
+# =========================
+
+SCHEMA_VERSION = 1
+
+# file, start, end, speaker, text, confidence, infraction, infraction_terms
+SCHEMA_FIELDS = (
+    "file",
+    "start",
+    "end",
+    "speaker",
+    "text",
+    "confidence",
+    "infraction",
+    "infraction_terms",
+)
+
+
+def segment_record(
+    archivo: str,
+    start: float,
+    end: float,
+    speaker: str,
+    text: str,
+    confidence: float | None,
+    terminos: list[str] | None,
+) -> dict:
+    """
+    Fila del esquema de salida legible por máquina. `confidence` en [0, 1]
+    (None si no hay dato); `infraction_terms` con los términos detectados.
+    """
+    if confidence is not None and math.isnan(confidence):
+        confidence = None
+    terminos = list(terminos or [])
+    return {
+        "file": archivo,
+        "start": round(float(start), 3),
+        "end": round(float(end), 3),
+        "speaker": speaker or "",
+        "text": text,
+        "confidence": None if confidence is None else round(float(confidence), 4),
+        "infraction": bool(terminos),
+        "infraction_terms": terminos,
+    }
+
+
+# =========================
+# Sinks
+# =========================
+
+class JsonlSink:
+    """Una línea JSON por segmento; se vacía al disco en cada escritura."""
+
+    ext = "jsonl"
+
+    def __init__(self, path: str) -> None:
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "w", encoding="utf-8")
+
+    def write(self, rec: dict) -> None:
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class ParquetSink:
+    """
+    Parquet columnar escrito de a row groups (cada `row_group_size` filas) con
+    pyarrow. Requiere pyarrow; si no está instalado el constructor lanza
+    ImportError.
+    """
+
+    ext = "parquet"
+
+    def __init__(self, path: str, row_group_size: int = 2000) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = max(1, int(row_group_size))
+
+        self._schema = pa.schema(
+            [
+                ("file", pa.string()),
+                ("start", pa.float64()),
+                ("end", pa.float64()),
+                ("speaker", pa.string()),
+                ("text", pa.string()),
+                ("confidence", pa.float32()),
+                ("infraction", pa.bool_()),
+                ("infraction_terms", pa.list_(pa.string())),
+            ],
+            metadata={"schema_version": str(SCHEMA_VERSION)},
+        )
+        self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+        self._cols: dict[str, list] = {f: [] for f in SCHEMA_FIELDS}
+
+    def write(self, rec: dict) -> None:
+        for f in SCHEMA_FIELDS:
+            self._cols[f].append(rec.get(f))
+        if len(self._cols["file"]) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._cols["file"]:
+            return
+        table = self._pa.Table.from_pydict(self._cols, schema=self._schema)
+        self._writer.write_table(table)
+        self._cols = {f: [] for f in SCHEMA_FIELDS}
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+            self._writer = None
+
+
+# =========================
+# Subtítulos (SRT / WebVTT)
+# =========================
+
+SUB_MAX_CHARS = 42
+SUB_MAX_LINES = 2
+
+
+def _wrap(text: str, width: int) -> list[str]:
+    """Corta en líneas de hasta `width` caracteres respetando palabras."""
+    lines: list[str] = []
+    cur = ""
+    for w in text.split():
+        while len(w) > width:
+            if cur:
+                lines.append(cur)
+                cur = ""
+            lines.append(w[:width])
+            w = w[width:]
+        if not cur:
+            cur = w
+        elif len(cur) + 1 + len(w) <= width:
+            cur += " " + w
+        else:
+            lines.append(cur)
+            cur = w
+    if cur:
+        lines.append(cur)
+    return lines
+
+
+def split_cues(
+    start: float,
+    end: float,
+    text: str,
+    max_chars: int = SUB_MAX_CHARS,
+    max_lines: int = SUB_MAX_LINES,
+) -> list[tuple[float, float, list[str]]]:
+    """
+    Parte un segmento en cues de hasta `max_lines` líneas de `max_chars`.
+    El tiempo se reparte en proporción a los caracteres de cada cue.
+    """
+    lines = _wrap(text, max_chars)
+    if not lines:
+        return []
+
+    groups = [lines[i : i + max_lines] for i in range(0, len(lines), max_lines)]
+    total = sum(len(" ".join(g)) for g in groups) or 1
+    dur = max(0.0, end - start)
+
+    cues: list[tuple[float, float, list[str]]] = []
+    t = start
+    for g in groups:
+        t_end = t + dur * len(" ".join(g)) / total
+        cues.append((t, t_end, g))
+        t = t_end
+    return cues
+
+
+def _ts(seconds: float, sep: str) -> str:
+    ms = int(round(max(0.0, seconds) * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s_, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s_:02d}{sep}{ms:03d}"
+
+
+class SrtSink:
+    """SubRip: cues numerados, hablante como prefijo [SPK]."""
+
+    ext = "srt"
+
+    def __init__(self, path: str, max_chars: int = SUB_MAX_CHARS, max_lines: int = SUB_MAX_LINES) -> None:
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_chars = max_chars
+        self.max_lines = max_lines
+        self._n = 0
+        self._f = open(self.path, "w", encoding="utf-8")
+
+    def _text(self, rec: dict) -> str:
+        spk = rec.get("speaker") or ""
+        return f"[{spk}] {rec['text']}" if spk else rec["text"]
+
+    def _cue(self, t0: float, t1: float, lines: list[str], rec: dict) -> str:
+        self._n += 1
+        return f"{self._n}\n{_ts(t0, ',')} --> {_ts(t1, ',')}\n" + "\n".join(lines) + "\n\n"
+
+    def write(self, rec: dict) -> None:
+        cues = split_cues(rec["start"], rec["end"], self._text(rec), self.max_chars, self.max_lines)
+        self._f.write("".join(self._cue(t0, t1, lines, rec) for t0, t1, lines in cues))
+        self._f.flush()
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class VttSink(SrtSink):
+    """WebVTT: hablante como voice tag <v SPK>."""
+
+    ext = "vtt"
+
+    def __init__(self, path: str, max_chars: int = SUB_MAX_CHARS, max_lines: int = SUB_MAX_LINES) -> None:
+        super().__init__(path, max_chars, max_lines)
+        self._f.write("WEBVTT\n\n")
+
+    def _text(self, rec: dict) -> str:
+        return rec["text"]
+
+    def _cue(self, t0: float, t1: float, lines: list[str], rec: dict) -> str:
+        body = "\n".join(html.escape(ln, quote=False) for ln in lines)
+        spk = rec.get("speaker") or ""
+        if spk:
+            body = f"<v {html.escape(spk, quote=False)}>{body}"
+        return f"{_ts(t0, '.')} --> {_ts(t1, '.')}\n{body}\n\n"
+
+
+_SINKS = {
+    "jsonl": JsonlSink,
+    "parquet": ParquetSink,
+    "srt": SrtSink,
+    "vtt": VttSink,
+}
+
+
+class SinkSet:
+    """
+    Conjunto de sinks de una misma salida (p. ej. un archivo o el lote).
+    Si un sink falla se descarta y se anota el error; los demás siguen.
+    """
+
+    def __init__(self, sinks: list | None = None) -> None:
+        self.sinks = list(sinks or [])
+        self.errors: list[str] = []
+
+    def write(self, rec: dict) -> None:
+        for s in list(self.sinks):
+            try:
+                s.write(rec)
+            except Exception as e:
+                self.errors.append(f"{Path(s.path).name}: {e}")
+                self._drop(s)
+
+    def _drop(self, s) -> None:
+        try:
+            s.close()
+        except Exception:
+            pass
+        self.sinks.remove(s)
+
+    def close(self) -> list[str]:
+        """Cierra todos los sinks y devuelve las rutas escritas."""
+        paths: list[str] = []
+        for s in self.sinks:
+            try:
+                s.close()
+                paths.append(s.path)
+            except Exception as e:
+                self.errors.append(f"{Path(s.path).name}: {e}")
+        self.sinks = []
+        return paths
+
+    @property
+    def paths(self) -> list[str]:
+        return [s.path for s in self.sinks]
+
+
+def open_sinks(base_path: str, formats: tuple[str, ...] = ("jsonl", "parquet"), **kwargs) -> SinkSet:
+    """
+    Abre un sink por formato en `base_path` + .ext. Los formatos que no se
+    pueden abrir (p. ej. falta pyarrow) quedan en `errors` y se omiten.
+    """
+    out = SinkSet()
+    for fmt in formats:
+        cls = _SINKS.get(fmt)
+        if cls is None:
+            continue
+        try:
+            out.sinks.append(cls(f"{base_path}.{cls.ext}", **kwargs.get(fmt, {})))
+        except ImportError as e:
+            out.errors.append(f"{fmt}: dependencia no disponible ({e.name or e})")
+        except Exception as e:
+            out.errors.append(f"{fmt}: {e}")
+    return out
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from enacom_transcriptor import catalog
+from enacom_transcriptor.paths import BACKUP_DIR, PART_MARKER, ensure_dirs, pid_alive, run_is_active
+
+
+# Prefijo de todos los temporales de la app (subidas, segmentos, ZIPs armados
+# en la UI). Van en una carpeta por proceso (enacom_<pid>, ver temp_dir): el
+# barrido de huérfanos no toca la de un proceso vivo.
+TEMP_PREFIX = "enacom_"
+
+POLICY_PATH = BACKUP_DIR / "retencion.json"
+
+DEFAULT_POLICY = {
+    "auto": False,          # aplicar al iniciar la app
+    "max_age_days": 180,    # 0 = sin límite por antigüedad
+    "max_total_gb": 20.0,   # 0 = sin cuota
+    "orphan_hours": 6,      # temporales/progreso más viejos que esto son huérfanos
+}
+
+_HASH_CHUNK = 1024 * 1024
+_startup_done = False
+
+
+# =========================
+# Política
+# =========================
+
+def load_policy() -> dict:
+    try:
+        data = json.loads(POLICY_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        data = {}
+    return {**DEFAULT_POLICY, **{k: v for k, v in data.items() if k in DEFAULT_POLICY}}
+
+
+def save_policy(policy: dict) -> None:
+    ensure_dirs()
+    data = {**DEFAULT_POLICY, **{k: v for k, v in policy.items() if k in DEFAULT_POLICY}}
+    POLICY_PATH.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+# =========================
+# Uso de disco
+# =========================
+
+def disk_usage() -> dict:
+    """
+    Uso de la carpeta de transcripciones (según el catálogo) y espacio libre
+    del disco que la contiene.
+    """
+    ensure_dirs()
+    stats = catalog.usage_stats()
+    try:
+        du = shutil.disk_usage(str(BACKUP_DIR))
+        free, total = du.free, du.total
+    except OSError:
+        free, total = 0, 0
+    return {**stats, "disk_free": free, "disk_total": total}
+
+
+# =========================
+# Temporales
+# =========================
+
+def temp_dir() -> str:
+    """Carpeta de temporales de este proceso (se crea si no existe)."""
+    d = Path(tempfile.gettempdir()) / f"{TEMP_PREFIX}{os.getpid()}"
+    d.mkdir(exist_ok=True)
+    return str(d)
+
+
+def _temp_owner(name: str) -> int | None:
+    """PID de una carpeta enacom_<pid>, o None si el nombre no es de esa forma."""
+    rest = name[len(TEMP_PREFIX):]
+    return int(rest) if rest.isdigit() else None
+
+
+# =========================
+# Huérfanos
+# =========================
+
+def sweep_orphans(max_age_hours: float | None = None) -> list[str]:
+    """
+    Borra temporales de la app (carpetas TEMP_PREFIX<pid> de procesos que ya
+    no existen en la carpeta temporal del sistema), `*_progreso.pkl` y
+    salidas `.~part` de corridas cortadas, más viejos que `max_age_hours`.
+    Devuelve las rutas borradas.
+
+    Dentro de la carpeta de transcripciones solo se barren corridas que nadie
+    reclama: ni registradas en el catálogo (terminadas) ni marcadas en uso
+    por un proceso vivo (paths.run_active: lotes, vigilancia, monitoreo en vivo).
+    """
+    if max_age_hours is None:
+        max_age_hours = float(load_policy()["orphan_hours"])
+    limit = time.time() - max_age_hours * 3600
+
+    candidates: list[Path] = []
+    temp_dirs: list[Path] = []
+    try:
+        for e in os.scandir(tempfile.gettempdir()):
+            if not e.name.startswith(TEMP_PREFIX):
+                continue
+            if e.is_file():
+                # Sueltos de versiones anteriores a las carpetas por proceso
+                candidates.append(Path(e.path))
+                continue
+            pid = _temp_owner(e.name)
+            if pid is None or not e.is_dir() or pid_alive(pid):
+                continue
+            temp_dirs.append(Path(e.path))
+            candidates += [Path(f.path) for f in os.scandir(e.path) if f.is_file()]
+    except OSError:
+        pass
+    try:
+        owned = catalog.run_ids()
+    except Exception:
+        owned = None  # sin catálogo no se sabe qué corridas terminaron: no se toca nada
+    if owned is not None:
+        try:
+            in_runs = list(BACKUP_DIR.rglob("*_progreso.pkl"))
+            # Salidas a medio escribir (.~part.ext) de corridas cortadas
+            in_runs += list(BACKUP_DIR.rglob(f"*{PART_MARKER}.*"))
+        except OSError:
+            in_runs = []
+        claimed: dict[str, bool] = {}
+        for p in in_runs:
+            parts = p.relative_to(BACKUP_DIR).parts
+            if len(parts) < 2:
+                continue
+            run = parts[0]
+            if run not in claimed:
+                claimed[run] = run in owned or run_is_active(BACKUP_DIR / run)
+            if not claimed[run]:
+                candidates.append(p)
+
+    removed: list[str] = []
+    for p in candidates:
+        try:
+            if p.stat().st_mtime < limit:
+                p.unlink()
+                removed.append(str(p))
+        except OSError:
+            continue
+    for d in temp_dirs:
+        try:
+            d.rmdir()
+        except OSError:
+            pass  # quedan temporales recientes: la próxima vez
+    return removed
+
+
+# =========================
+# Retención
+# =========================
+
+def _delete_group(grupo: str) -> tuple[int, int]:
+    paths = list(catalog.group_paths(grupo).values())
+    freed = 0
+    gone: list[str] = []
+    for p in paths:
+        try:
+            size = os.path.getsize(p)
+            os.remove(p)
+            freed += size
+            gone.append(p)
+        except FileNotFoundError:
+            gone.append(p)
+        except OSError:
+            continue
+    catalog.forget_paths(gone)
+
+    # Carpetas de archivo/corrida que quedaron vacías
+    for d in sorted({Path(p).parent for p in gone}, key=lambda x: len(x.parts), reverse=True):
+        while d != BACKUP_DIR and BACKUP_DIR in d.parents:
+            try:
+                d.rmdir()
+            except OSError:
+                break
+            d = d.parent
+    return len(gone), freed
+
+
+def _prune_huellas(older_than: float) -> tuple[int, int]:
+    """Grabaciones del índice de huellas anteriores a `older_than` (cantidad, bytes liberados)."""
+    from enacom_transcriptor import fingerprint
+
+    before = catalog.usage_stats()["huellas_bytes"]
+    try:
+        n = fingerprint.prune(older_than)
+    except Exception:
+        return 0, 0  # índice bloqueado por una corrida: se reintenta la próxima vez
+    if not n:
+        return 0, 0
+    return n, max(0, before - catalog.usage_stats()["huellas_bytes"])
+
+
+def apply_retention(max_age_days: float | None = None, max_total_gb: float | None = None) -> dict:
+    """
+    Borra grupos del historial (todas sus salidas) y grabaciones del índice
+    de huellas por antigüedad y, si la carpeta (con el índice) supera la
+    cuota, lo más viejo de ambos hasta quedar por debajo. Si lo único que
+    sigue por encima de la cuota es el índice, para: borrar más grupos no
+    ayudaría.
+    """
+    policy = load_policy()
+    max_age_days = float(policy["max_age_days"] if max_age_days is None else max_age_days)
+    max_total_gb = float(policy["max_total_gb"] if max_total_gb is None else max_total_gb)
+
+    files = freed = groups = huellas = 0
+
+    if max_age_days > 0:
+        limit = time.time() - max_age_days * 86400
+        for g in catalog.groups_older_than(limit):
+            n, b = _delete_group(g)
+            files += n
+            freed += b
+            groups += 1
+
+        n, b = _prune_huellas(limit)
+        huellas += n
+        freed += b
+
+    if max_total_gb > 0:
+        quota = int(max_total_gb * 1024**3)
+        stats = catalog.usage_stats()
+        total, index = stats["bytes"], stats["huellas_bytes"]
+        # Un grupo con archivos bloqueados o sin permiso sigue en el catálogo:
+        # se saltea en las pasadas siguientes para no repetirlo para siempre.
+        attempted: set[str] = set()
+        while total > quota and index < quota:
+            oldest = [
+                g for g in catalog.list_groups(limit=20 + len(attempted), order="asc")
+                if g["grupo"] not in attempted
+            ]
+            if not oldest:
+                break
+            before = total
+            for g in oldest:
+                # Primero las huellas más viejas que este grupo (también ocupan cuota)
+                n, b = _prune_huellas(float(g["mtime"] or 0))
+                huellas += n
+                freed += b
+                total -= b
+                index -= b
+                if total <= quota or index >= quota:
+                    break
+                attempted.add(g["grupo"])
+                n, b = _delete_group(g["grupo"])
+                files += n
+                freed += b
+                groups += 1
+                total -= b
+                if total <= quota:
+                    break
+            stats = catalog.usage_stats()
+            total, index = stats["bytes"], stats["huellas_bytes"]
+            if total >= before:
+                break  # una pasada completa sin liberar nada
+
+    return {"groups": groups, "files": files, "bytes": freed, "huellas": huellas}
+
+
+# =========================
+# Deduplicación
+# =========================
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dedupe() -> dict:
+    """
+    Reemplaza archivos idénticos de la carpeta de transcripciones por hard
+    links al primero (las salidas no se modifican una vez terminadas). Solo
+    se calcula el hash de archivos que comparten tamaño.
+    """
+    by_size: dict[int, list[str]] = defaultdict(list)
+    for p in catalog.all_paths():
+        try:
+            by_size[os.path.getsize(p)].append(p)
+        except OSError:
+            continue
+
+    linked = saved = 0
+    for size, paths in by_size.items():
+        if size == 0 or len(paths) < 2:
+            continue
+        by_hash: dict[str, str] = {}
+        for p in paths:
+            try:
+                digest = _sha256(p)
+            except OSError:
+                continue
+            first = by_hash.setdefault(digest, p)
+            if first == p:
+                continue
+            try:
+                if os.path.samefile(first, p):
+                    continue
+                tmp = f"{p}.{TEMP_PREFIX}link"
+                os.link(first, tmp)
+                os.replace(tmp, p)
+                linked += 1
+                saved += size
+            except OSError:
+                # Sistema de archivos sin hard links (p. ej. FAT/red): se deja como está.
+                continue
+
+    return {"files": linked, "bytes": saved}
+
+
+# =========================
+# Arranque
+# =========================
+
+def startup_maintenance() -> None:
+    """
+    Limpieza al iniciar el proceso (una sola vez, no en cada rerun):
+    barre huérfanos y, si la política lo pide, aplica retención.
+    """
+    global _startup_done
+    if _startup_done:
+        return
+    _startup_done = True
+
+    try:
+        sweep_orphans()
+        if load_policy().get("auto"):
+            apply_retention()
+    except Exception:
+        pass
@@ -0,0 +1,286 @@
+"""
+Transcripción en vivo de una fuente que no termina (archivo que sigue
+creciendo, entrada estándar o cualquier stream que lea ffmpeg).
+
+    ffmpeg -i rtsp://... -f wav - | python -m enacom_transcriptor.streaming --fuente - --infracciones "mayday"
+
+El audio se transcribe en ventanas móviles: cada `--paso` segundos se
+transcribe lo acumulado y se confirman los segmentos que terminan antes del
+borde de la ventana (el último puede estar cortado y se vuelve a transcribir
+con más audio). La ventana nunca supera `--ventana`, así que la latencia queda
+acotada a ventana + tiempo de transcripción.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import math
+import sys
+import time
+from contextlib import closing
+from typing import Callable, Iterator
+
+import numpy as np
+
+from enacom_transcriptor import catalog, metrics
+from enacom_transcriptor.channels import model_lock
+from enacom_transcriptor.decoding import WHISPER_SR, close_stream, iter_pcm, open_pcm_stream
+from enacom_transcriptor.filters import SegmentFilter
+from enacom_transcriptor.infracciones import detectar_infracciones_en_texto, parse_infracciones_text
+from enacom_transcriptor.paths import BACKUP_DIR, finalize_partial, partial_base, partial_path, run_active, unique_dir
+from enacom_transcriptor.segments import InfraccionTable, SegmentStore, format_line
+from enacom_transcriptor.sinks import open_sinks, segment_record
+from enacom_transcriptor.timefmt import hhmmss
+
+
+DEFAULT_WINDOW_SEC = 15.0
+DEFAULT_STEP_SEC = 3.0
+# Segmentos que terminan a menos de esto del borde se consideran incompletos.
+GUARD_SEC = 1.0
+
+
+class RollingTranscriber:
+    """
+    Ventana móvil sobre PCM 16 kHz mono. `feed` devuelve los segmentos de
+    Whisper confirmados como [(segmento, offset_absoluto_seg)].
+    """
+
+    def __init__(
+        self,
+        model,
+        lang: str | None = None,
+        window_sec: float = DEFAULT_WINDOW_SEC,
+        step_sec: float = DEFAULT_STEP_SEC,
+        word_timestamps: bool = True,
+        model_size: str = "",
+    ) -> None:
+        self.model = model
+        self.model_size = model_size
+        self.lang = lang
+        self.window = int(max(window_sec, step_sec + GUARD_SEC) * WHISPER_SR)
+        self.step = int(step_sec * WHISPER_SR)
+        self.word_timestamps = word_timestamps
+        self._buf = np.zeros(0, dtype=np.float32)
+        self._t0 = 0.0          # tiempo absoluto del inicio de _buf
+        self._pending = 0       # muestras nuevas desde la última transcripción
+
+    def _transcribe(self) -> list[dict]:
+        with model_lock(self.model):
+            t0 = time.perf_counter()
+            result = self.model.transcribe(
+                self._buf,
+                language=self.lang,
+                verbose=False,
+                fp16=False,
+                word_timestamps=self.word_timestamps,
+                # Cada ventana es independiente: condicionar sobre el texto
+                # previo hace que Whisper repita frases en ventanas solapadas.
+                condition_on_previous_text=False,
+            )
+        metrics.record_segment(self.model_size, len(self._buf) / WHISPER_SR, time.perf_counter() - t0)
+        return result.get("segments", []) if isinstance(result, dict) else []
+
+    def _commit(self, committed: list[dict]) -> list[tuple[dict, float]]:
+        if committed:
+            cut = float(committed[-1].get("end", 0.0))
+        elif len(self._buf) >= self.window:
+            # Ventana llena sin habla: se descarta para no crecer sin límite.
+            cut = (len(self._buf) - self.step) / WHISPER_SR
+        else:
+            cut = 0.0
+        drop = min(len(self._buf), max(0, int(cut * WHISPER_SR)))
+        out = [(s, self._t0) for s in committed]
+        self._buf = self._buf[drop:]
+        self._t0 += drop / WHISPER_SR
+        return out
+
+    def feed(self, pcm: np.ndarray) -> list[tuple[dict, float]]:
+        self._buf = np.concatenate([self._buf, pcm.astype(np.float32, copy=False)])
+        self._pending += len(pcm)
+        if self._pending < self.step:
+            return []
+        self._pending = 0
+
+        segs = self._transcribe()
+        upto = len(self._buf) / WHISPER_SR - GUARD_SEC
+        committed = [s for s in segs if float(s.get("end", 0.0)) <= upto]
+        if len(self._buf) >= self.window and len(committed) < len(segs):
+            # Latencia acotada: con la ventana llena se confirma todo menos el
+            # último segmento (o todo, si es uno solo que ocupa la ventana).
+            committed = segs[:-1] if len(segs) > 1 else segs
+        return self._commit(committed)
+
+    def flush(self) -> list[tuple[dict, float]]:
+        """Fin de la fuente: confirma todo lo que queda."""
+        if not len(self._buf):
+            return []
+        return self._commit(self._transcribe())
+
+
+def run_stream(
+    model,
+    source: str,
+    cfg: dict,
+    follow: bool = False,
+    window_sec: float = DEFAULT_WINDOW_SEC,
+    step_sec: float = DEFAULT_STEP_SEC,
+    on_alert: Callable[[dict], None] | None = None,
+) -> Iterator[tuple[SegmentStore, int, list[dict]]]:
+    """
+    Transcribe `source` en vivo. Por cada segmento confirmado devuelve
+    (store, índice, infracciones) y llama a `on_alert(hit)` por cada término
+    detectado, en el momento.
+
+    Las salidas (TXT, JSONL/SRT/VTT) se escriben en `vivo_<fecha>/` a medida
+    que llegan y se finalizan y registran en el catálogo cuando la fuente
+    termina o se corta la iteración (usar con contextlib.closing).
+    """
+    infracciones_cfg = cfg.get("infracciones") or []
+    coincidencia_parcial = bool(cfg.get("coincidencia_parcial", True))
+    word_timestamps = bool(cfg.get("word_timestamps", True))
+    formats = (("jsonl",) if cfg.get("machine_outputs", True) else ()) + (
+        ("srt", "vtt") if cfg.get("subtitles", True) else ()
+    )
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = unique_dir(BACKUP_DIR / f"vivo_{timestamp}")
+    base = out_dir.name
+    archivo = source if source != "-" else "stdin"
+
+    txt_path = partial_path(str(out_dir / f"{base}.txt"))
+    with open(txt_path, "w", encoding="utf-8") as f:
+        f.write(f"Transcripción en vivo iniciada: {datetime.datetime.now():%Y-%m-%d %H:%M:%S}\n")
+        f.write(f"Fuente: {archivo}\n\n")
+    sinks = open_sinks(partial_base(str(out_dir / base)), formats)
+
+    store = SegmentStore(archivo=archivo)
+    infracciones = InfraccionTable()
+    seg_filter = SegmentFilter(cfg.get("filtro"), [t.get("termino", "") for t in infracciones_cfg])
+    roller = RollingTranscriber(
+        model, cfg.get("lang"), window_sec, step_sec, word_timestamps, model_size=cfg.get("model_size", "")
+    )
+    proc = open_pcm_stream(source, follow=follow)
+
+    def _emit(committed):
+        for seg, offset in committed:
+            motivo = seg_filter.check(seg)
+            if motivo is not None:
+                if seg_filter.drop:
+                    continue
+                seg = seg_filter.mark(seg)
+            idx = store.append_whisper(seg, offset=offset)
+            if idx is None:
+                continue
+            text = store.texts[idx]
+            s_start, s_end = float(store.start[idx]), float(store.end[idx])
+            with open(txt_path, "a", encoding="utf-8") as f:
+                f.write(format_line(s_start, s_end, "", text) + "\n")
+
+            hits = [] if motivo is not None else detectar_infracciones_en_texto(
+                archivo=archivo,
+                texto=text,
+                inicio=hhmmss(int(s_start)),
+                fin=hhmmss(int(s_end)),
+                infracciones_cfg=infracciones_cfg,
+                coincidencia_parcial=coincidencia_parcial,
+                palabras=store.words_of(idx),
+            )
+            for h in hits:
+                infracciones.add(
+                    archivo=archivo,
+                    termino=h["termino"],
+                    seg_start=s_start,
+                    seg_end=s_end,
+                    texto=text,
+                    t_inicio=h.get("t_inicio", math.nan),
+                    t_fin=h.get("t_fin", math.nan),
+                )
+                if on_alert is not None:
+                    try:
+                        on_alert(h)
+                    except Exception:
+                        pass
+
+            sinks.write(
+                segment_record(
+                    archivo=archivo,
+                    start=s_start,
+                    end=s_end,
+                    speaker="",
+                    text=text,
+                    confidence=store.confidence_of(idx),
+                    terminos=[h["termino"] for h in hits],
+                )
+            )
+            yield store, idx, hits
+
+    # La marca de carpeta en uso dura lo que la fuente (puede ser días).
+    with run_active(out_dir):
+        try:
+            for pcm in iter_pcm(proc, chunk_sec=1.0):
+                yield from _emit(roller.feed(pcm))
+            yield from _emit(roller.flush())
+        finally:
+            close_stream(proc)
+            outputs = [txt_path, *sinks.close()]
+            final = [finalize_partial(p) for p in outputs if p]
+            try:
+                catalog.register_outputs(
+                    base,
+                    catalog.group_for(final[0]),
+                    final,
+                    archivo=archivo,
+                    tipo=catalog.TIPO_IND,
+                    duracion_sec=float(store.end[-1]) if len(store) else 0.0,
+                    infracciones=len(infracciones),
+                )
+            except Exception:
+                pass
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Transcripción en vivo ENACOM.")
+    ap.add_argument("--fuente", required=True, help="'-' (stdin), archivo, URL o dispositivo que lea ffmpeg.")
+    ap.add_argument("--seguir", action="store_true", help="La fuente es un archivo que sigue creciendo.")
+    ap.add_argument("--modelo", default="small")
+    ap.add_argument("--idioma", default="es", help="'auto' para detección automática.")
+    ap.add_argument("--infracciones", default="", help="Términos separados por comas.")
+    ap.add_argument("--ventana", type=float, default=DEFAULT_WINDOW_SEC, help="Ventana máxima (s).")
+    ap.add_argument("--paso", type=float, default=DEFAULT_STEP_SEC, help="Cada cuánto se transcribe (s).")
+    args = ap.parse_args(argv)
+
+    from enacom_transcriptor.model import load_model
+    from enacom_transcriptor.runtime import configure_runtime
+
+    configure_runtime()
+    model = load_model(args.modelo)
+    cfg = {
+        "model_size": args.modelo,
+        "lang": None if args.idioma == "auto" else args.idioma,
+        "infracciones": parse_infracciones_text(args.infracciones),
+        "subtitles": False,
+    }
+
+    from enacom_transcriptor.alerts import get_dispatcher
+
+    dispatcher = get_dispatcher()
+
+    def alert(h: dict) -> None:
+        if dispatcher is not None:
+            dispatcher.push(h)
+        print(f"!!! INFRACCIÓN [{h['termino']}] {h['inicio']} → {h['fin']}: {h['texto']}", file=sys.stderr, flush=True)
+
+    stream = run_stream(model, args.fuente, cfg, follow=args.seguir, window_sec=args.ventana, step_sec=args.paso, on_alert=alert)
+    with closing(stream):
+        try:
+            for store, idx, _hits in stream:
+                row = store.row(idx)
+                print(format_line(row["start"], row["end"], row["speaker"], row["text"]), flush=True)
+        except KeyboardInterrupt:
+            pass
+    if dispatcher is not None:
+        dispatcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import datetime
+
+
+def hhmmss(seconds: int) -> str:
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+
+def hhmmss_cs(seconds: float) -> str:
+    """Como hhmmss pero con centésimas (marcas por palabra): 0:01:23.45"""
+    cs = int(round(max(0.0, float(seconds)) * 100))
+    return f"{hhmmss(cs // 100)}.{cs % 100:02d}"
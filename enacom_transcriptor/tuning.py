@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import math
+import os
+import sys
+import threading
+from typing import Iterator
+
+
+# Ajuste automático de la duración de segmento.
+#
+# Whisper siempre procesa ventanas de 30 s: un tramo de 20 s se rellena hasta
+# 30 (cómputo perdido) y uno de 45 s se parte en 30 + 15. Por eso el ajuste
+# solo elige múltiplos de 30 s. El primer tramo se usa para medir el factor
+# de tiempo real (RTF) y desde ahí se fija la duración de segmento (tramos
+# más largos en equipos rápidos, para amortizar el costo fijo de cada llamada
+# sin que el progreso en pantalla quede quieto más de ~TARGET_UPDATE_SEC).
+#
+# Los hilos de torch no se ajustan por corrida: torch.set_num_threads es
+# global al proceso (sesiones de Streamlit y vigilancia comparten el
+# intérprete) y cambiarlo en medio de otra transcripción la afecta. Se fijan
+# una sola vez al arrancar (runtime.configure_runtime -> configure_threads).
+#
+# openai-whisper no tiene batch: `transcribe` procesa una ventana por vez, así
+# que el tamaño de lote queda en 1 y solo se informa.
+
+WHISPER_WINDOW_SEC = 30
+MAX_SEGMENT_SEC = 60          # el máximo que permite la UI
+TARGET_UPDATE_SEC = 20.0
+MIN_CALIBRATION_SEC = 10.0    # tramos más cortos no sirven para medir
+
+# Hilos de torch para todo el proceso; sin la variable queda el valor por
+# defecto de torch (núcleos físicos).
+THREADS_ENV = "ENACOM_TORCH_THREADS"
+
+# Decisiones ya medidas en este proceso, por modelo: los reruns de Streamlit y
+# las corridas siguientes no vuelven a calibrar.
+_decisions: dict[str, dict] = {}
+_decisions_lock = threading.Lock()
+
+
+def configure_threads() -> int | None:
+    """
+    Fija los hilos de torch según ENACOM_TORCH_THREADS, una vez al arrancar
+    el proceso y antes de cargar el modelo. Sin torch importado todavía
+    alcanza con las variables de OpenMP/MKL, que torch lee al importarse
+    (así el arranque no paga el import de torch).
+    """
+    try:
+        n = int(os.environ.get(THREADS_ENV) or 0)
+    except ValueError:
+        n = 0
+    if n <= 0:
+        return None
+    os.environ.setdefault("OMP_NUM_THREADS", str(n))
+    os.environ.setdefault("MKL_NUM_THREADS", str(n))
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(n)
+    return n
+
+
+def _current_torch_threads() -> int | None:
+    # Solo informa: torch ya está cargado con el modelo, no se importa acá.
+    torch = sys.modules.get("torch")
+    return int(torch.get_num_threads()) if torch is not None else None
+
+
+def choose_segment_duration(rtf: float) -> int:
+    """Múltiplo de 30 s más largo cuyo tiempo de proceso no supere TARGET_UPDATE_SEC."""
+    if rtf <= 0:
+        return WHISPER_WINDOW_SEC
+    k = int(TARGET_UPDATE_SEC // (WHISPER_WINDOW_SEC * rtf))
+    return WHISPER_WINDOW_SEC * max(1, min(k, MAX_SEGMENT_SEC // WHISPER_WINDOW_SEC))
+
+
+class AutoTuner:
+    """
+    Define los tramos a transcribir. Desactivado, reproduce la segmentación
+    fija de siempre (`segment_duration`). Activado, calibra con el primer
+    tramo (`before()` / `after()` alrededor de cada transcripción) y desde
+    ahí usa la duración elegida. Solo toca parámetros de la corrida.
+    """
+
+    def __init__(self, enabled: bool, segment_duration: int, model_size: str = "") -> None:
+        self.enabled = bool(enabled)
+        self.model_size = model_size
+        self.segment_duration = int(segment_duration)
+        self.threads = _current_torch_threads()
+        self.rtf: float | None = None
+        self.reused = False
+
+        if not self.enabled:
+            return
+        prev = _decisions.get(model_size)
+        if prev is not None:
+            self.segment_duration = prev["segment_duration"]
+            self.rtf = prev["rtf"]
+            self.reused = True
+        else:
+            self.segment_duration = WHISPER_WINDOW_SEC
+
+    @property
+    def calibrating(self) -> bool:
+        return self.enabled and self.rtf is None
+
+    def ranges(self, total_duration: float) -> Iterator[tuple[int, float, float]]:
+        """(índice, inicio, fin) de cada tramo; la duración se relee en cada paso."""
+        i, start = 0, 0.0
+        while i == 0 or start < total_duration:
+            end = min(start + self.segment_duration, total_duration)
+            yield i, start, end
+            start = end
+            i += 1
+
+    def estimate(self, done: int, position: float, total_duration: float) -> int:
+        """Total de tramos estimado con la duración actual."""
+        rest = max(0.0, total_duration - position)
+        return max(done + 1, done + math.ceil(rest / self.segment_duration))
+
+    def before(self) -> None:
+        # Los hilos quedan como los fijó el arranque; se lee el valor para informarlo.
+        if self.calibrating:
+            self.threads = _current_torch_threads()
+
+    def after(self, audio_sec: float, elapsed_sec: float) -> bool:
+        """Registra la medición; devuelve True cuando se toma la decisión."""
+        if not self.calibrating or audio_sec < MIN_CALIBRATION_SEC:
+            return False
+        self.rtf = elapsed_sec / audio_sec
+        self.segment_duration = choose_segment_duration(self.rtf)
+        with _decisions_lock:
+            _decisions[self.model_size] = {"segment_duration": self.segment_duration, "rtf": self.rtf}
+        return True
+
+    def summary(self) -> dict:
+        """Parámetros elegidos, para run_meta."""
+        return {
+            "auto": self.enabled,
+            "segment_duration": self.segment_duration,
+            "torch_threads": self.threads,
+            "batch_size": 1,
+            "rtf": round(self.rtf, 3) if self.rtf is not None else None,
+            "reutilizado": self.reused,
+        }
@@ -1,20 +1,25 @@
 from __future__ import annotations
 
-import io
 import os
 import json
-import zipfile
+import tempfile
 import datetime as dt
 from pathlib import Path
 
 import streamlit as st
 
-from enacom_transcriptor.paths import LOGO_PATH, CSS_PATH, BACKUP_DIR
+from enacom_transcriptor import alerts, catalog, storage
+from enacom_transcriptor.storage import TEMP_PREFIX, temp_dir
+from enacom_transcriptor.decoding import AUDIO_EXTENSIONS
+from enacom_transcriptor.paths import LOGO_PATH, CSS_PATH
+from enacom_transcriptor.timefmt import hhmmss
 from enacom_transcriptor.infracciones import parse_infracciones_text
+from enacom_transcriptor.packager import ZSTD_AVAILABLE, RunZipWriter
 
 
 WIDGET_VER = "v6"
 _UI_NONCE_KEY = "ui_reset_nonce"
+CHANNEL_OPTIONS = ["Mezcla"] + [f"Canal {i}" for i in range(1, 9)]
 
 
 # -----------------------------
@@ -61,6 +66,9 @@ def _clear_current_run() -> None:
     st.session_state["lote_result"] = None
     st.session_state["run_meta"] = None
     st.session_state["run_package"] = None
+    _replace_temp("run_package_fallback", None)
+    _replace_temp(k("zip_sel_path"), None)
+    reset_lazy_downloads()
 
     # Reset de widgets de entrada (file_uploader/search/etc.) usando nonce en las keys
     st.session_state[_UI_NONCE_KEY] = _ui_nonce() + 1
@@ -69,20 +77,114 @@ def _clear_current_run() -> None:
 # -----------------------------
 # Small helpers
 # -----------------------------
+_MIME = {
+    "zip": "application/zip",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "txt": "text/plain",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+}
+
+
+def human_size(n: int) -> str:
+    x = float(n)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if x < 1024:
+            return f"{x:.0f} {unit}" if unit == "B" else f"{x:.1f} {unit}"
+        x /= 1024
+    return f"{x:.1f} TB"
+
+
+def _lazy_dl_btn(label: str, path: str | None, mime: str, key: str) -> None:
+    """
+    Botón de descarga que lee el archivo recién cuando el usuario lo pide:
+    primero muestra "Preparar" y solo en ese rerun se carga el archivo en
+    memoria (st.download_button guarda los bytes completos). Al descargar
+    vuelve a "Preparar", así los bytes no quedan retenidos ni se reenvían
+    en cada rerun.
+    """
+    if not path or not os.path.exists(path):
+        st.caption(f"{label} —")
+        return
+
+    ready_key = f"{key}__ready"
+    if not st.session_state.get(ready_key):
+        st.button(
+            f"⬇️ {label}",
+            key=f"{key}__prep",
+            use_container_width=True,
+            on_click=lambda: st.session_state.__setitem__(ready_key, True),
+        )
+        return
+
+    st.download_button(
+        f"💾 {label}",
+        Path(path).read_bytes(),
+        file_name=Path(path).name,
+        mime=mime,
+        use_container_width=True,
+        key=key,
+        on_click=lambda: st.session_state.pop(ready_key, None),
+    )
+
+
+def reset_lazy_downloads() -> None:
+    """Vuelve todos los botones de descarga diferida al estado "Preparar"."""
+    for key in [x for x in st.session_state.keys() if str(x).endswith("__ready")]:
+        del st.session_state[key]
+
+
 def _dl_btn(col, label: str, path: str | None, mime: str, key: str) -> None:
     with col:
-        if path and os.path.exists(path):
-            st.download_button(
-                label,
-                Path(path).read_bytes(),
-                file_name=Path(path).name,
-                mime=mime,
-                use_container_width=True,
-                key=key,
-            )
-        else:
-            # Mantenemos el “espacio” para que todo quede alineado
-            st.caption("—")
+        # Si falta el archivo, _lazy_dl_btn deja un “—” para mantener alineado
+        _lazy_dl_btn(label, path, mime, key)
+
+
+def _replace_temp(state_key: str, new_path: str | None) -> None:
+    """Guarda `new_path` en la sesión y borra el temporal que había antes en esa clave."""
+    old = st.session_state.get(state_key)
+    st.session_state[state_key] = new_path
+    if old and old != new_path and Path(old).parent == Path(temp_dir()):
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def _selection_zip(items: list[dict]) -> str | None:
+    """
+    ZIP de los ítems elegidos, uno por sesión: con la misma selección se
+    reutiliza el armado y con otra se borra el anterior.
+    """
+    sig = sorted(str(r.get(ext) or "") for r in items for ext in ("txt", "xlsx", "docx"))
+    path = st.session_state.get(k("zip_sel_path"))
+    if path and os.path.exists(path) and st.session_state.get(k("zip_sel_sig")) == sig:
+        return path
+    _replace_temp(k("zip_sel_path"), _zip_selected_path(items))
+    st.session_state[k("zip_sel_sig")] = sig
+    return st.session_state[k("zip_sel_path")]
+
+
+def _zip_selected_path(items: list[dict]) -> str | None:
+    """Arma en disco (carpeta temporal) un ZIP con las salidas de los ítems elegidos."""
+    fd, zip_path = tempfile.mkstemp(prefix=f"{TEMP_PREFIX}sel_", suffix=".zip", dir=temp_dir())
+    os.close(fd)
+
+    z = RunZipWriter(zip_path)
+    try:
+        for r in items:
+            safe_dir = Path((r.get("archivo") or "archivo").strip()).stem or "archivo"
+            for ext in ("txt", "xlsx", "docx"):
+                p = r.get(ext)
+                if p:
+                    z.add(p, arcname=f"{safe_dir}/{Path(p).name}")
+    except Exception:
+        z.abort()
+        return None
+    return z.close()
 
 
 def _meta_json_bytes(meta: dict | None) -> bytes:
@@ -90,58 +192,55 @@ def _meta_json_bytes(meta: dict | None) -> bytes:
     return json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
 
 
-def _zip_fallback_bytes(resultados: list[dict], lote: dict | None, meta: dict | None) -> bytes:
+def _zip_fallback_path(resultados: list[dict], lote: dict | None, meta: dict | None) -> str | None:
     """
-    Fallback: genera ZIP en memoria si no existe run_package en disco.
+    Fallback: genera el ZIP en disco (carpeta temporal) si no existe run_package.
     (Normalmente processing.py ya genera run_package).
     """
-    buf = io.BytesIO()
     ts = (meta or {}).get("generado", dt.datetime.now().strftime("%Y-%m-%d_%H%M%S"))
     ts = str(ts).replace(":", "").replace(" ", "_")
     base_dir = f"transcripciones_{ts}"
 
-    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        z.writestr(f"{base_dir}/meta.json", _meta_json_bytes(meta))
+    fd, zip_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=".zip", dir=temp_dir())
+    os.close(fd)
+
+    z = RunZipWriter(zip_path)
+    try:
+        z.add_bytes(f"{base_dir}/meta.json", _meta_json_bytes(meta))
 
         if lote:
             for ext in ("txt", "xlsx", "docx"):
                 p = lote.get(ext)
-                if p and os.path.exists(p):
-                    z.write(p, arcname=f"{base_dir}/LOTE/{Path(p).name}")
+                if p:
+                    z.add(p, arcname=f"{base_dir}/LOTE/{Path(p).name}")
 
         for r in resultados:
             arch = (r.get("archivo") or "archivo").strip()
             safe_dir = Path(arch).stem or "archivo"
             for ext in ("txt", "xlsx", "docx"):
                 p = r.get(ext)
-                if p and os.path.exists(p):
-                    z.write(p, arcname=f"{base_dir}/IND/{safe_dir}/{Path(p).name}")
+                if p:
+                    z.add(p, arcname=f"{base_dir}/IND/{safe_dir}/{Path(p).name}")
+    except Exception:
+        z.abort()
+        return None
 
-    return buf.getvalue()
+    return z.close()
 
 
+@st.fragment
 def _render_lote_block(lote: dict) -> None:
     with st.container(border=True):
         st.markdown("### 📦 Lote consolidado")
         c1, c2, c3 = st.columns(3)
-        _dl_btn(c1, "TXT (Lote)", lote.get("txt"), "text/plain", k("dl_lote_txt"))
-        _dl_btn(
-            c2,
-            "XLSX (Lote)",
-            lote.get("xlsx"),
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            k("dl_lote_xlsx"),
-        )
-        _dl_btn(
-            c3,
-            "DOCX (Lote)",
-            lote.get("docx"),
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            k("dl_lote_docx"),
-        )
+        _dl_btn(c1, "TXT (Lote)", lote.get("txt"), _MIME["txt"], k("dl_lote_txt"))
+        _dl_btn(c2, "XLSX (Lote)", lote.get("xlsx"), _MIME["xlsx"], k("dl_lote_xlsx"))
+        _dl_btn(c3, "DOCX (Lote)", lote.get("docx"), _MIME["docx"], k("dl_lote_docx"))
 
 
+@st.fragment
 def _render_individuals_table(resultados: list[dict]) -> None:
+    # Fragmento: filtrar/paginar/preparar descargas no re-ejecuta toda la app.
     with st.container(border=True):
         st.markdown("### 🎧 Archivos individuales")
 
@@ -194,30 +293,40 @@ def _render_individuals_table(resultados: list[dict]) -> None:
 
         for i, r in enumerate(view, start=start):
             archivo = r.get("archivo", f"archivo_{i}")
+            # Keys estables por archivo (no por posición): sobreviven a filtro/orden
+            rid = r.get("file_base") or archivo
 
             row1, row2, row3, row4 = st.columns([3.2, 1, 1, 1])
             with row1:
-                st.markdown(f"**{archivo}**")
-
-            _dl_btn(row2, "TXT", r.get("txt"), "text/plain", k(f"dl_txt_{i}"))
-            _dl_btn(
-                row3,
-                "XLSX",
-                r.get("xlsx"),
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                k(f"dl_xlsx_{i}"),
-            )
-            _dl_btn(
-                row4,
-                "DOCX",
-                r.get("docx"),
-                "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                k(f"dl_docx_{i}"),
-            )
+                st.checkbox(f"**{archivo}**", key=k(f"sel_{rid}"))
+
+            _dl_btn(row2, "TXT", r.get("txt"), _MIME["txt"], k(f"dl_txt_{rid}"))
+            _dl_btn(row3, "XLSX", r.get("xlsx"), _MIME["xlsx"], k(f"dl_xlsx_{rid}"))
+            _dl_btn(row4, "DOCX", r.get("docx"), _MIME["docx"], k(f"dl_docx_{rid}"))
 
             # Separador suave
             st.markdown("<div style='height:6px'></div>", unsafe_allow_html=True)
 
+        st.divider()
+        elegidos = [
+            r for r in resultados
+            if st.session_state.get(k(f"sel_{r.get('file_base') or r.get('archivo', '')}"))
+        ]
+        z1, z2 = st.columns([1.6, 1])
+        with z1:
+            if st.button(
+                f"📦 Armar ZIP con seleccionados ({len(elegidos)})",
+                key=k("btn_zip_sel"),
+                disabled=not elegidos,
+                use_container_width=True,
+            ):
+                _selection_zip(elegidos)
+                st.session_state[k("dl_zip_sel") + "__ready"] = True
+        with z2:
+            sel_zip = st.session_state.get(k("zip_sel_path"))
+            if sel_zip and os.path.exists(sel_zip):
+                _lazy_dl_btn("ZIP seleccionados", sel_zip, _MIME["zip"], k("dl_zip_sel"))
+
 
 # -----------------------------
 # Header / Config / Sidebar
@@ -260,6 +369,13 @@ def render_config() -> dict:
             index=0,
             key=k("cfg_lang"),
         )
+        lang_recheck = st.toggle(
+            "Revisar idioma cada 5 min",
+            value=False,
+            key=k("cfg_lang_recheck"),
+            disabled=selected_language != "auto",
+            help="En 'auto' el idioma se detecta una vez por archivo; esto lo vuelve a verificar durante el audio.",
+        )
 
     with c3:
         segment_duration = st.number_input(
@@ -270,6 +386,13 @@ def render_config() -> dict:
             step=5,
             key=k("cfg_seg"),
             help="Duración de segmentos de transcripción.",
+            disabled=bool(st.session_state.get(k("cfg_autotune"))),
+        )
+        auto_tune = st.toggle(
+            "Ajuste automático",
+            value=False,
+            key=k("cfg_autotune"),
+            help="Mide la velocidad en el primer segmento y elige la duración (múltiplos de 30 s).",
         )
 
     with c4:
@@ -289,12 +412,76 @@ def render_config() -> dict:
             key=k("cfg_zip"),
             help="Incluye archivos generados y meta.json",
         )
+        zip_audio = st.toggle(
+            "Audio original en ZIP",
+            value=False,
+            key=k("cfg_zip_audio"),
+            help="Agrega los audios subidos al paquete (sin recomprimir).",
+            disabled=not export_zip,
+        )
+        zip_zstd = st.toggle(
+            "ZIP con zstd",
+            value=False,
+            key=k("cfg_zip_zstd"),
+            help="Más chico y rápido, pero el Explorador de Windows y muchos descompresores no lo abren. "
+            "Requiere Python 3.14+.",
+            disabled=not (export_zip and ZSTD_AVAILABLE),
+        )
         diarization = st.toggle(
             "Diarización (beta)",
             value=False,
             key=k("cfg_diar"),
             help="Detecta hablantes (experimental). Si faltan dependencias/token, continúa sin hablantes.",
         )
+        por_canal = st.toggle(
+            "Un hablante por canal",
+            value=False,
+            key=k("cfg_por_canal"),
+            help="En grabaciones estéreo/multipista transcribe cada canal por separado y usa el canal "
+            "como hablante (sin pyannote). Los archivos mono se procesan como siempre.",
+        )
+        deduplicar = st.toggle(
+            "Reutilizar audio ya transcripto",
+            value=True,
+            key=k("cfg_dedup"),
+            help="Compara la huella acústica con las grabaciones ya procesadas: los tramos repetidos "
+            "(la misma hora enviada dos veces, archivos superpuestos) reutilizan la transcripción anterior.",
+        )
+        word_timestamps = st.toggle(
+            "Marcas por palabra",
+            value=True,
+            key=k("cfg_words"),
+            help="Ubica infracciones/búsquedas en la palabra exacta y marca regiones de baja confianza.",
+        )
+        machine_outputs = st.toggle(
+            "JSONL / Parquet",
+            value=True,
+            key=k("cfg_machine"),
+            help="Salida legible por máquina (un registro por segmento) para carga en el warehouse.",
+        )
+        subtitles = st.toggle(
+            "Subtítulos SRT/VTT",
+            value=True,
+            key=k("cfg_subs"),
+            help="Subtítulos con hablante para revisar las grabaciones en un reproductor.",
+        )
+        preproceso = st.multiselect(
+            "Preprocesamiento",
+            ["Normalizar volumen", "Banda de voz", "Compuerta de ruido"],
+            default=["Normalizar volumen"],
+            key=k("cfg_pre"),
+            help="Siempre se pasa a 16 kHz mono en memoria. Banda de voz (250–3800 Hz) y compuerta "
+            "de ruido ayudan en canales de radio ruidosos.",
+        )
+        filtro_modo = st.selectbox(
+            "Alucinaciones / sin habla",
+            ["marcar", "descartar", "desactivado"],
+            index=0,
+            key=k("cfg_filtro"),
+            help="Segmentos sin habla, repetidos o frases típicas de Whisper ('Gracias por ver el video'): "
+            "se marcan [dudoso] o se descartan y no cuentan como infracción. Los que contienen un "
+            "término de infracción nunca se filtran.",
+        )
 
     st.markdown("##### Palabras/Frases de Infracción")
     raw = st.text_area(
@@ -308,28 +495,110 @@ def render_config() -> dict:
     infracciones = parse_infracciones_text(raw)
     lang = None if selected_language == "auto" else selected_language
 
+    _render_alerts_panel()
+
     return {
         "model_size": model_size,
         "lang": lang,
+        "lang_recheck_sec": 300.0 if lang is None and lang_recheck else 0.0,
         "segment_duration": int(segment_duration),
+        "auto_tune": bool(auto_tune),
         "modo_lote": modo_lote,
         "infracciones": infracciones,
         "export_zip": bool(export_zip),
+        "zip_audio": bool(zip_audio),
+        "zip_zstd": bool(zip_zstd) and ZSTD_AVAILABLE,
         "diarization": bool(diarization),
+        "por_canal": bool(por_canal),
+        "deduplicar": bool(deduplicar),
+        "word_timestamps": bool(word_timestamps),
+        "machine_outputs": bool(machine_outputs),
+        "subtitles": bool(subtitles),
+        "filtro": {"enabled": filtro_modo != "desactivado", "modo": filtro_modo},
+        "preproceso": {
+            "normalizar": "Normalizar volumen" in preproceso,
+            "banda_voz": "Banda de voz" in preproceso,
+            "puerta_ruido": "Compuerta de ruido" in preproceso,
+        },
     }
 
 
+def _render_alerts_panel() -> None:
+    with st.expander("🚨 Alertas en tiempo real", expanded=False):
+        st.caption("Avisa cada infracción apenas se transcribe el segmento (también en vigilancia y en vivo).")
+        conf = alerts.load_alert_config()
+
+        enabled = st.toggle("Activar alertas", value=bool(conf["enabled"]), key=k("al_on"))
+        webhook = st.text_input(
+            "Webhook (POST JSON)", conf["webhook_url"], key=k("al_hook"), placeholder="https://…"
+        )
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            to_file = st.toggle("Archivo alertas.log", value=bool(conf["file"]), key=k("al_file"))
+        with c2:
+            to_syslog = st.toggle("Syslog", value=bool(conf["syslog"]), key=k("al_syslog"))
+        with c3:
+            to_desktop = st.toggle("Notificación de escritorio", value=bool(conf["desktop"]), key=k("al_desk"))
+        syslog_addr = st.text_input(
+            "Servidor syslog (host:puerto)", conf["syslog_address"], key=k("al_syslog_addr"),
+            help="Vacío = syslog local.", disabled=not to_syslog,
+        )
+        c4, c5 = st.columns(2)
+        with c4:
+            dedup = st.number_input(
+                "Ignorar repetidas (s)", min_value=0, value=int(conf["dedup_sec"]), step=30, key=k("al_dedup")
+            )
+        with c5:
+            per_min = st.number_input(
+                "Máx. por término por minuto", min_value=0, value=int(conf["max_por_min"]), step=1,
+                key=k("al_rate"), help="0 = sin límite",
+            )
+
+        if st.button("💾 Guardar alertas", key=k("al_save"), use_container_width=True):
+            alerts.save_alert_config(
+                {
+                    "enabled": enabled,
+                    "webhook_url": webhook.strip(),
+                    "file": to_file,
+                    "syslog": to_syslog,
+                    "syslog_address": syslog_addr.strip(),
+                    "desktop": to_desktop,
+                    "dedup_sec": dedup,
+                    "max_por_min": per_min,
+                }
+            )
+            st.success("Configuración de alertas guardada.")
+
+        d = alerts.get_dispatcher()
+        if d is not None:
+            st.caption("Envío en este proceso: " + " • ".join(f"{k_}: {v}" for k_, v in d.stats().items() if v != ""))
+
+
 def render_sidebar() -> dict:
     nonce = _ui_nonce()
 
     st.sidebar.markdown("### 🎛️ Entrada")
     audio_files = st.sidebar.file_uploader(
         "🎧 Cargar uno o varios audios",
-        type=["mp3", "wav", "m4a"],
+        type=list(AUDIO_EXTENSIONS),
         accept_multiple_files=True,
         key=f"{k('sb_files')}_{nonce}",
     )
 
+    # Canal por archivo: en grabaciones estéreo/multipista cada canal suele
+    # ser una fuente distinta; "Mezcla" promedia como siempre.
+    canales: dict[str, int | None] = {}
+    if audio_files:
+        with st.sidebar.expander("🔀 Canal por archivo", expanded=False):
+            for i, f in enumerate(audio_files):
+                opcion = st.selectbox(
+                    f.name,
+                    CHANNEL_OPTIONS,
+                    index=0,
+                    key=f"{k('sb_canal')}_{nonce}_{i}",
+                )
+                canales[f.name] = CHANNEL_OPTIONS.index(opcion) - 1 if opcion != CHANNEL_OPTIONS[0] else None
+
     query_busqueda = st.sidebar.text_input(
         "🔍 Buscar palabra/frase (en vivo):",
         "",
@@ -346,9 +615,39 @@ def render_sidebar() -> dict:
         "audio_files": audio_files,
         "query_busqueda": query_busqueda,
         "coincidencia_parcial": coincidencia_parcial,
+        "canales": canales,
     }
 
 
+def _render_perf_panel(meta: dict) -> None:
+    """Desglose de tiempo por etapa de la última corrida (run_meta["perfil"])."""
+    perfil = meta.get("perfil") or {}
+    if not perfil:
+        return
+    with st.expander("🩺 Diagnóstico de rendimiento", expanded=False):
+        total = sum(v["s"] for v in perfil.values())
+        audio = float(meta.get("total_duration_sec") or 0.0)
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Tiempo total", hhmmss(int(total)))
+        c2.metric("Factor de tiempo real", f"{total / audio:.2f}" if audio else "—")
+        c3.metric("ASR", f"{perfil.get('asr', {}).get('pct', 0.0):.1f} %")
+
+        filas = [
+            {"Etapa": name, "Segundos": v["s"], "Llamadas": v["n"], "%": v["pct"]}
+            for name, v in perfil.items()
+        ]
+        st.dataframe(filas, use_container_width=True, hide_index=True)
+        st.bar_chart({f["Etapa"]: f["Segundos"] for f in filas}, horizontal=True)
+
+        peak = meta.get("peak_rss_mb") or {}
+        if peak:
+            st.caption("Pico de memoria por archivo (MB): " + ", ".join(f"{a}: {v}" for a, v in peak.items()))
+        if meta.get("perfil_archivo"):
+            st.caption(f"Perfil completo guardado en la corrida: `{meta['perfil_archivo']}`")
+        else:
+            st.caption("Para un perfil completo, iniciar con ENACOM_PROFILE=cprofile (o pyspy).")
+
+
 # -----------------------------
 # Downloads + History (Tabs)
 # -----------------------------
@@ -376,6 +675,24 @@ def render_downloads() -> None:
                 "Infracciones",
                 f"{meta.get('infracciones_total', 0)} (en {meta.get('archivos_con_infracciones', 0)} archivos)",
             )
+            filtrados = meta.get("filtrados") or {}
+            if filtrados.get("total"):
+                st.caption(
+                    f"Filtro de alucinaciones ({filtrados.get('modo', '')}): {filtrados['total']} segmentos — "
+                    f"sin habla {filtrados.get('sin_habla', 0)}, "
+                    f"repetición {filtrados.get('repeticion', 0) + filtrados.get('compresion', 0)}, "
+                    f"frases típicas {filtrados.get('frase_conocida', 0)}"
+                )
+            reutilizado = meta.get("reutilizado") or {}
+            if reutilizado:
+                st.caption(
+                    "♻️ Audio ya transcripto, reutilizado: "
+                    + "; ".join(
+                        f"{a}: {hhmmss(int(r['reutilizado_sec']))} (de {', '.join(r['de'])})"
+                        for a, r in reutilizado.items()
+                    )
+                )
+            _render_perf_panel(meta)
 
         with st.container(border=True):
             a1, a2 = st.columns([1.6, 1])
@@ -383,25 +700,30 @@ def render_downloads() -> None:
 
             with a1:
                 if run_zip and os.path.exists(run_zip):
-                    st.download_button(
-                        "📦 Descargar transcripción completa (ZIP)",
-                        Path(run_zip).read_bytes(),
-                        file_name=Path(run_zip).name,
-                        mime="application/zip",
-                        use_container_width=True,
-                        key=k("dl_run_zip"),
+                    _lazy_dl_btn(
+                        "Descargar transcripción completa (ZIP)",
+                        run_zip,
+                        _MIME["zip"],
+                        k("dl_run_zip"),
                     )
                 else:
-                    
-                    zip_bytes = _zip_fallback_bytes(resultados, lote, meta)
-                    st.download_button(
-                        "📦 Descargar transcripción completa (ZIP)",
-                        zip_bytes,
-                        file_name="corrida_transcripciones.zip",
-                        mime="application/zip",
+                    # Se arma en disco recién cuando se pide, y se reutiliza en los reruns.
+                    fb = st.session_state.get("run_package_fallback")
+                    if fb and os.path.exists(fb):
+                        _lazy_dl_btn(
+                            "Descargar transcripción completa (ZIP)",
+                            fb,
+                            _MIME["zip"],
+                            k("dl_run_zip_fallback"),
+                        )
+                    elif st.button(
+                        "📦 Armar ZIP de la transcripción completa",
                         use_container_width=True,
-                        key=k("dl_run_zip_fallback"),
-                    )
+                        key=k("btn_run_zip_fallback"),
+                    ):
+                        _replace_temp("run_package_fallback", _zip_fallback_path(resultados, lote, meta))
+                        st.session_state[k("dl_run_zip_fallback") + "__ready"] = True
+                        st.rerun()
 
             with a2:
                 st.button(
@@ -422,86 +744,122 @@ def render_downloads() -> None:
         render_history()
 
 
-def render_history() -> None:
-    
-    with st.expander("📁 Historial de transcripciones (agrupado por base)", expanded=False):
-        try:
-            os.makedirs(str(BACKUP_DIR), exist_ok=True)
-            files = [
-                Path(BACKUP_DIR) / f
-                for f in os.listdir(str(BACKUP_DIR))
-                if f.lower().endswith((".txt", ".xlsx", ".docx", ".zip"))
-            ]
-        except Exception:
-            files = []
+_HIST_TAGS = {
+    catalog.TIPO_LOTE: "📦 LOTE",
+    catalog.TIPO_CORRIDA: "🧰 ZIP LOTE",
+    catalog.TIPO_IND: "🎧 IND",
+}
 
-        if not files:
-            st.info("Todavía no hay archivos generados en la carpeta de transcripciones.")
-            return
+_HIST_FILTERS = {
+    "Todos": None,
+    "Solo LOTES": catalog.TIPO_LOTE,
+    "Solo IND": catalog.TIPO_IND,
+    "Solo CORRIDAS": catalog.TIPO_CORRIDA,
+}
 
-        def human_size(n: int) -> str:
-            x = float(n)
-            for unit in ["B", "KB", "MB", "GB"]:
-                if x < 1024:
-                    return f"{x:.0f} {unit}" if unit == "B" else f"{x:.1f} {unit}"
-                x /= 1024
-            return f"{x:.1f} TB"
+def _render_storage_panel() -> None:
+    with st.expander("💽 Almacenamiento y retención", expanded=False):
+        try:
+            du = storage.disk_usage()
+        except Exception as e:
+            st.warning(f"No se pudo calcular el uso de disco: {e}")
+            return
 
-        
-        groups: dict[str, dict] = {}
-        for p in files:
-            base = p.stem
-            ext = p.suffix.lower().lstrip(".")  # txt/xlsx/docx/zip
+        m1, m2, m3 = st.columns(3)
+        m1.metric(
+            "Transcripciones",
+            human_size(du["bytes"]),
+            help=f"{du['files']} archivos en {du['groups']} grupos + índice de huellas acústicas "
+            f"({human_size(du['huellas_bytes'])})",
+        )
+        m2.metric("Libre en disco", human_size(du["disk_free"]))
+        m3.metric("Disco total", human_size(du["disk_total"]))
 
-            try:
-                stt = p.stat()
-                mtime = stt.st_mtime
-                size = stt.st_size
-            except Exception:
-                mtime = 0
-                size = 0
+        pol = storage.load_policy()
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            days = st.number_input(
+                "Conservar (días)", min_value=0, value=int(pol["max_age_days"]), step=30,
+                key=k("ret_days"), help="0 = sin límite por antigüedad",
+            )
+        with c2:
+            gb = st.number_input(
+                "Cuota (GB)", min_value=0.0, value=float(pol["max_total_gb"]), step=5.0,
+                key=k("ret_gb"), help="0 = sin cuota. Se borran los grupos más viejos.",
+            )
+        with c3:
+            auto = st.toggle("Aplicar al iniciar", value=bool(pol["auto"]), key=k("ret_auto"))
 
-            tag = "📦 LOTE" if base.lower().startswith("lote_") else ("🧰 ZIP LOTE" if base.lower().startswith("corrida_") else "🎧 IND")
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            if st.button("💾 Guardar política", key=k("ret_save"), use_container_width=True):
+                storage.save_policy({**pol, "max_age_days": days, "max_total_gb": gb, "auto": auto})
+                st.success("Política guardada.")
+        with b2:
+            if st.button("🧹 Aplicar retención ahora", key=k("ret_apply"), use_container_width=True):
+                r = storage.apply_retention(days, gb)
+                removed = storage.sweep_orphans()
+                st.success(
+                    f"Borrados {r['files']} archivos ({r['groups']} grupos), {r['huellas']} huellas acústicas "
+                    f"({human_size(r['bytes'])} en total) y {len(removed)} temporales huérfanos."
+                )
+        with b3:
+            if st.button("🔗 Deduplicar", key=k("ret_dedupe"), use_container_width=True):
+                r = storage.dedupe()
+                st.success(f"{r['files']} archivos idénticos enlazados ({human_size(r['bytes'])} recuperados).")
 
-            g = groups.setdefault(
-                base,
-                {"base": base, "tag": tag, "mtime": 0, "size": 0, "paths": {}},
-            )
 
-            g["paths"][ext] = p
-            g["mtime"] = max(g["mtime"], mtime)
-            g["size"] += size
+def render_history() -> None:
 
-        items = list(groups.values())
-        items.sort(key=lambda x: x["mtime"], reverse=True)
+    _render_storage_panel()
 
-        c1, c2 = st.columns([2, 1])
+    with st.expander("📁 Historial de transcripciones (agrupado por base)", expanded=False):
+        c1, c2, c3 = st.columns([2, 1, 1])
         with c1:
             search = st.text_input("Buscar por nombre (base)", "", key=k("hist_search")).strip().lower()
         with c2:
-            flt = st.selectbox("Filtro", ["Todos", "Solo LOTES", "Solo IND", "Solo CORRIDAS"], key=k("hist_filter"))
-
-        def passes(it: dict) -> bool:
-            if flt == "Solo LOTES" and it["tag"] != "📦 LOTE":
-                return False
-            if flt == "Solo IND" and it["tag"] != "🎧 IND":
-                return False
-            if flt == "Solo CORRIDAS" and it["tag"] != "🧰 ZIP":
-                return False
-            if search and search not in it["base"].lower():
-                return False
-            return True
-
-        items = [it for it in items if passes(it)]
+            flt = st.selectbox("Filtro", list(_HIST_FILTERS), key=k("hist_filter"))
+        with c3:
+            st.caption("¿Faltan archivos?")
+            if st.button("🔄 Reindexar carpeta", key=k("hist_reindex"), use_container_width=True):
+                try:
+                    catalog.reindex()
+                except Exception as e:
+                    st.warning(f"No se pudo reindexar: {e}")
+
+        tipo = _HIST_FILTERS.get(flt)
+        try:
+            total = catalog.count_groups(search, tipo)
+        except Exception as e:
+            st.error(f"No se pudo leer el catálogo del historial: {e}")
+            return
+
+        if not total:
+            if not search and tipo is None:
+                st.info("Todavía no hay archivos generados en la carpeta de transcripciones.")
+            else:
+                st.warning("No hay resultados con ese filtro/búsqueda.")
+            return
+
+        page_size = 20
+        pages = max(1, (total + page_size - 1) // page_size)
+        n1, n2 = st.columns([1, 3])
+        with n1:
+            page = st.number_input("Página", min_value=1, max_value=pages, value=1, step=1, key=k("hist_page"))
+        with n2:
+            st.caption(f"{total} ítem(s) • {pages} página(s)")
+
+        items = catalog.list_groups(search, tipo, limit=page_size, offset=(int(page) - 1) * page_size)
         if not items:
             st.warning("No hay resultados con ese filtro/búsqueda.")
             return
 
         def label(it: dict) -> str:
             t = dt.datetime.fromtimestamp(it["mtime"]).strftime("%Y-%m-%d %H:%M:%S") if it["mtime"] else "¿?"
-            sz = human_size(int(it["size"]))
-            has = [ext.upper() for ext in ("zip", "docx", "xlsx", "txt") if ext in it["paths"]]
-            return f"{it['tag']} • {t} • {sz} • ({', '.join(has)}) — {it['base']}"
+            sz = human_size(int(it["size"] or 0))
+            has = [ext.upper() for ext in ("zip", "docx", "xlsx", "txt") if ext in it["exts"]]
+            tag = _HIST_TAGS.get(it["tipo"], it["tipo"])
+            return f"{tag} • {t} • {sz} • ({', '.join(has)}) — {it['grupo']}"
 
         selected = st.selectbox(
             "Elegí un ítem:",
@@ -512,59 +870,22 @@ def render_history() -> None:
         )
 
         t = dt.datetime.fromtimestamp(selected["mtime"]).strftime("%Y-%m-%d %H:%M:%S") if selected["mtime"] else ""
-        st.caption(f"Última modificación: {t} • Tamaño total: {human_size(int(selected['size']))}")
-
-        p_zip = selected["paths"].get("zip")
-        p_docx = selected["paths"].get("docx")
-        p_xlsx = selected["paths"].get("xlsx")
-        p_txt = selected["paths"].get("txt")
-
+        extra = ""
+        if selected.get("duracion_sec"):
+            extra += f" • Duración: {hhmmss(int(selected['duracion_sec']))}"
+        if selected.get("infracciones") is not None:
+            extra += f" • Infracciones: {selected['infracciones']}"
+        st.caption(f"Última modificación: {t} • Tamaño total: {human_size(int(selected['size'] or 0))}{extra}")
+
+        paths = catalog.group_paths(selected["grupo"])
         b1, b2, b3, b4 = st.columns(4)
-
-        with b1:
-            if p_zip and p_zip.exists():
-                st.download_button(
-                    "📦 ZIP",
-                    p_zip.read_bytes(),
-                    file_name=p_zip.name,
-                    mime="application/zip",
-                    key=k(f"hist_zip_{selected['base']}"),
-                )
-            else:
-                st.caption("ZIP —")
-
-        with b2:
-            if p_docx and p_docx.exists():
-                st.download_button(
-                    "📄 DOCX",
-                    p_docx.read_bytes(),
-                    file_name=p_docx.name,
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    key=k(f"hist_docx_{selected['base']}"),
-                )
-            else:
-                st.caption("DOCX —")
-
-        with b3:
-            if p_xlsx and p_xlsx.exists():
-                st.download_button(
-                    "📊 XLSX",
-                    p_xlsx.read_bytes(),
-                    file_name=p_xlsx.name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key=k(f"hist_xlsx_{selected['base']}"),
-                )
-            else:
-                st.caption("XLSX —")
-
-        with b4:
-            if p_txt and p_txt.exists():
-                st.download_button(
-                    "📝 TXT",
-                    p_txt.read_bytes(),
-                    file_name=p_txt.name,
-                    mime="text/plain",
-                    key=k(f"hist_txt_{selected['base']}"),
-                )
-            else:
-                st.caption("TXT —")
+        for col, ext, lbl in ((b1, "zip", "📦 ZIP"), (b2, "docx", "📄 DOCX"), (b3, "xlsx", "📊 XLSX"), (b4, "txt", "📝 TXT")):
+            with col:
+                _lazy_dl_btn(lbl, paths.get(ext), _MIME[ext], k(f"hist_{ext}_{selected['grupo']}"))
+
+        otros = [ext for ext in ("jsonl", "parquet", "srt", "vtt") if ext in paths]
+        if otros:
+            cols = st.columns(4)
+            for col, ext in zip(cols, otros):
+                with col:
+                    _lazy_dl_btn(ext.upper(), paths.get(ext), _MIME[ext], k(f"hist_{ext}_{selected['grupo']}"))
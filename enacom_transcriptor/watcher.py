@@ -0,0 +1,314 @@
+"""
+Vigilancia de carpetas: procesa sin intervención las grabaciones que las
+estaciones de monitoreo dejan en una carpeta (p. ej. un recurso de red).
+
+    python -m enacom_transcriptor.watcher --preset vigilancia.json
+
+El preset es un JSON con la misma configuración que la pantalla principal
+más una sección "vigilancia":
+
+    {
+      "model_size": "small",
+      "lang": "es",
+      "segment_duration": 30,
+      "auto_tune": false,
+      "canal": null,
+      "infracciones": "mayday, emergencia, interferencia",
+      "export_zip": false,
+      "vigilancia": {"carpeta": "//servidor/grabaciones", "workers": 1}
+    }
+
+"canal" (base 0) transcribe solo ese canal de cada grabación; null mezcla.
+"por_canal": true transcribe cada canal por separado, como hablante.
+"deduplicar" (true por defecto) reutiliza la transcripción de audio ya
+procesado según su huella acústica (transcripciones/huellas.sqlite).
+Se aceptan todos los formatos que decodifica ffmpeg (ver
+decoding.AUDIO_EXTENSIONS).
+
+Un archivo se considera completo cuando su tamaño y fecha no cambian durante
+`estable_seg` segundos (sondeo: inotify no ve cambios hechos desde otro
+equipo en recursos SMB/NFS). La cola es acotada: si los workers no dan
+abasto, los archivos nuevos esperan al próximo sondeo en lugar de acumularse
+en memoria. Cada worker carga su propio modelo.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from pathlib import Path
+
+from enacom_transcriptor import metrics
+from enacom_transcriptor.decoding import AUDIO_EXTENSIONS
+from enacom_transcriptor.infracciones import parse_infracciones_text
+from enacom_transcriptor.paths import BACKUP_DIR, ensure_dirs
+
+
+log = logging.getLogger("enacom.vigilancia")
+
+LEDGER_PATH = BACKUP_DIR / "vigilancia.json"
+
+DEFAULT_WATCH = {
+    "carpeta": "",
+    "extensiones": [f".{e}" for e in AUDIO_EXTENSIONS],
+    "recursivo": False,
+    "intervalo_seg": 10.0,   # cada cuánto se sondea la carpeta
+    "estable_seg": 30.0,     # tamaño/fecha sin cambios durante esto = archivo completo
+    "workers": 1,            # archivos en paralelo (un modelo por worker)
+    "cola_max": 4,           # archivos listos esperando worker
+}
+
+
+def load_preset(path: str | None) -> tuple[dict, dict]:
+    """Lee el preset y devuelve (cfg de procesamiento, opciones de vigilancia)."""
+    data = {}
+    if path:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+
+    watch = {**DEFAULT_WATCH, **(data.pop("vigilancia", None) or {})}
+    watch["extensiones"] = tuple(str(e).lower() for e in watch["extensiones"])
+
+    terms = data.get("infracciones") or []
+    if isinstance(terms, str):
+        data["infracciones"] = parse_infracciones_text(terms)
+    else:
+        data["infracciones"] = [t if isinstance(t, dict) else {"termino": str(t).strip().lower()} for t in terms]
+
+    if str(data.get("lang") or "auto").lower() == "auto":
+        data["lang"] = None  # detección una vez por archivo
+    data.setdefault("model_size", "small")
+    data.setdefault("segment_duration", 30)
+    return data, watch
+
+
+# =========================
+# Registro de procesados
+# =========================
+
+class Ledger:
+    """Archivos ya procesados (ruta -> firma tamaño:mtime), persistido en JSON."""
+
+    def __init__(self, path: Path = LEDGER_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self._done: dict[str, str] = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            self._done = {}
+
+    @staticmethod
+    def signature(st_: os.stat_result) -> str:
+        return f"{st_.st_size}:{int(st_.st_mtime)}"
+
+    def is_done(self, path: str, sig: str) -> bool:
+        return self._done.get(path) == sig
+
+    def mark(self, path: str, sig: str) -> None:
+        with self._lock:
+            self._done[path] = sig
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._done, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+# =========================
+# Detección de archivos completos
+# =========================
+
+class StabilityTracker:
+    """Un archivo está listo cuando su firma no cambia durante `stable_secs`."""
+
+    def __init__(self, stable_secs: float) -> None:
+        self.stable_secs = float(stable_secs)
+        self._seen: dict[str, tuple[str, float]] = {}
+
+    def ready(self, path: str, sig: str, now: float) -> bool:
+        prev = self._seen.get(path)
+        if prev is None or prev[0] != sig:
+            self._seen[path] = (sig, now)
+            return False
+        return now - prev[1] >= self.stable_secs
+
+    def forget(self, path: str) -> None:
+        self._seen.pop(path, None)
+
+
+def _scan(folder: Path, exts: tuple[str, ...], recursive: bool):
+    it = folder.rglob("*") if recursive else folder.iterdir()
+    for p in it:
+        if p.suffix.lower() in exts and p.is_file():
+            yield p
+
+
+def _readable(path: Path) -> bool:
+    # En Windows un archivo que otro proceso sigue copiando no se puede abrir.
+    try:
+        with open(path, "rb") as f:
+            f.read(1)
+        return True
+    except OSError:
+        return False
+
+
+# =========================
+# Servicio
+# =========================
+
+class Watcher:
+    def __init__(self, cfg: dict, watch: dict) -> None:
+        self.cfg = cfg
+        self.watch = watch
+        self.folder = Path(watch["carpeta"])
+        self.ledger = Ledger()
+        self.tracker = StabilityTracker(watch["estable_seg"])
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, int(watch["cola_max"])))
+        self.stop = threading.Event()
+        self._inflight: set[str] = set()
+        self._failed: dict[str, str] = {}  # no se reintenta hasta que el archivo cambie
+        self._lock = threading.Lock()
+
+    def _worker(self, n: int) -> None:
+        from enacom_transcriptor.alerts import get_dispatcher
+        from enacom_transcriptor.engine import RunHooks, process_batch
+        from enacom_transcriptor.model import load_model
+
+        model = None
+        while not self.stop.is_set():
+            try:
+                path, sig = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                if model is None:
+                    log.info("worker %d: cargando modelo %s", n, self.cfg["model_size"])
+                    model = load_model(self.cfg["model_size"])
+                log.info("worker %d: procesando %s", n, path)
+                meta = process_batch(
+                    model, [path], self.cfg, modo="Vigilancia", hooks=RunHooks(log=log.info), alertas=get_dispatcher()
+                )
+                if not meta.get("total_files"):
+                    raise RuntimeError("no se generaron salidas")
+                log.info(
+                    "worker %d: %s listo (%s, %d infracciones)",
+                    n, Path(path).name, meta.get("total_duration_hhmmss"), meta.get("infracciones_total", 0),
+                )
+                self.ledger.mark(path, sig)
+            except Exception:
+                log.exception("worker %d: falló %s", n, path)
+                with self._lock:
+                    self._failed[path] = sig
+            finally:
+                with self._lock:
+                    self._inflight.discard(path)
+                self.tracker.forget(path)
+                self.queue.task_done()
+
+    def poll_once(self) -> int:
+        """Un sondeo: encola los archivos completos y nuevos. Devuelve cuántos."""
+        now = time.time()
+        queued = 0
+        try:
+            files = sorted(_scan(self.folder, self.watch["extensiones"], bool(self.watch["recursivo"])))
+        except OSError as e:
+            log.warning("no se pudo leer %s: %s", self.folder, e)
+            return 0
+
+        for p in files:
+            path = str(p)
+            try:
+                sig = Ledger.signature(p.stat())
+            except OSError:
+                continue
+            with self._lock:
+                if path in self._inflight or self._failed.get(path) == sig:
+                    continue
+            if self.ledger.is_done(path, sig) or not self.tracker.ready(path, sig, now) or not _readable(p):
+                continue
+            try:
+                self.queue.put_nowait((path, sig))
+            except queue.Full:
+                # Back-pressure: el resto queda para el próximo sondeo.
+                break
+            with self._lock:
+                self._inflight.add(path)
+            queued += 1
+        return queued
+
+    def run(self, once: bool = False) -> None:
+        """
+        Sondea hasta recibir SIGINT/SIGTERM. Con `once`, procesa lo que ya
+        está en la carpeta y termina.
+        """
+        if not self.folder.is_dir():
+            raise SystemExit(f"La carpeta a vigilar no existe: {self.folder}")
+
+        workers = [
+            threading.Thread(target=self._worker, args=(i + 1,), name=f"vigilancia-{i+1}", daemon=True)
+            for i in range(max(1, int(self.watch["workers"])))
+        ]
+        for t in workers:
+            t.start()
+        metrics.set_queue_depth("vigilancia", self.queue.qsize)
+
+        log.info("vigilando %s (cada %.0f s, %d worker/s)", self.folder, self.watch["intervalo_seg"], len(workers))
+        primed = False
+        while not self.stop.is_set():
+            n = self.poll_once()
+            if n:
+                log.info("%d archivo/s encolado/s", n)
+            if once and primed and n == 0:
+                with self._lock:
+                    if not self._inflight:
+                        break
+            primed = True
+            self.stop.wait(1.0 if once else float(self.watch["intervalo_seg"]))
+
+        self.stop.set()
+        log.info("deteniendo: se termina el archivo en curso")
+        for t in workers:
+            t.join()
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Vigilancia de carpetas ENACOM (transcripción automática).")
+    ap.add_argument("--preset", help="JSON con la configuración de procesamiento y 'vigilancia'.")
+    ap.add_argument("--carpeta", help="Carpeta a vigilar (pisa la del preset).")
+    ap.add_argument("--workers", type=int, help="Archivos en paralelo.")
+    ap.add_argument("--una-vez", action="store_true", help="Un solo sondeo; espera a que termine la cola.")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    cfg, watch = load_preset(args.preset)
+    if args.carpeta:
+        watch["carpeta"] = args.carpeta
+    if args.workers:
+        watch["workers"] = args.workers
+    if not watch["carpeta"]:
+        ap.error("falta la carpeta a vigilar (--carpeta o vigilancia.carpeta en el preset)")
+
+    from enacom_transcriptor.runtime import configure_runtime
+
+    ensure_dirs()
+    configure_runtime()
+
+    w = Watcher(cfg, watch)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            signal.signal(sig, lambda *_: w.stop.set())
+        except (ValueError, OSError):
+            pass
+
+    if args.una_vez:
+        # Lo que ya está en la carpeta se asume completo.
+        w.tracker.stable_secs = 0.0
+    w.run(once=args.una_vez)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Antes de importar enacom_transcriptor: corridas, catálogo y huellas de las
+# pruebas van a una carpeta temporal, nunca a transcripciones/ del repo.
+os.environ.setdefault("ENACOM_DATA_DIR", tempfile.mkdtemp(prefix="enacom_tests_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Carpeta de transcripciones vacía por prueba (catálogo, huellas y política adentro)."""
+    from enacom_transcriptor import catalog, fingerprint, paths, storage
+
+    values = {
+        "BACKUP_DIR": tmp_path,
+        "BIN_DIR": tmp_path / "bin",
+        "CATALOG_PATH": tmp_path / "catalogo.sqlite",
+        "FINGERPRINT_PATH": tmp_path / "huellas.sqlite",
+        "POLICY_PATH": tmp_path / "retencion.json",
+    }
+    for mod in (paths, catalog, fingerprint, storage):
+        for name, value in values.items():
+            if hasattr(mod, name):
+                monkeypatch.setattr(mod, name, value)
+    return tmp_path
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import pytest
+
+from enacom_transcriptor import alerts
+from enacom_transcriptor.alerts import AlertDispatcher
+
+
+class _Backend:
+    name = "prueba"
+
+    def __init__(self, fail: bool = False) -> None:
+        self.sent: list[dict] = []
+        self.fail = fail
+
+    def send(self, alert: dict) -> None:
+        if self.fail:
+            raise OSError("sin conexión")
+        self.sent.append(alert)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(alerts.time, "monotonic", c)
+    return c
+
+
+def _hit(termino: str = "mayday", t: float = 12.0, archivo: str = "a.wav") -> dict:
+    return {"archivo": archivo, "termino": termino, "t_inicio": t, "inicio": "00:00:12", "texto": "..."}
+
+
+def test_duplicates_are_sent_once_within_the_window(clock) -> None:
+    backend = _Backend()
+    d = AlertDispatcher([backend], dedup_sec=60, max_per_min=0)
+    assert d.push(_hit())
+    clock.now += 30
+    assert not d.push(_hit(t=12.04))    # mismo instante redondeado a 0,1 s
+    assert d.push(_hit(archivo="b.wav"))
+    clock.now += 31
+    assert d.push(_hit())               # vencida la ventana se vuelve a avisar
+    d.close()
+    stats = d.stats()
+    assert stats["duplicadas"] == 1 and stats["enviadas"] == 3
+    assert len(backend.sent) == 3
+
+
+def test_rate_limit_is_per_term_and_per_minute(clock) -> None:
+    backend = _Backend()
+    d = AlertDispatcher([backend], dedup_sec=0, max_per_min=2)
+    assert d.push(_hit(t=1)) and d.push(_hit(t=2))
+    assert not d.push(_hit(t=3))
+    assert d.push(_hit(termino="socorro", t=3))    # otro término no comparte el cupo
+    clock.now += 61
+    assert d.push(_hit(t=4))
+    d.close()
+    assert d.stats()["limitadas"] == 1
+    assert [a["t_inicio"] for a in backend.sent] == [1, 2, 3, 4]
+
+
+def test_failing_backend_does_not_block_the_others(clock) -> None:
+    ok = _Backend()
+    d = AlertDispatcher([_Backend(fail=True), ok])
+    d.push({**_hit(), "t_fin": float("nan")})
+    d.close()
+    stats = d.stats()
+    assert stats["errores"] == 1 and stats["ultimo_error"].startswith("prueba:")
+    assert len(ok.sent) == 1 and "t_fin" not in ok.sent[0]    # NaN no se envía
+
+
+def test_full_queue_drops_instead_of_blocking(clock) -> None:
+    d = AlertDispatcher([], dedup_sec=0, max_per_min=0, maxsize=1)
+    d.close()                             # sin hilo consumidor la cola se llena
+    assert d.push(_hit(t=1))
+    assert not d.push(_hit(t=2))
+    assert d.stats()["descartadas"] == 1
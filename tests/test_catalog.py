@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+
+from enacom_transcriptor import catalog
+
+
+def _write(path, data: bytes = b"x", mtime: float | None = None) -> str:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_group_for_uses_path_relative_to_data_dir(data_dir, tmp_path_factory) -> None:
+    assert catalog.group_for(str(data_dir / "corrida_1" / "grab" / "grab.txt")) == "corrida_1/grab/grab"
+    assert catalog.group_for(str(data_dir / "viejo.xlsx")) == "viejo"
+    outside = tmp_path_factory.mktemp("fuera") / "otro.txt"
+    assert catalog.group_for(str(outside)) == "otro"
+
+
+def test_tipo_for() -> None:
+    assert catalog.tipo_for("lote_20240101") == catalog.TIPO_LOTE
+    assert catalog.tipo_for("x/corrida_20240101") == catalog.TIPO_CORRIDA
+    assert catalog.tipo_for("grabacion") == catalog.TIPO_IND
+    assert catalog.tipo_for("") == catalog.TIPO_IND
+
+
+def test_outputs_are_grouped_and_paged(data_dir) -> None:
+    a = [_write(data_dir / "r1" / "a" / f"a.{ext}", b"12345", mtime=1000) for ext in ("txt", "xlsx")]
+    b = [_write(data_dir / "r1" / "b" / "b.txt", b"123", mtime=2000)]
+    catalog.register_outputs("r1", catalog.group_for(a[0]), a, archivo="a.wav", infracciones=2)
+    catalog.register_outputs("r1", catalog.group_for(b[0]), b, archivo="b.wav")
+    # Registrar de nuevo actualiza, no duplica.
+    catalog.register_outputs("r1", catalog.group_for(a[0]), a[:1], archivo="a.wav", infracciones=2)
+
+    groups = catalog.list_groups()
+    assert [g["grupo"] for g in groups] == ["r1/b/b", "r1/a/a"]
+    assert groups[1]["exts"] == ["txt", "xlsx"] and groups[1]["size"] == 10 and groups[1]["infracciones"] == 2
+    assert [g["grupo"] for g in catalog.list_groups(order="asc", limit=1)] == ["r1/a/a"]
+    assert [g["grupo"] for g in catalog.list_groups(search="a/a")] == ["r1/a/a"]
+    assert catalog.count_groups() == 2 and catalog.count_groups(search="_") == 0
+    assert catalog.group_paths("r1/a/a") == {"txt": a[0], "xlsx": a[1]}
+    assert catalog.groups_older_than(1500) == ["r1/a/a"]
+
+    stats = catalog.usage_stats()
+    assert stats["files"] == 3 and stats["groups"] == 2 and stats["bytes"] == 13
+
+    catalog.forget_paths([a[1]])
+    assert catalog.group_paths("r1/a/a") == {"txt": a[0]}
+
+
+def test_reindex_skips_partial_outputs(data_dir) -> None:
+    done = _write(data_dir / "corrida_1" / "g" / "g.txt")
+    _write(data_dir / "corrida_1" / "g" / "g.~part.jsonl")
+    _write(data_dir / "corrida_1" / "g" / "notas.md")
+
+    assert catalog.all_paths() == [done]   # la primera conexión importa lo existente
+
+    os.remove(done)
+    _write(data_dir / "lote_2" / "lote_2.zip")
+    catalog.reindex()
+    assert [g["grupo"] for g in catalog.list_groups()] == ["lote_2/lote_2"]
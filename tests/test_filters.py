@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from enacom_transcriptor.filters import SegmentFilter
+
+# Estadísticas de un segmento con habla clara y de uno dudoso.
+CLARO = {"no_speech_prob": 0.05, "avg_logprob": -0.2, "compression_ratio": 1.2}
+DUDOSO = {"no_speech_prob": 0.7, "avg_logprob": -0.4, "compression_ratio": 1.3}
+
+
+def seg(text: str, stats: dict = CLARO, speaker: str = "") -> dict:
+    return {"text": text, "speaker": speaker, **stats}
+
+
+def test_default_mode_marks() -> None:
+    assert SegmentFilter().drop is False
+    assert SegmentFilter({"modo": "descartar"}).drop is True
+
+
+def test_known_phrase_needs_whole_utterance() -> None:
+    f = SegmentFilter()
+    assert f.check(seg("Gracias por verificar la frecuencia", DUDOSO)) is None
+    assert f.check(seg("Gracias por ver eso, cambio", DUDOSO)) is None
+    assert f.check(seg("¡Gracias por ver el video!", DUDOSO)) == "frase_conocida"
+
+
+def test_known_phrase_needs_whisper_evidence() -> None:
+    f = SegmentFilter()
+    assert f.check(seg("Gracias por ver el video.")) is None
+    assert f.check(seg("Gracias por ver el video.", {**CLARO, "avg_logprob": -1.3})) == "frase_conocida"
+
+
+def test_consecutive_repeats_are_real_traffic() -> None:
+    f = SegmentFilter()
+    assert [f.check(seg("Recibido.")) for _ in range(4)] == [None] * 4
+    assert f.check(seg("Recibido.", DUDOSO)) == "repeticion"
+
+
+def test_repeats_are_tracked_per_speaker() -> None:
+    f = SegmentFilter()
+    for spk in ("A", "B", "A", "B"):
+        assert f.check(seg("Recibido.", DUDOSO, speaker=spk)) is None
+    assert f.check(seg("Recibido.", DUDOSO, speaker="A")) == "repeticion"
+
+
+def test_inner_loop_threshold() -> None:
+    f = SegmentFilter()
+    assert f.check(seg("Mayday mayday mayday mayday, motor en llamas", DUDOSO)) is None
+    assert f.check(seg("Cambio cambio cambio cambio.", DUDOSO)) is None
+    assert f.check(seg(" ".join(["cambio"] * 8), DUDOSO)) == "repeticion"
+    assert f.check(seg(" ".join(["cambio"] * 8))) is None
+
+
+def test_infraction_terms_are_never_filtered() -> None:
+    f = SegmentFilter({"modo": "descartar"}, ["mayday", "Desvío"])
+    sin_habla = {"no_speech_prob": 0.9, "avg_logprob": -1.5, "compression_ratio": 3.0}
+    assert f.check(seg(" ".join(["mayday"] * 10), sin_habla)) is None
+    assert f.check(seg("desvio a la derecha", sin_habla)) is None
+    assert f.check(seg("ruido", sin_habla)) == "sin_habla"
+
+
+def test_statistics_rules() -> None:
+    f = SegmentFilter()
+    assert f.check(seg("hola", {"no_speech_prob": 0.9, "avg_logprob": -1.5})) == "sin_habla"
+    assert f.check(seg("hola", {"no_speech_prob": 0.9, "avg_logprob": -0.5})) is None
+    assert f.check(seg("hola", {"compression_ratio": 2.6})) == "compresion"
+    assert f.counts["sin_habla"] == 1 and f.counts["compresion"] == 1
+    assert f.total == 2
+
+
+def test_disabled_and_mark() -> None:
+    f = SegmentFilter({"enabled": False})
+    assert f.check(seg("Gracias por ver el video", DUDOSO)) is None
+    marked = f.mark(seg("hola"))
+    assert marked["text"] == "[dudoso] hola"
+    assert f.mark(marked)["text"] == "[dudoso] hola"
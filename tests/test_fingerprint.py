@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from enacom_transcriptor import fingerprint
+from enacom_transcriptor.segments import SegmentStore
+
+SR = 16000
+SETTINGS = fingerprint.transcript_settings({"model_size": "small"}, "es")
+
+
+class ArraySource:
+    """Fuente de audio en memoria con la interfaz que usa Dedup (duration, samplerate, read)."""
+
+    def __init__(self, x: np.ndarray, samplerate: int = SR) -> None:
+        self.x = x
+        self.samplerate = samplerate
+        self.duration = len(x) / samplerate
+
+    def read(self, start: float, end: float) -> np.ndarray:
+        return self.x[int(start * self.samplerate) : int(end * self.samplerate)]
+
+
+def _audio(seconds: float, seed: int) -> np.ndarray:
+    """Tonos que cambian cada 0,25 s: picos espectrales bien separados y sin periodicidad."""
+    rng = np.random.default_rng(seed)
+    chunk = SR // 4
+    t = np.arange(chunk) / SR
+    parts = [
+        sum(np.sin(2 * np.pi * f * t) for f in rng.uniform(300, 3500, 3)) for _ in range(int(seconds * 4))
+    ]
+    return (np.concatenate(parts) * 0.2).astype(np.float32)
+
+
+def _store(segments: list[tuple[float, float, str]], words: bool = True) -> SegmentStore:
+    store = SegmentStore(archivo="a.wav")
+    for start, end, text in segments:
+        seg = {"start": start, "end": end, "text": text}
+        if words:
+            toks = text.split()
+            step = (end - start) / len(toks)
+            seg["words"] = [
+                {"word": w, "start": start + i * step, "end": start + (i + 1) * step, "probability": 0.9}
+                for i, w in enumerate(toks)
+            ]
+        store.append_whisper(seg, offset=0.0)
+    return store
+
+
+def _register(source: ArraySource, store: SegmentStore, settings: dict = SETTINGS) -> int:
+    h, t = fingerprint.fingerprint_source(source)
+    return fingerprint.register("a.wav", source.duration, h, t, store, settings)
+
+
+def test_hashes_use_two_targets() -> None:
+    h, t = fingerprint.fingerprint_source(ArraySource(_audio(10, 0)))
+    assert len(h) == len(t) > 0
+    assert int(h.max()) < 2**36
+    assert int(h.max()) >= 2**22
+
+
+def test_find_overlaps_locates_shared_audio(data_dir) -> None:
+    a = _audio(60, 1)
+    _register(ArraySource(a), _store([(0.0, 5.0, "hola")]))
+
+    b = np.concatenate([a[20 * SR :], _audio(30, 2)])
+    h, t = fingerprint.fingerprint_source(ArraySource(b))
+    regions = fingerprint.find_overlaps(h, t, SETTINGS)
+    assert len(regions) == 1
+    r = regions[0]
+    assert r["desfase"] == pytest.approx(20.0, abs=0.1)
+    assert r["inicio"] < 2.0 and 36.0 < r["fin"] <= 40.5
+
+
+def test_find_overlaps_needs_same_settings_and_hash_version(data_dir) -> None:
+    a = _audio(40, 3)
+    _register(ArraySource(a), _store([(0.0, 5.0, "hola")]))
+    h, t = fingerprint.fingerprint_source(ArraySource(a))
+
+    other = fingerprint.transcript_settings({"model_size": "medium"}, "es")
+    assert fingerprint.find_overlaps(h, t, other) == []
+    assert len(fingerprint.find_overlaps(h, t, SETTINGS)) == 1
+
+    con = sqlite3.connect(str(data_dir / "huellas.sqlite"))
+    with con:
+        con.execute("UPDATE grabaciones SET version_hash = 1")
+    con.close()
+    assert fingerprint.find_overlaps(h, t, SETTINGS) == []
+
+
+def test_no_overlap_with_unrelated_audio(data_dir) -> None:
+    _register(ArraySource(_audio(40, 4)), _store([(0.0, 5.0, "hola")]))
+    h, t = fingerprint.fingerprint_source(ArraySource(_audio(40, 5)))
+    assert fingerprint.find_overlaps(h, t, SETTINGS) == []
+
+
+def test_stored_segments_are_clipped_by_words(data_dir) -> None:
+    rec = fingerprint.register(
+        "a.wav", 30.0, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+        _store([(0.0, 4.0, "uno dos tres cuatro"), (4.0, 8.0, "cinco seis siete ocho")]), SETTINGS,
+    )
+    segs = fingerprint._stored_segments(rec, 2.0, 6.0)
+    assert [s["text"] for s in segs] == ["tres cuatro", "cinco seis"]
+    assert segs[0]["start"] == pytest.approx(2.0) and segs[1]["end"] == pytest.approx(6.0)
+
+
+def test_stored_segments_without_words_use_midpoint(data_dir) -> None:
+    rec = fingerprint.register(
+        "a.wav", 30.0, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+        _store([(0.0, 4.0, "uno dos"), (4.0, 10.0, "tres cuatro")], words=False), SETTINGS,
+    )
+    assert [s["text"] for s in fingerprint._stored_segments(rec, 1.0, 6.0)] == ["uno dos"]
+    assert [s["text"] for s in fingerprint._stored_segments(rec, 6.0, 12.0)] == ["tres cuatro"]
+
+
+def _dedup(source, regions: list[dict]) -> fingerprint.Dedup:
+    d = fingerprint.Dedup.__new__(fingerprint.Dedup)
+    d.source, d.settings, d.regions = source, SETTINGS, regions
+    d.reused_sec, d._reused_until = 0.0, 0.0
+    return d
+
+
+def test_transcribe_does_not_repeat_a_segment_crossing_the_region_end(data_dir) -> None:
+    rec = fingerprint.register(
+        "a.wav", 60.0, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+        _store([(0.0, 10.0, "viejo"), (16.0, 23.0, "cruza el borde")], words=False), SETTINGS,
+    )
+    calls: list[tuple[float, float]] = []
+
+    def asr(a: float, b: float) -> dict:
+        calls.append((a, b))
+        return {"segments": [{"start": 0.0, "end": b - a, "text": "nuevo"}]}
+
+    d = _dedup(ArraySource(np.zeros(60 * SR, dtype=np.float32)), [
+        {"inicio": 0.0, "fin": 20.0, "grabacion": rec, "archivo": "a.wav", "desfase": 0.0},
+    ])
+    first, _ = d.transcribe(0.0, 30.0, asr)
+    assert [s["text"] for s in first["segments"]] == ["viejo", "cruza el borde", "nuevo"]
+    # Lo nuevo empieza donde termina el segmento reutilizado, no en el borde de la región
+    assert calls == [(23.0, 30.0)]
+
+    calls.clear()
+    d.transcribe(30.0, 60.0, asr)
+    assert calls == [(30.0, 60.0)]
+
+
+def test_transcribe_keeps_short_remainders(data_dir) -> None:
+    rec = fingerprint.register(
+        "a.wav", 60.0, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+        _store([(0.0, 29.5, "viejo")], words=False), SETTINGS,
+    )
+
+    def asr(a: float, b: float) -> dict:
+        # "corto" cae en el resto [29.5, 30); "contexto" en el audio reutilizado.
+        return {"segments": [
+            {"start": 0.0, "end": 29.3 - a, "text": "contexto"},
+            {"start": 29.5 - a, "end": 30.0 - a, "text": "corto"},
+        ]}
+
+    d = _dedup(ArraySource(np.zeros(60 * SR, dtype=np.float32)), [
+        {"inicio": 0.0, "fin": 29.5, "grabacion": rec, "archivo": "a.wav", "desfase": 0.0},
+    ])
+    result, transcribed = d.transcribe(0.0, 30.0, asr)
+    assert [s["text"] for s in result["segments"]] == ["viejo", "corto"]
+    assert transcribed == pytest.approx(fingerprint.MIN_NOVEL_SEC + 0.5)
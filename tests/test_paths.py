@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+from enacom_transcriptor.paths import (
+    ACTIVE_MARKER,
+    finalize_partial,
+    partial_base,
+    partial_path,
+    pid_alive,
+    run_active,
+    run_is_active,
+)
+from enacom_transcriptor.sinks import open_sinks, segment_record
+
+
+def test_partial_path_keeps_the_extension(tmp_path) -> None:
+    assert partial_path(str(tmp_path / "grab.txt")) == str(tmp_path / "grab.~part.txt")
+    assert partial_base(str(tmp_path / "grab")) + ".jsonl" == str(tmp_path / "grab.~part.jsonl")
+
+
+def test_finalize_replaces_the_previous_output(tmp_path) -> None:
+    final = tmp_path / "grab.txt"
+    final.write_text("versión anterior", encoding="utf-8")
+    part = partial_path(str(final))
+    with open(part, "w", encoding="utf-8") as f:
+        f.write("completa")
+
+    # Hasta el rename, lo que se lee es la salida anterior entera.
+    assert final.read_text(encoding="utf-8") == "versión anterior"
+    assert finalize_partial(part) == str(final)
+    assert final.read_text(encoding="utf-8") == "completa"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["grab.txt"]
+
+
+def test_finalize_leaves_final_paths_alone(tmp_path) -> None:
+    final = tmp_path / "grab.txt"
+    final.write_text("x", encoding="utf-8")
+    assert finalize_partial(str(final)) == str(final)
+    assert final.exists()
+
+
+def test_sinks_write_partial_and_finalize(tmp_path) -> None:
+    sinks = open_sinks(partial_base(str(tmp_path / "grab")), ("jsonl", "srt"))
+    sinks.write(segment_record(archivo="a.wav", start=0.0, end=1.5, speaker="", text="hola", confidence=None, terminos=[]))
+    written = sinks.close()
+    assert all(".~part." in p for p in written)
+    final = sorted(finalize_partial(p) for p in written)
+    assert final == [str(tmp_path / "grab.jsonl"), str(tmp_path / "grab.srt")]
+    assert "hola" in (tmp_path / "grab.jsonl").read_text(encoding="utf-8")
+
+
+def test_run_active_marks_the_dir_while_running(tmp_path) -> None:
+    assert not run_is_active(tmp_path)
+    with run_active(tmp_path):
+        assert (tmp_path / ACTIVE_MARKER).exists()
+        assert run_is_active(tmp_path)
+    assert not (tmp_path / ACTIVE_MARKER).exists()
+    assert not run_is_active(tmp_path)
+
+
+def test_marker_of_a_dead_process_is_not_active(tmp_path) -> None:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    assert not pid_alive(proc.pid)
+    (tmp_path / ACTIVE_MARKER).write_text(str(proc.pid), encoding="utf-8")
+    assert not run_is_active(tmp_path)
+    (tmp_path / ACTIVE_MARKER).write_text("basura", encoding="utf-8")
+    assert not run_is_active(tmp_path)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from enacom_transcriptor.profiling import PROFILE_ENV, RunProfiler
+
+
+def test_profiler_is_disabled_when_the_run_is_cut(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv(PROFILE_ENV, "cprofile")
+    with pytest.raises(KeyboardInterrupt):
+        with RunProfiler(tmp_path) as profiler:
+            assert profiler.path is not None
+            raise KeyboardInterrupt  # como el StopException de un rerun
+    assert sys.getprofile() is None
+    assert (tmp_path / "perfil.prof").exists()
+
+
+def test_nested_profilers_are_skipped(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv(PROFILE_ENV, "cprofile")
+    outer = RunProfiler(tmp_path / "a")
+    (tmp_path / "a").mkdir()
+    with outer:
+        with RunProfiler(tmp_path) as inner:
+            assert inner.path is None
+        assert inner.stop() is None
+    assert outer.stop() == str(tmp_path / "a" / "perfil.prof")
+
+    # Liberado: la corrida siguiente se vuelve a perfilar.
+    with RunProfiler(tmp_path) as again:
+        assert again.path is not None
+
+
+def test_without_env_does_nothing(tmp_path, monkeypatch) -> None:
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    with RunProfiler(tmp_path) as profiler:
+        pass
+    assert profiler.stop() is None and not list(tmp_path.iterdir())
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from enacom_transcriptor import catalog, fingerprint, storage
+from enacom_transcriptor.paths import run_active
+
+GB = 1024**3
+
+
+def _group(root, name: str, size: int, mtime: float) -> str:
+    d = root / "corrida_x" / name
+    d.mkdir(parents=True, exist_ok=True)
+    p = d / f"{name}.txt"
+    p.write_bytes(b"x" * size)
+    os.utime(p, (mtime, mtime))
+    grupo = catalog.group_for(str(p))
+    catalog.register_outputs("corrida_x", grupo, [str(p)])
+    return grupo
+
+
+class FakeIndex:
+    """Índice de huellas falso: grabaciones (created, bytes) en un archivo de ese tamaño."""
+
+    def __init__(self, path, recordings: list[tuple[float, int]]) -> None:
+        self.path = path
+        self.recordings = sorted(recordings)
+        self.calls: list[float] = []
+        self._write()
+
+    def _write(self) -> None:
+        self.path.write_bytes(b"h" * sum(b for _, b in self.recordings))
+
+    def prune(self, older_than: float) -> int:
+        self.calls.append(older_than)
+        keep = [r for r in self.recordings if r[0] >= older_than]
+        n = len(self.recordings) - len(keep)
+        self.recordings = keep
+        self._write()
+        return n
+
+
+def _groups() -> list[str]:
+    return [g["grupo"] for g in catalog.list_groups(limit=100, order="asc")]
+
+
+def test_quota_deletes_oldest_groups_first(data_dir) -> None:
+    now = time.time()
+    for i, name in enumerate(("a", "b", "c")):
+        _group(data_dir, name, 1000, now - 300 + i * 100)
+    res = storage.apply_retention(max_age_days=0, max_total_gb=1500 / GB)
+    assert res["groups"] == 2 and res["bytes"] == 2000
+    assert _groups() == ["corrida_x/c/c"]
+    assert catalog.usage_stats()["bytes"] == 1000
+
+
+def test_quota_prunes_older_fingerprints_before_newer_groups(data_dir, monkeypatch) -> None:
+    now = time.time()
+    _group(data_dir, "a", 1000, now - 300)
+    _group(data_dir, "b", 1000, now - 100)
+    index = FakeIndex(data_dir / "huellas.sqlite", [(now - 400, 600), (now - 50, 200)])
+    monkeypatch.setattr(fingerprint, "prune", index.prune)
+
+    res = storage.apply_retention(max_age_days=0, max_total_gb=2300 / GB)
+    # La grabación más vieja que el grupo "a" alcanza: no se borra ningún grupo.
+    assert res == {"groups": 0, "files": 0, "bytes": 600, "huellas": 1}
+    assert len(_groups()) == 2
+
+
+def test_quota_stops_when_only_the_index_is_over(data_dir, monkeypatch) -> None:
+    now = time.time()
+    _group(data_dir, "a", 1000, now - 300)
+    _group(data_dir, "b", 1000, now - 200)
+    index = FakeIndex(data_dir / "huellas.sqlite", [(now - 10, 5000)])
+    monkeypatch.setattr(fingerprint, "prune", index.prune)
+
+    res = storage.apply_retention(max_age_days=0, max_total_gb=4000 / GB)
+    assert res["groups"] == 0
+    assert len(_groups()) == 2
+    assert catalog.usage_stats()["huellas_bytes"] == 5000
+
+
+def test_quota_deletes_groups_down_to_index_size(data_dir, monkeypatch) -> None:
+    now = time.time()
+    for i, name in enumerate(("a", "b", "c")):
+        _group(data_dir, name, 1000, now - 300 + i * 100)
+    index = FakeIndex(data_dir / "huellas.sqlite", [(now - 10, 1200)])
+    monkeypatch.setattr(fingerprint, "prune", index.prune)
+
+    res = storage.apply_retention(max_age_days=0, max_total_gb=2500 / GB)
+    assert res["groups"] == 2
+    assert _groups() == ["corrida_x/c/c"]
+    assert res["huellas"] == 0
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _old(path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x")
+    t = time.time() - 7 * 3600
+    os.utime(path, (t, t))
+
+
+@pytest.fixture
+def temp_root(tmp_path, monkeypatch):
+    root = tmp_path / "tmp"
+    root.mkdir()
+    monkeypatch.setattr("tempfile.tempdir", str(root))
+    return root
+
+
+def test_temp_dir_is_per_process(temp_root) -> None:
+    assert storage.temp_dir() == str(temp_root / f"{storage.TEMP_PREFIX}{os.getpid()}")
+
+
+def test_sweep_skips_temp_dirs_of_live_processes(data_dir, temp_root) -> None:
+    mine = temp_root / f"{storage.TEMP_PREFIX}{os.getpid()}" / "subida.wav"
+    dead_dir = temp_root / f"{storage.TEMP_PREFIX}{_dead_pid()}"
+    dead = dead_dir / "subida.wav"
+    _old(mine)
+    _old(dead)
+
+    removed = storage.sweep_orphans(max_age_hours=6)
+    assert removed == [str(dead)]
+    assert mine.exists() and not dead_dir.exists()
+
+
+def test_sweep_keeps_recent_temp_files_of_dead_processes(data_dir, temp_root) -> None:
+    dead = temp_root / f"{storage.TEMP_PREFIX}{_dead_pid()}" / "subida.wav"
+    dead.parent.mkdir()
+    dead.write_bytes(b"x")
+    assert storage.sweep_orphans(max_age_hours=6) == []
+    assert dead.exists()
+
+
+def test_sweep_only_touches_unclaimed_runs(data_dir, temp_root) -> None:
+    done = data_dir / "corrida_done" / "a_progreso.pkl"
+    live = data_dir / "corrida_live" / "a.~part.txt"
+    cut = data_dir / "corrida_cut" / "a.~part.txt"
+    for p in (done, live, cut):
+        _old(p)
+    catalog.register_run("corrida_done", {})
+
+    with run_active(live.parent):
+        removed = storage.sweep_orphans(max_age_hours=6)
+    assert removed == [str(cut)]
+    assert done.exists() and live.exists()